@@ -2,7 +2,6 @@
 AFMTool1 Case Report Generator
 Fallnummer-basierte Gruppierung mit fallnummer_verknuepfung.py
 """
-import json
 import datetime
 from pathlib import Path
 import sys
@@ -17,6 +16,10 @@ except ImportError:
     print("⚠️ Fallback: fallnummer_verknuepfung.py nicht verfügbar")
     FALLBACK_MODE = True
 
+# Streaming-Loader (Pure AFM inkl. Journal oder Legacy) aus dem Projekt-Root
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from utils.afm_stream import iter_database_cases
+
 class CaseReporter:
     def __init__(self):
         self.project_root = Path(__file__).parent.parent.parent
@@ -32,11 +35,10 @@ class CaseReporter:
             return []
             
         try:
-            with open(db_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                cases = data.get('cases', [])
-                print(f"✅ {len(cases)} Cases geladen")
-                return cases
+            # Gestreamt statt json.load der gesamten Datei
+            cases = list(iter_database_cases(db_path))
+            print(f"✅ {len(cases)} Cases geladen")
+            return cases
         except Exception as e:
             print(f"❌ Fehler beim Laden: {e}")
             return []
@@ -3,7 +3,6 @@ AFMTool1 Report Generator
 Erstellt Übersichten und PDF-Reports
 """
 
-import json
 import os
 import datetime
 from pathlib import Path
@@ -30,6 +29,15 @@ except ImportError as e:
     print(f"⚠️ Fallback: Verwende eingebaute Gruppierung ({e})")
     USE_FALLNUMMER_MODULE = False
 
+# Streaming-Loader (Pure AFM inkl. Journal oder Legacy) aus dem Projekt-Root
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+from utils.afm_stream import iter_database_cases
+from utils.afm_timestamps import case_timestamps
+from utils import json_codec
+from utils.database import get_database_metadata
+
 class AFMReporter:
     def __init__(self):
         # Pfad relativ zum Projekt-Root (zwei Ebenen hoch vom report-Verzeichnis)
@@ -46,9 +54,26 @@ class AFMReporter:
         
         for db_file in all_db_files:
             db_path = self.data_dir / db_file
-            if db_path.exists():
+            # Pure AFM: Anzahl und Feldkatalog aus dem Metadaten-Sidecar statt die Datei zu parsen
+            metadata = get_database_metadata(db_path) if db_path.exists() else None
+            if metadata is not None:
+                overview[db_file] = {
+                    "exists": True,
+                    "size": db_path.stat().st_size,
+                    "records": metadata["case_count"],
+                    "last_modified": datetime.datetime.fromisoformat(
+                        metadata["modified"]
+                    ).strftime("%Y-%m-%d %H:%M:%S"),
+                    "structure": {
+                        "type": "cases_db",
+                        "fields": sorted(metadata["fields"]),
+                        "status_counts": metadata["status_counts"],
+                        "version": metadata["version"]
+                    }
+                }
+            elif db_path.exists():
                 with open(db_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                    data = json_codec.load(f)
                     # Dynamische Erkennung der Struktur
                     if 'cases' in data:
                         records = len(data.get('cases', []))
@@ -198,25 +223,20 @@ class AFMReporter:
         db_path = self.data_dir / db_name
         if not db_path.exists():
             return [], []
-            
-        with open(db_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        if 'cases' in data:
-            cases = data.get('cases', [])
-            if not cases:
-                return [], []
-            
+        
+        # Cases gestreamt lesen statt die gesamte Datei per json.load zu parsen
+        cases = []
+        all_columns = set()
+        for case in iter_database_cases(db_path):
+            cases.append(case)
             # Dynamische Spaltenerkennung
-            all_columns = set()
-            for case in cases:
-                if isinstance(case, dict):
-                    all_columns.update(case.keys())
-            
-            columns = sorted(list(all_columns))
-            return cases, columns
-        else:
+            all_columns.update(case.keys())
+        
+        if not cases:
             return [], []
+        
+        columns = sorted(list(all_columns))
+        return cases, columns
     
     def generate_project_structure_chart(self):
         """3. Dynamische graphische Darstellung der Projektstruktur"""
@@ -456,11 +476,12 @@ class AFMReporter:
                 
                 # Case-Header mit UUID (erfassung-Zeitstempel)
                 for case in group_cases:
-                    erfassung_uuid = ""
-                    for ts in case['zeitstempel']:
-                        if ts.startswith('erfassung:'):
-                            erfassung_uuid = ts.split(':')[2]  # UUID-Teil
-                            break
+                    erfassung = case_timestamps(case).erfassung
+                    if erfassung is not None and erfassung.uuid is not None:
+                        erfassung_uuid = str(erfassung.uuid)  # UUID-Teil
+                    else:
+                        # Pure AFM speichert vereinfachte Zeitstempel ohne UUID
+                        erfassung_uuid = case.get('uuid', '')
                     fallnummer_header.append(erfassung_uuid)
             
             # Beschränke auf 8 Fälle für A4-Querformat
@@ -13,7 +13,7 @@ class CaseEditorComponent:
         self.data_service = parent.data_service
         self.status_mapping = parent.status_mapping
         self.case_edit_frame = None
-        self.selected_case_index = None
+        self.selected_case_id = None
         self.edit_mode = False  # Toggle zwischen Anzeige- und Edit-Modus
         
         # Tracking für ungespeicherte Änderungen
@@ -168,9 +168,9 @@ class CaseEditorComponent:
         widget.bind("<Enter>", on_enter)
         widget.bind("<Leave>", on_leave)
     
-    def load_case(self, case_index):
+    def load_case(self, case_id):
         """Case laden und anzeigen"""
-        self.selected_case_index = case_index
+        self.selected_case_id = case_id
         self.edit_mode = False  # Immer im Anzeige-Modus starten
         
         # Edit-Status zurücksetzen beim Laden
@@ -178,11 +178,9 @@ class CaseEditorComponent:
         self.original_quelle = ""
         self.original_fundstellen = ""
         
-        cases = self.data_service.get_cases()
-        if case_index >= len(cases):
+        case = self.data_service.get_case(case_id)
+        if case is None:
             return
-            
-        case = cases[case_index]
         
         # Details anzeigen
         self.quelle_label.config(text=case.get("quelle", ""))
@@ -304,33 +302,31 @@ class CaseEditorComponent:
     
     def advance_status(self):
         """Status weiterschalten (vereinfacht, ohne Info-Dialog)"""
-        if self.selected_case_index is not None:
-            success = self.data_service.advance_case_status(self.selected_case_index)
+        if self.selected_case_id is not None:
+            success = self.data_service.advance_case_status(self.selected_case_id)
             if success:
                 self.refresh()
                 from utils.logger import log_action
-                log_action("GUI_ACTION", f"Status vorwärts gewechselt für Case {self.selected_case_index}")
+                log_action("GUI_ACTION", f"Status vorwärts gewechselt für Case {self.selected_case_id}")
     
     def retreat_status(self):
         """Status zurückschalten (vereinfacht, Felder bleiben bestehen)"""
-        if self.selected_case_index is not None:
-            success = self.data_service.retreat_case_status(self.selected_case_index)
+        if self.selected_case_id is not None:
+            success = self.data_service.retreat_case_status(self.selected_case_id)
             if success:
                 self.refresh()
                 from utils.logger import log_action
-                log_action("GUI_ACTION", f"Status zurück gewechselt für Case {self.selected_case_index}")
+                log_action("GUI_ACTION", f"Status zurück gewechselt für Case {self.selected_case_id}")
     
     def delete_case(self):
         """Case löschen (nur im Edit-Modus verfügbar)"""
-        if self.selected_case_index is None:
+        if self.selected_case_id is None:
             return
             
         try:
-            cases = self.data_service.get_cases()
-            if self.selected_case_index >= len(cases):
+            case = self.data_service.get_case(self.selected_case_id)
+            if case is None:
                 return
-                
-            case = cases[self.selected_case_index]
             
             # Bestätigung mit Case-Details
             result = messagebox.askyesno(
@@ -344,10 +340,10 @@ class CaseEditorComponent:
             )
             
             if result:
-                success, deleted_case = self.data_service.delete_case(self.selected_case_index)
+                success, deleted_case = self.data_service.delete_case(self.selected_case_id)
                 if success:
                     from utils.logger import log_action
-                    log_action("GUI_ACTION", f"Case {self.selected_case_index} gelöscht: {deleted_case.get('quelle', '')} (über Lösch-Button)")
+                    log_action("GUI_ACTION", f"Case {self.selected_case_id} gelöscht: {deleted_case.get('quelle', '')} (über Lösch-Button)")
                     
                     # Zurück zum Dashboard
                     self.parent.show_dashboard_view()
@@ -393,8 +389,8 @@ class CaseEditorComponent:
     
     def refresh(self):
         """Case-Ansicht aktualisieren"""
-        if self.selected_case_index is not None:
-            self.load_case(self.selected_case_index)
+        if self.selected_case_id is not None:
+            self.load_case(self.selected_case_id)
     
     def toggle_edit_mode(self):
         """Zwischen Anzeige- und Edit-Modus wechseln"""
@@ -458,16 +454,15 @@ class CaseEditorComponent:
     
     def save_changes(self):
         """Änderungen speichern"""
-        if self.selected_case_index is None:
+        if self.selected_case_id is None:
             return
             
         try:
             # Aktuellen Case und Status holen
-            cases = self.data_service.get_cases()
-            if self.selected_case_index >= len(cases):
+            current_case = self.data_service.get_case(self.selected_case_id)
+            if current_case is None:
                 return
-                
-            current_case = cases[self.selected_case_index]
+            
             current_status = self.data_service.get_case_status(current_case)
             
             # Neue Werte aus Entry-Feldern holen
@@ -483,27 +478,29 @@ class CaseEditorComponent:
             old_fundstellen = current_case.get("fundstellen", "")
             values_changed = (new_quelle != old_quelle) or (new_fundstellen != old_fundstellen)
             
-            # Case aktualisieren
-            success = self.data_service.update_case(self.selected_case_index, {
-                "quelle": new_quelle,
-                "fundstellen": new_fundstellen
-            })
+            # Case aktualisieren - Update, Status-Wechsel und AFM-String in einem Schreibvorgang
+            with self.data_service.transaction():
+                success = self.data_service.update_case(self.selected_case_id, {
+                    "quelle": new_quelle,
+                    "fundstellen": new_fundstellen
+                })
+                
+                if success:
+                    # Automatischer Status-Wechsel für neue Cases oder erste Bearbeitung
+                    is_first_edit = self.data_service.is_first_edit(self.selected_case_id)
+                    is_new_case = (old_quelle == "" and old_fundstellen == "")  # Neuer leerer Case
+                    
+                    if values_changed and (is_first_edit or is_new_case):
+                        # Status automatisch auf "Bearbeitung" setzen
+                        status_success = self.data_service.advance_case_status(self.selected_case_id)
+                        if status_success:
+                            from utils.logger import log_action
+                            log_action("GUI_ACTION", f"Case {self.selected_case_id}: Automatischer Status-Wechsel NEU → Bearbeitung ({'neuer Case' if is_new_case else 'erste Bearbeitung'})")
+                    
+                    # AFM-String neu generieren
+                    self.data_service.regenerate_afm_string(self.selected_case_id)
             
             if success:
-                # Automatischer Status-Wechsel für neue Cases oder erste Bearbeitung
-                is_first_edit = self.data_service.is_first_edit(self.selected_case_index)
-                is_new_case = (old_quelle == "" and old_fundstellen == "")  # Neuer leerer Case
-                
-                if values_changed and (is_first_edit or is_new_case):
-                    # Status automatisch auf "Bearbeitung" setzen
-                    status_success = self.data_service.advance_case_status(self.selected_case_index)
-                    if status_success:
-                        from utils.logger import log_action
-                        log_action("GUI_ACTION", f"Case {self.selected_case_index}: Automatischer Status-Wechsel NEU → Bearbeitung ({'neuer Case' if is_new_case else 'erste Bearbeitung'})")
-                
-                # AFM-String neu generieren
-                self.data_service.regenerate_afm_string(self.selected_case_index)
-                
                 # Zurück zum Anzeige-Modus
                 self.edit_mode = False
                 self.is_editing = False
@@ -513,7 +510,7 @@ class CaseEditorComponent:
                 
                 # Logging
                 from utils.logger import log_action
-                log_action("GUI_ACTION", f"Case {self.selected_case_index} bearbeitet: Quelle='{new_quelle}', Fundstellen='{new_fundstellen}'")
+                log_action("GUI_ACTION", f"Case {self.selected_case_id} bearbeitet: Quelle='{new_quelle}', Fundstellen='{new_fundstellen}'")
                 
                 if values_changed and (is_first_edit or is_new_case):
                     if is_new_case:
@@ -538,10 +535,9 @@ class CaseEditorComponent:
     def cancel_edit(self):
         """Bearbeitung abbrechen"""
         # Ursprüngliche Werte wiederherstellen
-        if self.selected_case_index is not None:
-            cases = self.data_service.get_cases()
-            if self.selected_case_index < len(cases):
-                case = cases[self.selected_case_index]
+        if self.selected_case_id is not None:
+            case = self.data_service.get_case(self.selected_case_id)
+            if case is not None:
                 self.quelle_entry.delete(0, tk.END)
                 self.quelle_entry.insert(0, case.get("quelle", ""))
                 self.fundstellen_entry.delete(0, tk.END)
@@ -553,17 +549,16 @@ class CaseEditorComponent:
     
     def open_image_comparison(self):
         """Bildvergleich für aktuellen Case öffnen"""
-        if self.selected_case_index is not None:
-            cases = self.data_service.get_cases()
-            if self.selected_case_index < len(cases):
-                case = cases[self.selected_case_index]
+        if self.selected_case_id is not None:
+            case = self.data_service.get_case(self.selected_case_id)
+            if case is not None:
                 self.parent.show_image_viewer_with_case(case)
     
     def has_unsaved_changes(self):
         """Prüft ob ungespeicherte Änderungen vorhanden sind"""
         # Sicherheits-Checks
         if (not self.is_editing or 
-            self.selected_case_index is None or 
+            self.selected_case_id is None or 
             not self.quelle_entry or 
             not self.fundstellen_entry):
             return False
@@ -601,10 +596,10 @@ class CaseEditorComponent:
                 
         self.parent.show_dashboard_view()
     
-    def show(self, case_index):
+    def show(self, case_id):
         """Case-Editor anzeigen"""
         self.case_edit_frame.pack(fill="both", expand=True)
-        self.load_case(case_index)
+        self.load_case(case_id)
     
     def hide(self):
         """Case-Editor ausblenden"""
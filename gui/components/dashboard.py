@@ -4,6 +4,22 @@ Dashboard-Komponente für AFMTool1
 import tkinter as tk
 from tkinter import ttk
 
+# Zeilen, die je Seite in die Tabelle eingefügt (und dafür dekodiert) werden
+ROW_PAGE_SIZE = 100
+
+# Status-Priorität für die Reihenfolge der Tabelle
+STATUS_PRIORITY = {
+    "erfassung": 0,      # NEU - höchste Priorität
+    "verarbeitung": 1,   # Bearbeitung
+    "validierung": 2,    # Freigegeben
+    "archivierung": 3    # Abgeschlossen - niedrigste Priorität
+}
+
+# Anzeige für Status ohne Eintrag im status_mapping - sie erscheinen nach den bekannten
+UNMAPPED_STATUS_NAMES = {
+    "neu": "Ohne Zeitstempel"
+}
+
 class DashboardComponent:
     """Dashboard-Komponente mit Case-Tabelle und Buttons"""
     
@@ -13,6 +29,13 @@ class DashboardComponent:
         self.status_mapping = parent.status_mapping
         self.dashboard_frame = None
         self.tree = None
+        self.scrollbar = None
+        self.status_filter = None
+        # Zeilen der aktuellen Ansicht (Case-ID, Status) - eingefügt werden sie seitenweise
+        self.row_ids = []
+        self.rows_shown = 0
+        # Status je Filter-Eintrag (None = alle Cases)
+        self.filter_statuses = [None] + list(self.status_mapping)
         
     def create_view(self, container):
         """Dashboard-View erstellen"""
@@ -26,6 +49,16 @@ class DashboardComponent:
                                font=("Arial", 16, "bold"))
         title_label.pack()
         
+        # Status-Filter mit Live-Zählern aus dem Status-Index
+        filter_frame = ttk.Frame(self.dashboard_frame)
+        filter_frame.pack(fill="x", pady=(0, 10))
+        ttk.Label(filter_frame, text="Status-Filter:").pack(side="left", padx=(0, 5))
+        self.status_filter = ttk.Combobox(filter_frame, state="readonly", width=30)
+        self.status_filter.pack(side="left")
+        self.status_filter.bind("<<ComboboxSelected>>", lambda event: self.populate_table())
+        self.update_status_filter()
+        self.status_filter.current(0)
+        
         # Haupt-Container: Tabelle links, Konflikt-Panel rechts
         main_container = ttk.Frame(self.dashboard_frame)
         main_container.pack(fill="both", expand=True)
@@ -82,13 +115,13 @@ class DashboardComponent:
         self.tree.column("bildvergleich", width=100)
         self.tree.column("konflikt", width=100)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar - am Tabellenende wird die nächste Seite nachgeladen
+        self.scrollbar = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
         
         # Pack
         self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.scrollbar.pack(side="right", fill="y")
         
         # Event-Bindings
         self.tree.bind("<ButtonRelease-1>", self.on_case_single_click)
@@ -141,20 +174,19 @@ class DashboardComponent:
                 return
                 
             item = self.tree.item(selection[0])
-            case_index = int(item['tags'][0])
+            case_id = item['tags'][0]
             
-            print(f"   Case Index: {case_index}")
+            print(f"   Case ID: {case_id}")
             
             # Spalte 6 = "aktion" (→ Bearbeiten)
             if column_index == 6:
                 print(f"   ✅ BEARBEITEN-LINK - öffne Case Editor")
-                self.parent.edit_case(case_index)
+                self.parent.edit_case(case_id)
             # Spalte 7 = "bildvergleich" (🖼️ Bildvergleich)  
             elif column_index == 7:
                 print(f"   ✅ BILDVERGLEICH-LINK - öffne Image Viewer")
-                cases = self.data_service.get_cases()
-                if case_index < len(cases):
-                    case = cases[case_index]
+                case = self.data_service.get_case(case_id)
+                if case is not None:
                     self.parent.show_image_viewer_with_case(case)
         else:
             print(f"   ❌ Keine Selection")
@@ -164,80 +196,110 @@ class DashboardComponent:
         selection = self.tree.selection()
         if selection:
             item = self.tree.item(selection[0])
-            case_index = int(item['tags'][0])
-            self.parent.edit_case(case_index)
+            case_id = item['tags'][0]
+            self.parent.edit_case(case_id)
+    
+    def _status_info(self, status):
+        """Name und Emoji eines Status - unbekannte Status (z.B. "neu") erhalten einen Platzhalter"""
+        return self.status_mapping.get(status) or {"name": UNMAPPED_STATUS_NAMES.get(status, status), "emoji": "⚪"}
+    
+    def _status_order(self, status):
+        """Sortierschlüssel: Status-Priorität, unbekannte Status danach"""
+        return STATUS_PRIORITY.get(status, 99), status
+    
+    def update_status_filter(self):
+        """Filter-Einträge mit aktuellen Status-Zählern beschriften - auch für Status ohne Mapping"""
+        counts = self.data_service.get_status_counts()
+        selected = self.selected_status()
+        self.filter_statuses = [None] + sorted(set(self.status_mapping) | set(counts), key=self._status_order)
+        if self.status_filter is None:
+            return
+        
+        values = [f"Alle ({sum(counts.values())})"]
+        for status in self.filter_statuses[1:]:
+            status_info = self._status_info(status)
+            values.append(f"{status_info['emoji']} {status_info['name']} ({counts.get(status, 0)})")
+        
+        self.status_filter["values"] = values
+        self.status_filter.current(self.filter_statuses.index(selected) if selected in self.filter_statuses else 0)
+    
+    def selected_status(self):
+        """Im Filter gewählter Status (None = alle)"""
+        if self.status_filter is None:
+            return None
+        return self.filter_statuses[max(self.status_filter.current(), 0)]
     
     def populate_table(self):
-        """Tabelle mit Cases füllen - erweitert um UUID, Fallnummer und Status-Sortierung"""
+        """
+        Tabelle füllen - Reihenfolge aus dem Status-Index, dekodiert werden nur angezeigte Zeilen
+        
+        Sortiert nach Status-Priorität, innerhalb eines Status nach Fallnummer (aus dem Primärindex).
+        Weitere Zeilen werden seitenweise beim Scrollen ans Tabellenende eingefügt.
+        """
         # Alte Einträge löschen
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # Cases laden und mit fallnummer_verknuepfung.py verarbeiten
-        cases = self.data_service.get_cases()
-        
-        # Status-Priorität für Sortierung
-        status_priority = {
-            "erfassung": 0,      # NEU - höchste Priorität
-            "verarbeitung": 1,   # Bearbeitung
-            "validierung": 2,    # Freigegeben
-            "archivierung": 3    # Abgeschlossen - niedrigste Priorität
-        }
-        
-        # Cases mit erweiterten Informationen erstellen
-        enriched_cases = []
-        for i, case in enumerate(cases):
-            # UUID aus JSON oder generieren
-            uuid = case.get("uuid", self.generate_uuid_fallback(case))
-            
-            # Fallnummer sicherstellen
-            fallnummer = case.get("fallnummer", "LEER")
-            if not fallnummer or fallnummer.strip() == "":
-                fallnummer = f"AUTO-{uuid}"
-            
-            # Status ermitteln
-            status = self.data_service.get_case_status(case)
-            status_info = self.status_mapping[status]
-            
-            # Konflikt-Status prüfen
-            konflikt_status = self._check_conflict_status(case)
-            
-            enriched_cases.append({
-                "index": i,
-                "case": case,
-                "uuid": uuid,
-                "fallnummer": fallnummer,
-                "status": status,
-                "status_priority": status_priority.get(status, 99),
-                "status_display": f"{status_info['emoji']} {status_info['name']}",
-                "zeitstempel_count": len(case.get("zeitstempel", [])),
-                "conflict": konflikt_status
-            })
-        
-        # Sortierung: 1. Status-Priorität, 2. Fallnummer
-        enriched_cases.sort(key=lambda x: (x["status_priority"], x["fallnummer"]))
-        
-        # Tabelle füllen
-        for case_data in enriched_cases:
-            case = case_data["case"]
-            
-            self.tree.insert("", "end", values=(
-                case_data["uuid"],
-                case_data["fallnummer"],
-                case.get("quelle", "")[:30] + "..." if len(case.get("quelle", "")) > 30 else case.get("quelle", ""),
-                case.get("fundstellen", "")[:30] + "..." if len(case.get("fundstellen", "")) > 30 else case.get("fundstellen", ""),
-                case_data["status_display"],
-                case_data["zeitstempel_count"],
-                "→ Bearbeiten",
-                "🖼️ Bildvergleich",
-                case_data["conflict"]
-            ), tags=(str(case_data["index"]), case_data["conflict"]))
+        # Zähler aktualisieren und nur die IDs des gewählten Status holen (ohne Dekodierung)
+        self.update_status_filter()
+        status_filter = self.selected_status()
+        statuses = [status_filter] if status_filter is not None else self.filter_statuses[1:]
+        self.row_ids = [
+            (case_id, status)
+            for status in statuses
+            for case_id in self.data_service.get_case_ids_by_status(status, by_fallnummer=True)
+        ]
+        self.rows_shown = 0
         
         # Tag-Konfiguration für Konflikte
         self.tree.tag_configure("conflict", background="#FFE6E6")  # Hellrot für Konflikte
         self.tree.tag_configure("no_conflict", background="white")
         
-        print(f"✅ {len(enriched_cases)} Cases geladen und nach Status sortiert")
+        self.show_more_rows()
+        print(f"✅ {len(self.row_ids)} Cases nach Status sortiert ({self.rows_shown} angezeigt)")
+    
+    def show_more_rows(self):
+        """Nächste Seite der Tabelle einfügen - dekodiert nur diese Cases"""
+        page = self.row_ids[self.rows_shown:self.rows_shown + ROW_PAGE_SIZE]
+        self.rows_shown += len(page)
+        for case_id, status in page:
+            case = self.data_service.get_case(case_id)
+            if case is not None:
+                self._insert_row(case_id, case, status)
+    
+    def on_tree_scroll(self, first, last):
+        """Scrollbar nachführen und am Tabellenende die nächste Seite laden"""
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if float(last) >= 1.0 and self.rows_shown < len(self.row_ids):
+            self.show_more_rows()
+    
+    def _insert_row(self, case_id, case, status):
+        """Eine Tabellenzeile für einen Case einfügen"""
+        # UUID aus JSON oder generieren (Fallback nur wenn nötig)
+        uuid = case.get("uuid") or self.generate_uuid_fallback(case)
+        
+        # Fallnummer sicherstellen
+        fallnummer = case.get("fallnummer", "LEER")
+        if not fallnummer or fallnummer.strip() == "":
+            fallnummer = f"AUTO-{uuid}"
+        
+        status_info = self._status_info(status)
+        konflikt_status = self._check_conflict_status(case)
+        quelle = case.get("quelle", "")
+        fundstellen = case.get("fundstellen", "")
+        
+        self.tree.insert("", "end", values=(
+            uuid,
+            fallnummer,
+            quelle[:30] + "..." if len(quelle) > 30 else quelle,
+            fundstellen[:30] + "..." if len(fundstellen) > 30 else fundstellen,
+            f"{status_info['emoji']} {status_info['name']}",
+            len(case.get("zeitstempel", [])),
+            "→ Bearbeiten",
+            "🖼️ Bildvergleich",
+            konflikt_status
+        ), tags=(case_id, konflikt_status))
     
     def _check_conflict_status(self, case):
         """Prüft ob Case einen Konflikt hat"""
@@ -266,18 +328,18 @@ class DashboardComponent:
         selection = self.tree.selection()
         if selection:
             item = self.tree.item(selection[0])
-            case_index = int(item['tags'][0])
-            self.parent.edit_case(case_index)
+            case_id = item['tags'][0]
+            self.parent.edit_case(case_id)
     
     def new_case(self):
         """Neuen Case erstellen - mit Validierung im Editor"""
         # Leeren Case erstellen und direkt zum Editor mit Validierung
-        case_index = self.data_service.create_empty_case()
-        if case_index is not None:
+        case_id = self.data_service.create_empty_case()
+        if case_id is not None:
             from utils.logger import log_action
-            log_action("GUI_ACTION", f"Neuer Case erstellt (Index: {case_index})")
+            log_action("GUI_ACTION", f"Neuer Case erstellt (ID: {case_id})")
             # Zum Case-Editor - dort ist bereits Validierung beim Speichern
-            self.parent.edit_new_case(case_index)
+            self.parent.edit_new_case(case_id)
     
     def refresh(self):
         """Dashboard aktualisieren"""
@@ -117,10 +117,10 @@ class AFMToolGUI:
         self.dashboard.refresh()
         self.current_view = "dashboard"
     
-    def show_case_edit_view(self, case_index):
+    def show_case_edit_view(self, case_id):
         """Case-Bearbeitung-Ansicht anzeigen"""
         self.notebook.select(1)
-        self.case_editor.show(case_index)
+        self.case_editor.show(case_id)
         self.current_view = "case_edit"
     
     def show_image_viewer_with_case(self, case_data):
@@ -143,21 +143,21 @@ class AFMToolGUI:
         elif selected_tab == 2:
             self.current_view = "image_viewer"
     
-    def edit_case(self, case_index):
+    def edit_case(self, case_id):
         """Case zur Bearbeitung öffnen"""
-        self.show_case_edit_view(case_index)
-        log_action("GUI_ACTION", f"Case {case_index} zur Bearbeitung geöffnet")
+        self.show_case_edit_view(case_id)
+        log_action("GUI_ACTION", f"Case {case_id} zur Bearbeitung geöffnet")
     
-    def edit_new_case(self, case_index):
+    def edit_new_case(self, case_id):
         """Neuen Case zur Bearbeitung öffnen - automatisch im Edit-Modus"""
-        self.show_case_edit_view(case_index)
+        self.show_case_edit_view(case_id)
         # Case-Editor in Edit-Modus setzen und Tracking aktivieren
         self.case_editor.edit_mode = True
         self.case_editor.is_editing = True
         self.case_editor.original_quelle = self.case_editor.quelle_entry.get().strip() if self.case_editor.quelle_entry else ""
         self.case_editor.original_fundstellen = self.case_editor.fundstellen_entry.get().strip() if self.case_editor.fundstellen_entry else ""
         self.case_editor.update_ui_mode()
-        log_action("GUI_ACTION", f"Neuer Case {case_index} im Edit-Modus geöffnet")
+        log_action("GUI_ACTION", f"Neuer Case {case_id} im Edit-Modus geöffnet")
     
     def generate_report(self):
         """PDF-Report generieren"""
@@ -0,0 +1,104 @@
+"""
+Case Cache für AFMTool1
+Hält die dekodierte Case-Liste im Speicher und validiert sie über einen
+Datei-Fingerprint (mtime + Größe oder Inhalts-Hash) gegen den Storage.
+"""
+
+class CaseCache:
+    """In-Process Cache der dekodierten Cases mit Fingerprint-Invalidierung"""
+
+    def __init__(self, storage, validation="stat"):
+        self.storage = storage
+        self.validation = validation
+        self._cases = None
+        self._by_id = {}
+        # Listenposition je Case-Objekt (id(case) → Index) - nach Entfernen lazy neu aufgebaut
+        self._positions = None
+        self._fingerprint = None
+        self.hits = 0
+        self.misses = 0
+
+    def _current_fingerprint(self):
+        """Fingerprint des Storage gemäß Validierungsmodus"""
+        if self.validation == "hash":
+            return self.storage.content_hash()
+        return self.storage.fingerprint()
+
+    def is_current(self):
+        """True wenn der Cache geladen ist und zum Storage passt"""
+        return self._cases is not None and self._current_fingerprint() == self._fingerprint
+
+    def get_cases(self):
+        """Gecachte Case-Liste - lädt nur neu, wenn sich die Dateien geändert haben"""
+        if self.is_current():
+            self.hits += 1
+            return self._cases
+
+        self.misses += 1
+        fingerprint = self._current_fingerprint()
+        self._set_cases(self.storage.load_pure_afm_data())
+        self._fingerprint = fingerprint
+        return self._cases
+
+    def get_case(self, case_id):
+        """Case per ID aus dem Cache - None wenn nicht geladen oder veraltet"""
+        if not self.is_current():
+            return None
+        self.hits += 1
+        return self._by_id.get(case_id)
+
+    def _set_cases(self, cases):
+        """Liste und ID-Lookup setzen"""
+        self._cases = list(cases)
+        self._by_id = {case.get("uuid"): case for case in self._cases}
+        self._positions = None
+
+    def put(self, case_id, case):
+        """Case in-place einfügen oder ersetzen"""
+        if self._cases is None:
+            return
+        existing = self._by_id.get(case_id)
+        if existing is None:
+            self._cases.append(case)
+            if self._positions is not None:
+                self._positions[id(case)] = len(self._cases) - 1
+        elif existing is not case:
+            position = self._position(existing)
+            self._cases[position] = case
+            del self._positions[id(existing)]
+            self._positions[id(case)] = position
+        self._by_id[case_id] = case
+
+    def remove(self, case_id):
+        """Case in-place entfernen - O(N) wie das Löschen aus der Liste, Positionen werden neu aufgebaut"""
+        if self._cases is None:
+            return
+        existing = self._by_id.pop(case_id, None)
+        if existing is not None:
+            del self._cases[self._position(existing)]
+            self._positions = None
+
+    def _position(self, case):
+        """Listenposition per Identität (nicht per Gleichheit) - O(1) über die Positionstabelle"""
+        if self._positions is None:
+            self._positions = {id(cached): i for i, cached in enumerate(self._cases)}
+        return self._positions[id(case)]
+
+    def commit(self, was_current=True):
+        """Nach eigenen Schreibvorgängen neuen Fingerprint übernehmen"""
+        if self._cases is not None and was_current:
+            self._fingerprint = self._current_fingerprint()
+        else:
+            self.invalidate()
+
+    def replace(self, cases):
+        """Cache nach vollständigem Snapshot durch neue Liste ersetzen"""
+        self._set_cases(cases)
+        self._fingerprint = self._current_fingerprint()
+
+    def invalidate(self):
+        """Cache verwerfen - nächster Zugriff lädt neu"""
+        self._cases = None
+        self._by_id = {}
+        self._positions = None
+        self._fingerprint = None
@@ -1,8 +1,11 @@
 """
 Data Service Layer für AFMTool1 - Pure AFM Implementation
 """
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 import sys
@@ -10,83 +13,254 @@ import sys
 # Utils importieren
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from utils.afm_pure import AFMPureStorage
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure_v2 import AFMPureV2Storage, V2_SUFFIX, convert_v1_to_v2
+from utils.afm_sqlite import AFMSQLiteStorage, migrate_to_sqlite
+from utils.afm_utils import get_case_status
+from utils.afm_case import AFMCase
+from utils.afm_import import import_afm_strings
+from utils.atomic_write import sync_pending
+from utils.case_index import ensure_case_id
 from .export_service import AFMExportService
+from .case_cache import CaseCache
+
+STORAGE_MODES = ("snapshot", "journal", "v2", "sqlite")
+# Standard: "snapshot" (eine cases.json wie bisher) - "journal", "v2" und "sqlite" legen weitere Dateien an
+STORAGE_MODE = os.environ.get("AFM_STORAGE_MODE", "snapshot")
 
 class DataService:
     """Service Layer für Pure AFM-String Operationen"""
     
-    def __init__(self, cases_file):
+    def __init__(self, cases_file, storage_mode=None, cache_validation="stat", flush_delay=None,
+                 durability=None):
+        """
+        Args:
+            cases_file: Pfad zur cases.json
+            storage_mode (str): "snapshot", "journal", "v2" oder "sqlite" (None = AFM_STORAGE_MODE)
+            cache_validation (str): "stat" oder "hash"
+            flush_delay (float): Sekunden bis zum gebündelten Schreiben (None = sofort)
+            durability (str): fsync-Verhalten "always", "batched" oder "never" (None = AFM_DURABILITY)
+        """
         self.cases_file = cases_file
-        self.pure_storage = AFMPureStorage(cases_file)
+        storage_mode = storage_mode or STORAGE_MODE
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unbekannter Storage-Modus '{storage_mode}' - erlaubt: {', '.join(STORAGE_MODES)}")
+        if storage_mode == "journal":
+            self.pure_storage = AFMJournalStorage(cases_file)
+        elif storage_mode == "v2":
+            v2_file = Path(cases_file).with_suffix(V2_SUFFIX)
+            if not v2_file.exists() and Path(cases_file).exists():
+                convert_v1_to_v2(cases_file, v2_file)
+            self.pure_storage = AFMPureV2Storage(v2_file)
+        elif storage_mode == "sqlite":
+            sqlite_file = Path(cases_file).with_suffix('.sqlite')
+            if not sqlite_file.exists() and Path(cases_file).exists():
+                migrate_to_sqlite(cases_file, sqlite_file)
+            self.pure_storage = AFMSQLiteStorage(sqlite_file)
+        else:
+            self.pure_storage = AFMPureStorage(cases_file)
+        self.pure_storage.durability = durability
         self.exports_dir = Path(cases_file).parent / "exports"
         self.exports_dir.mkdir(exist_ok=True)
-        self.export_service = AFMExportService(cases_file, self.exports_dir)
+        self.export_service = AFMExportService(cases_file, self.exports_dir, storage=self.pure_storage)
+        self.case_cache = CaseCache(self.pure_storage, validation=cache_validation)
+        
+        # Unit of Work: ausstehende Änderungen je Case-ID (op, case)
+        self.flush_delay = flush_delay
+        self._pending = {}
+        self._transaction_depth = 0
+        self._flush_timer = None
+        self._lock = threading.RLock()
         
         print(f"📂 [PURE AFM] Storage: {self.pure_storage.storage_file}")
         self._initialize_pure_data()
     
     def _initialize_pure_data(self):
-        """Lädt Pure AFM-Daten"""
+        """Storage initialisieren - Case-Anzahl aus den Metadaten (ohne Dekodierung)"""
         try:
             print("🔄 [PURE AFM] Initialisiere Pure AFM System...")
-            cases = self.pure_storage.load_pure_afm_data()
-            print(f"✅ [PURE AFM] {len(cases)} Cases aus AFM-Strings geladen")
+            # Nur die Metadaten - Cases werden beim ersten Zugriff geladen
+            case_count = self.pure_storage.get_cases_count()
+            print(f"✅ [PURE AFM] {case_count} Cases verfügbar")
         except Exception as e:
             print(f"⚠️ [PURE AFM] Initialisierung: {e}")
     
     def get_cases(self):
-        """Cases aus Pure AFM-Strings laden"""
-        return self.pure_storage.load_pure_afm_data()
+        """Cases aus dem Cache (dekodiert nur nach Dateiänderungen neu)"""
+        with self._lock:
+            if self._pending and not self.case_cache.is_current():
+                self.flush()
+            return self.case_cache.get_cases()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Bündelt alle Änderungen im Block zu einem Schreibvorgang
+        
+        Verschachtelte Transaktionen schreiben erst beim Verlassen der äußersten.
+        """
+        with self._lock:
+            self._transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self._schedule_flush()
+    
+    def _defer(self, op, case_id, case=None):
+        """Änderung vormerken und mit bereits ausstehenden Änderungen zusammenfassen"""
+        with self._lock:
+            pending = self._pending.get(case_id)
+            if pending is None:
+                self._pending[case_id] = (op, case)
+            elif op == 'del':
+                # Nie geschriebener Case: Anlegen und Löschen heben sich auf
+                if pending[0] == 'add':
+                    del self._pending[case_id]
+                else:
+                    self._pending[case_id] = ('del', None)
+            else:
+                # add + set bleibt add (mit aktuellem Case-Inhalt)
+                self._pending[case_id] = (pending[0], case)
+            
+            if not self._transaction_depth:
+                self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """Sofort schreiben oder (mit flush_delay) den Debounce-Timer neu starten"""
+        if not self._pending:
+            return
+        if not self.flush_delay:
+            self.flush()
+            return
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+    
+    def flush(self):
+        """
+        Ausstehende Änderungen in einem Schreibvorgang persistieren
+        
+        Returns:
+            int: Anzahl geschriebener Änderungen
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return 0
+            
+            pending = self._pending
+            operations = [(op, case_id, case) for case_id, (op, case) in pending.items()]
+            self._pending = {}
+            was_current = self.case_cache.is_current()
+            try:
+                self.pure_storage.write_batch(operations)
+            except Exception:
+                # Änderungen bleiben vorgemerkt, der Cache zeigt wieder den Storage-Stand
+                self._pending = pending
+                self.case_cache.invalidate()
+                raise
+            self.case_cache.commit(was_current)
+            return len(operations)
     
     def _save_cases(self, data):
         """Cases in Pure AFM Format speichern"""
         try:
+            self.flush()
             cases = data.get("cases", [])
             self.pure_storage.save_pure_afm_data(cases)
+            self.case_cache.replace(cases)
             print(f"💾 [PURE AFM] {len(cases)} Cases als AFM-Strings gespeichert")
         except Exception as e:
             print(f"❌ [PURE AFM] Speichern fehlgeschlagen: {e}")
     
     def get_case_status(self, case):
         """Status eines Cases ermitteln anhand der Zeitstempel"""
-        timestamps = case.get("zeitstempel", [])
-        if not timestamps:
-            return "neu"
-        
-        if any("archivierung:" in ts for ts in timestamps):
-            return "archivierung"
-        elif any("validierung:" in ts for ts in timestamps):
-            return "validierung"
-        elif any("verarbeitung:" in ts for ts in timestamps):
-            return "verarbeitung"
-        else:
-            return "erfassung"
+        return get_case_status(case)
+    
+    def get_status_counts(self):
+        """Case-Anzahl je Status aus dem materialisierten Status-Index des Storage"""
+        with self._lock:
+            self.flush()
+            return self.pure_storage.count_by_status()
     
-    def update_case(self, case_index, updates):
+    def get_case_ids_by_status(self, status, by_fallnummer=False):
+        """IDs der Cases eines Status in Speicherreihenfolge (by_fallnummer: nach Fallnummer) - ohne Dekodierung"""
+        with self._lock:
+            self.flush()
+            return self.pure_storage.case_ids_by_status(status, by_fallnummer=by_fallnummer)
+    
+    def get_cases_by_status(self, status):
+        """Cases eines Status - nur diese werden aus Cache oder Storage geholt"""
+        cases = (self.get_case(case_id) for case_id in self.get_case_ids_by_status(status))
+        return [case for case in cases if case is not None]
+    
+    def get_case(self, case_id):
+        """Einzelnen Case per ID - ausstehend, aus dem Cache oder per O(1) Index-Zugriff"""
+        with self._lock:
+            pending = self._pending.get(case_id)
+            if pending is not None:
+                return pending[1]
+            case = self.case_cache.get_case(case_id)
+            if case is None:
+                case = self.pure_storage.get_case(case_id)
+            return case
+    
+    def _get_case_copy(self, case_id):
+        """
+        Bearbeitbare Kopie eines Cases - Änderungen erreichen Cache und ausstehende
+        Änderungen erst über _store_case, ein fehlgeschlagenes Schreiben hinterlässt
+        keinen halb geänderten Case im Cache
+        """
+        case = self.get_case(case_id)
+        if case is None:
+            return None
+        return AFMCase(copy.deepcopy(case))
+    
+    def _store_case(self, case_id, case):
+        """Case per ID vormerken und Cache in-place nachführen"""
+        with self._lock:
+            self.case_cache.put(case_id, case)
+            self._defer('set', case_id, case)
+    
+    def _append_case(self, case):
+        """Neuen Case vormerken und Cache in-place nachführen"""
+        with self._lock:
+            case_id = ensure_case_id(case, taken=self._pending)
+            self.case_cache.put(case_id, case)
+            self._defer('add', case_id, case)
+            return case_id
+    
+    def update_case(self, case_id, updates):
         """Case aktualisieren und als AFM-String speichern"""
-        cases = self.get_cases()
-        if case_index >= len(cases):
+        case = self._get_case_copy(case_id)
+        if case is None:
             return False
             
-        case = cases[case_index]
         for key, value in updates.items():
             case[key] = value
         
-        self._save_cases({"cases": cases})
+        self._store_case(case_id, case)
         return True
     
-    def regenerate_afm_string(self, case_index):
+    def regenerate_afm_string(self, case_id):
         """AFM-String neu generieren (Pure AFM: automatisch)"""
         return True
     
-    def delete_case(self, case_index):
+    def delete_case(self, case_id):
         """Case löschen"""
-        cases = self.get_cases()
-        if case_index >= len(cases):
+        deleted_case = self.get_case(case_id)
+        if deleted_case is None:
             return False, None
-            
-        deleted_case = cases.pop(case_index)
-        self._save_cases({"cases": cases})
+        
+        with self._lock:
+            self.case_cache.remove(case_id)
+            self._defer('del', case_id)
         return True, deleted_case
     
     def create_case(self, quelle, fundstellen):
@@ -97,55 +271,48 @@ class DataService:
             "zeitstempel": [f"erfassung:{datetime.now().strftime('%Y-%m-%dT%H')}"]
         }
         
-        cases = self.get_cases()
-        cases.append(new_case)
-        self._save_cases({"cases": cases})
+        self._append_case(new_case)
         return new_case
     
     def create_empty_case(self):
-        """Leeren Case erstellen"""
+        """Leeren Case erstellen und seine ID zurückgeben"""
         new_case = {
             "quelle": "",
             "fundstellen": "",
             "zeitstempel": [f"erfassung:{datetime.now().strftime('%Y-%m-%dT%H')}"]
         }
         
-        cases = self.get_cases()
-        cases.append(new_case)
-        self._save_cases({"cases": cases})
-        return len(cases) - 1
+        return self._append_case(new_case)
     
     def cleanup_empty_cases(self):
         """Leere Cases entfernen"""
-        cases = self.get_cases()
-        cleaned_cases = [
-            case for case in cases 
-            if case.get('quelle', '').strip() or case.get('fundstellen', '').strip()
+        empty_ids = [
+            case.get("uuid") for case in self.get_cases()
+            if not (case.get('quelle', '').strip() or case.get('fundstellen', '').strip())
         ]
         
-        if len(cleaned_cases) != len(cases):
-            self._save_cases({"cases": cleaned_cases})
+        with self.transaction():
+            for case_id in empty_ids:
+                self.delete_case(case_id)
     
-    def is_first_edit(self, case_index):
+    def is_first_edit(self, case_id):
         """Prüfen ob ein Case das erste Mal bearbeitet wird"""
-        cases = self.get_cases()
-        if case_index >= len(cases):
+        case = self.get_case(case_id)
+        if case is None:
             return False
             
-        case = cases[case_index]
         current_status = self.get_case_status(case)
         
         # Case ist bei "erfassung" und hat nur einen Zeitstempel
         return (current_status == "erfassung" and 
                 len(case.get("zeitstempel", [])) == 1)
     
-    def advance_case_status(self, case_index):
+    def advance_case_status(self, case_id):
         """Case zum nächsten Status weiterschalten"""
-        cases = self.get_cases()
-        if case_index >= len(cases):
+        case = self._get_case_copy(case_id)
+        if case is None:
             return False
             
-        case = cases[case_index]
         current_status = self.get_case_status(case)
         
         # Status-Mapping für nächsten Schritt
@@ -163,16 +330,15 @@ class DataService:
         case["zeitstempel"].append(new_timestamp)
         
         # Speichern
-        self._save_cases({"cases": cases})
+        self._store_case(case_id, case)
         return True
     
-    def retreat_case_status(self, case_index):
+    def retreat_case_status(self, case_id):
         """Case zum vorherigen Status zurückschalten"""
-        cases = self.get_cases()
-        if case_index >= len(cases):
+        case = self._get_case_copy(case_id)
+        if case is None:
             return False
             
-        case = cases[case_index]
         current_status = self.get_case_status(case)
         
         # Status-Mapping für vorherigen Schritt
@@ -190,23 +356,35 @@ class DataService:
         case["zeitstempel"] = [ts for ts in timestamps if not ts.startswith(f"{current_status}:")]
         
         # Speichern
-        self._save_cases({"cases": cases})
+        self._store_case(case_id, case)
         return True
     
     def export_to_json(self):
         """Export erstellen"""
+        self.flush()
         return self.export_service.create_export()
     
     def import_from_json(self, file_path):
-        """Import aus Datei"""
-        cases = self.export_service.load_export_cases(Path(file_path))
-        if cases:
-            self._save_cases({"cases": cases})
-        return len(cases)
+        """
+        Import aus Datei - parallel geprüft, gegen den Storage dedupliziert, ein Schreibvorgang
+        
+        Returns:
+            int: Anzahl neuer und geänderter Cases
+        """
+        try:
+            self.flush()
+            chunks = self.export_service.iter_import_chunks(Path(file_path))
+            report = import_afm_strings(self.pure_storage, chunks, workers=self.pure_storage.decode_workers)
+        except (OSError, ValueError) as e:
+            print(f"❌ [IMPORT] Import fehlgeschlagen: {e}")
+            return 0
+        self.case_cache.invalidate()
+        return report["inserted"] + report["updated"]
     
     def sync_session_data(self):
         """Session-Daten synchronisieren (Pure AFM: direkt persistent)"""
         try:
+            self.flush()
             cases = self.get_cases()
             print(f"🔄 [SYNC] Pure AFM System: {len(cases)} Cases synchronisiert")
             return True, f"✅ {len(cases)} Cases synchronisiert"
@@ -216,6 +394,15 @@ class DataService:
     def sync_and_shutdown(self):
         """Synchronisieren und herunterfahren"""
         success, message = self.sync_session_data()
+        try:
+            self.flush()
+            folded = self.pure_storage.compact()
+            self.case_cache.commit()
+            sync_pending()
+            if folded:
+                print(f"🗜️ [SHUTDOWN] {folded} Journal-Einträge in cases.json übernommen")
+        except Exception as e:
+            print(f"⚠️ [SHUTDOWN] Journal-Kompaktierung fehlgeschlagen: {e}")
         if success:
             print("🔄 [SHUTDOWN] Pure AFM Session beendet")
         return success, message
@@ -2,7 +2,6 @@
 Data Service Layer für AFMTool1
 Pure AFM-String basierte Datenoperationen
 """
-import json
 import os
 from pathlib import Path
 from datetime import datetime
@@ -11,6 +10,9 @@ import sys
 # Utils importieren
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from utils.afm_pure import AFMPureStorage
+from utils.afm_utils import update_case_afm_string
+from utils.afm_timestamps import case_timestamps
+from utils.session_overlay import AFMSessionOverlay
 from .export_service import AFMExportService
 
 class DataService:
@@ -29,8 +31,8 @@ class DataService:
         self.session_temp_dir = Path(tempfile.gettempdir()) / "afmtool_session" / f"session_{os.getpid()}"
         self.session_temp_dir.mkdir(parents=True, exist_ok=True)
         
-        # Lokale AFM-Datei in Session-Verzeichnis
-        self.local_afm_file = self.session_temp_dir / "afm_strings_local.json"
+        # Session-Overlay: nur berührte Cases als Delta über dem Storage
+        self.session_overlay = AFMSessionOverlay(self.session_temp_dir / "session_overlay.json")
         
         # Permanente Verzeichnisse
         self.exports_dir.mkdir(exist_ok=True)
@@ -44,71 +46,34 @@ class DataService:
         self._initialize_pure_data()
     
     def _initialize_pure_data(self):
-        """Lädt Pure AFM-Daten"""
+        """Storage initialisieren - Case-Anzahl aus den Metadaten (ohne Dekodierung)"""
         try:
             print("🔄 [PURE AFM] Initialisiere Pure AFM System...")
-            cases = self.pure_storage.load_pure_afm_data()
-            print(f"✅ [PURE AFM] {len(cases)} Cases aus AFM-Strings geladen")
+            case_count = self.pure_storage.get_cases_count()
+            print(f"✅ [PURE AFM] {case_count} Cases verfügbar")
         except Exception as e:
             print(f"⚠️ [PURE AFM] Initialisierung: {e}")
     
+    def _initialize_local_data(self):
+        """Session neu beginnen - leeres Overlay über dem aktuellen Storage"""
+        self.session_overlay.clear()
+        print(f"✅ [SESSION] Overlay zurückgesetzt ({self.pure_storage.get_cases_count()} Cases im Storage)")
+
     def get_cases(self):
-        """Cases aus Pure AFM-Strings laden"""
-        return self.pure_storage.load_pure_afm_data()
-            success, result = self.export_service.create_export()
-            if not success:
-                print(f"❌ [EXPORT] Export-Fehler: {result}")
-                return
-            
-            print(f"✅ [EXPORT] AFM-Export erstellt: {result}")
-                
-            # 2. Export-Daten in lokale Datei kopieren
-            export_cases = self.export_service.load_export_cases()
-            if export_cases:
-                self._save_local_afm_data(export_cases)
-                print(f"✅ [IMPORT] Lokale AFM-Datei initialisiert ({len(export_cases)} Cases)")
-            else:
-                print("⚠️ [IMPORT] Keine Export-Daten gefunden")
-                
-        except Exception as e:
-            print(f"⚠️ Initialisierung fehlgeschlagen: {e}")
-    
-    def get_cases(self):
-        """Cases laden - Priorität: Lokale AFM-Datei → Fallback: Original"""
-        try:
-            # Priorität 1: Aus lokaler AFM-Datei laden
-            if self.local_afm_file.exists():
-                with open(self.local_afm_file, 'r', encoding='utf-8') as f:
-                    local_data = json.load(f)
-                    return local_data.get("cases", [])
-                    
-            # Fallback: Direkt aus cases.json laden  
-            with open(self.cases_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("cases", [])
-                
-        except FileNotFoundError:
-            return []
-    
+        """Cases laden - Storage-Cases mit dem Session-Overlay darüber"""
+        return self.session_overlay.apply(self.pure_storage.load_pure_afm_data())
+
     def get_case_count(self):
-        """Case-Anzahl ermitteln"""
-        return len(self.get_cases())
+        """Case-Anzahl ermitteln - Metadaten plus Session-Delta (ohne Laden)"""
+        return self.pure_storage.get_cases_count() + self.session_overlay.count_delta()
     
     def get_case_status(self, case):
         """Aktuellen Status eines Cases ermitteln"""
         if not case.get("zeitstempel"):
             return "erfassung"  # Neu erstellte Cases sind NEU
         
-        # Letzten Zeitstempel finden
-        timestamps = case["zeitstempel"]
-        if any("archivierung:" in ts for ts in timestamps):
-            return "archivierung"
-        elif any("validierung:" in ts for ts in timestamps):
-            return "validierung"
-        elif any("verarbeitung:" in ts for ts in timestamps):
-            return "verarbeitung"
-        else:
-            return "erfassung"
+        # Höchster Workflow-Zeitstempel (einmal geparst)
+        return case_timestamps(case).status
     
     def advance_case_status(self, case_index):
         """Case zum nächsten Status weiterschalten (nur bis Freigegeben)"""
@@ -141,8 +106,7 @@ class DataService:
         update_case_afm_string(updated_case)
         
         # Speichern
-        cases[case_index] = updated_case
-        self._save_cases({"cases": cases})
+        self._save_cases([("set", updated_case)])
         return True
     
     def retreat_case_status(self, case_index):
@@ -174,7 +138,7 @@ class DataService:
         update_case_afm_string(case)
         
         # Speichern
-        self._save_cases({"cases": cases})
+        self._save_cases([("set", case)])
         return True
     
     def create_case(self, quelle, fundstellen):
@@ -196,9 +160,7 @@ class DataService:
         # AFM-String generieren
         update_case_afm_string(validated_case)
         
-        cases = self.get_cases()
-        cases.append(validated_case)
-        self._save_cases({"cases": cases})
+        self._save_cases([("add", validated_case)])
         return validated_case
     
     def create_empty_case(self):
@@ -223,85 +185,55 @@ class DataService:
         # Leeren AFM-String setzen
         validated_case["afm_string"] = ""
         
-        cases = self.get_cases()
-        cases.append(validated_case)
-        self._save_cases({"cases": cases})
+        self._save_cases([("add", validated_case)])
         
-        # Index des neuen Cases zurückgeben
-        return len(cases) - 1
+        # Index des neuen Cases zurückgeben (neue Cases stehen am Ende)
+        return self.get_case_count() - 1
     
     def cleanup_empty_cases(self):
         """Entfernt alle Cases mit leeren quelle UND fundstellen Feldern"""
         cases = self.get_cases()
         
-        # Nur Cases behalten die mindestens ein gefülltes Feld haben
-        cleaned_cases = [
+        # Cases ohne gefülltes Feld entfernen
+        empty_cases = [
             case for case in cases 
-            if case.get('quelle', '').strip() or case.get('fundstellen', '').strip()
+            if not (case.get('quelle', '').strip() or case.get('fundstellen', '').strip())
         ]
         
         # Nur speichern wenn sich was geändert hat
-        if len(cleaned_cases) != len(cases):
-            self._save_cases({"cases": cleaned_cases})
+        if empty_cases:
+            self._save_cases([("del", case) for case in empty_cases])
     
-    def _save_cases(self, data):
-        """Cases speichern - nur in lokale AFM-Datei (Session-basiert) mit AFM-String-Schutz"""
+    def _save_cases(self, changes):
+        """Geänderte Cases speichern - nur als Delta im Session-Overlay mit AFM-String-Schutz"""
         try:
-            cases = data.get("cases", [])
+            cases = [case for op, case in changes if op != "del"]
             
-            # AUTO-SCHUTZ: AFM-Strings regenerieren falls fehlend
+            # AUTO-SCHUTZ: AFM-Strings regenerieren falls fehlend (nur berührte Cases)
             self._ensure_afm_strings(cases)
             
-            # Nur lokale AFM-Datei aktualisieren
-            self._save_local_afm_data(cases)
-            print(f"💾 [SESSION] {len(cases)} Cases in Session-Cache gespeichert")
+            for op, case in changes:
+                self.session_overlay.record(op, case)
+            self.session_overlay.save()
+            print(f"💾 [SESSION] {len(changes)} Änderungen im Session-Overlay "
+                  f"({len(self.session_overlay.changes)} Cases berührt)")
                 
         except Exception as e:
             print(f"⚠️ Session-Speicher-Fehler: {e}")
     
     def _ensure_afm_strings(self, cases):
-        """Stellt sicher, dass alle Cases AFM-Strings haben - AUTO-REPARATUR"""
-        from utils.afm_utils import update_case_afm_string
+        """Stellt sicher, dass alle Cases aktuelle AFM-Strings haben - nur fehlende oder geänderte"""
+        from utils.afm_utils import update_case_afm_string, needs_afm_string
         
         missing_count = 0
         for i, case in enumerate(cases):
-            if not case.get("afm_string"):
+            if needs_afm_string(case):
                 cases[i] = update_case_afm_string(case)
                 missing_count += 1
         
         if missing_count > 0:
             print(f"🔧 [AUTO-FIX] {missing_count} AFM-Strings automatisch regeneriert")
     
-    def _save_local_afm_data(self, cases):
-        """Speichert Cases in lokale AFM-Datei"""
-        try:
-            print(f"💾 [SAVE] Speichere {len(cases)} Cases in lokale AFM-Datei...")
-            
-            # AFM-Strings aus Cases extrahieren
-            afm_strings = []
-            for case in cases:
-                afm_string = case.get("afm_string")
-                if afm_string:
-                    afm_strings.append(afm_string)
-            
-            print(f"📝 [PROCESS] {len(afm_strings)} AFM-Strings extrahiert")
-            
-            # Lokale AFM-Datei erstellen
-            local_data = {
-                "last_update": datetime.now().isoformat(),
-                "case_count": len(cases),
-                "cases": cases,  # Vollständige Cases für GUI
-                "afm_strings": afm_strings  # Nur AFM-Strings für Export
-            }
-            
-            with open(self.local_afm_file, 'w', encoding='utf-8') as f:
-                json.dump(local_data, f, indent=2, ensure_ascii=False)
-            
-            print(f"✅ [SAVE] Lokale AFM-Datei erfolgreich erstellt: {self.local_afm_file.name}")
-                
-        except Exception as e:
-            print(f"⚠️ Lokale Speicherung fehlgeschlagen: {e}")
-    
     def update_case(self, case_index, updates):
         """Case aktualisieren"""
         cases = self.get_cases()
@@ -315,7 +247,7 @@ class DataService:
             case[key] = value
         
         # Speichern
-        self._save_cases({"cases": cases})
+        self._save_cases([("set", case)])
         return True
     
     def regenerate_afm_string(self, case_index):
@@ -328,7 +260,7 @@ class DataService:
         update_case_afm_string(case)
         
         # Speichern
-        self._save_cases({"cases": cases})
+        self._save_cases([("set", case)])
         return True
     
     def delete_case(self, case_index):
@@ -341,7 +273,7 @@ class DataService:
         deleted_case = cases.pop(case_index)
         
         # Speichern
-        self._save_cases({"cases": cases})
+        self._save_cases([("del", deleted_case)])
         return True, deleted_case
     
     def is_first_edit(self, case_index):
@@ -392,9 +324,8 @@ class DataService:
                 return self._resolve_conflicts_visually(conflicts, local_cases, server_cases)
             else:
                 print("✅ [SYNC] Keine Konflikte gefunden - Übernehme Server-Daten")
-                # Keine Konflikte - Server-Daten übernehmen
-                self._save_local_afm_data(server_cases)
-                print(f"💾 [SAVE] Lokale Daten aktualisiert: {len(server_cases)} Cases")
+                # Keine Konflikte - das Overlay liegt bereits über dem aktuellen Storage
+                print(f"💾 [SESSION] {len(self.session_overlay.changes)} Session-Änderungen bleiben erhalten")
                 return True, f"Daten synchronisiert: {len(server_cases)} Cases"
                 
         except Exception as e:
@@ -453,33 +384,23 @@ class DataService:
         return "conflicts", f"{len(conflicts)} Konflikte gefunden - Bitte in Tabelle lösen"
     
     def sync_session_data(self):
-        """Session-Datenabgleich ohne Shutdown - Gleiche Logik wie sync_and_shutdown aber ohne Cleanup"""
+        """Session-Datenabgleich ohne Shutdown - schreibt nur die Deltas des Overlays in den Storage"""
         try:
             print("🔄 [SYNC] Starte Session-Datenabgleich...")
             
-            # Session-Daten nur ERGÄNZEN, nicht überschreiben
-            local_cases = self.get_cases()
-            if local_cases:
-                print(f"📤 [MERGE] Ergänze {len(local_cases)} Session-Cases in cases.json")
-                
-                # Original cases.json laden
-                original_cases = []
-                if os.path.exists(self.cases_file):
-                    with open(self.cases_file, 'r', encoding='utf-8') as f:
-                        original_data = json.load(f)
-                        original_cases = original_data.get("cases", [])
+            # Nur berührte Cases übernehmen, nichts überschreiben
+            operations = self.session_overlay.operations()
+            if operations:
+                print(f"📤 [MERGE] Übernehme {len(operations)} Session-Änderungen in den Storage")
                 
-                # Session-Cases mit Original-Cases zusammenführen (nach erfassung-Zeitstempel)
-                merged_cases = self._merge_cases_safely(original_cases, local_cases)
+                applied = self.pure_storage.write_batch(operations)
+                print(f"✅ [MERGE] {len(applied)} Änderungen übernommen "
+                      f"({self.pure_storage.get_cases_count()} Cases)")
                 
-                with open(self.cases_file, 'w', encoding='utf-8') as f:
-                    json.dump({"cases": merged_cases}, f, indent=2, ensure_ascii=False)
-                print(f"✅ [MERGE] {len(merged_cases)} Cases erfolgreich zusammengeführt")
-                
-                # Session-Daten neu initialisieren mit aktualisierten Daten
+                # Session neu beginnen über dem aktualisierten Storage
                 self._initialize_local_data()
                 
-                return True, f"Session synchronisiert: {len(merged_cases)} Cases"
+                return True, f"Session synchronisiert: {len(applied)} Änderungen"
             else:
                 return False, "Keine Session-Daten zum Synchronisieren gefunden"
             
@@ -508,50 +429,12 @@ class DataService:
                 print(f"❌ [CLEANUP] Session-Bereinigung fehlgeschlagen: {cleanup_e}")
             return False
     
-    def _merge_cases_safely(self, original_cases, session_cases):
-        """Sichere Zusammenführung von Original- und Session-Daten nach erfassung-Zeitstempel mit AFM-String-Schutz"""
-        from utils.afm_utils import update_case_afm_string
-        
-        # Dictionary für schnelleren Zugriff nach erfassung-Zeitstempel
-        original_by_timestamp = {}
-        for case in original_cases:
-            # AUTO-SCHUTZ: AFM-String regenerieren falls fehlend
-            if not case.get("afm_string"):
-                case = update_case_afm_string(case)
-                
-            timestamps = case.get("zeitstempel", [])
-            if timestamps:
-                erfassung_ts = next((ts for ts in timestamps if ts.startswith("erfassung:")), None)
-                if erfassung_ts:
-                    original_by_timestamp[erfassung_ts] = case
-        
-        merged = []
-        
-        # Alle Session-Cases hinzufügen (überschreiben Original bei gleichem erfassung-Zeitstempel)
-        for session_case in session_cases:
-            # AUTO-SCHUTZ: AFM-String regenerieren falls fehlend
-            if not session_case.get("afm_string"):
-                session_case = update_case_afm_string(session_case)
-                
-            timestamps = session_case.get("zeitstempel", [])
-            if timestamps:
-                erfassung_ts = next((ts for ts in timestamps if ts.startswith("erfassung:")), None)
-                if erfassung_ts:
-                    # Session-Case überschreibt Original bei gleichem erfassung-Zeitstempel
-                    original_by_timestamp[erfassung_ts] = session_case
-        
-        # Alle Cases (Original + Session-Updates) zusammenführen
-        merged = list(original_by_timestamp.values())
-        
-        print(f"🔄 [MERGE] Original: {len(original_cases)}, Session: {len(session_cases)}, Zusammengeführt: {len(merged)}")
-        return merged
-    
     def _cleanup_session_data(self):
         """Löscht Session-spezifische temporäre Dateien"""
         try:
-            if self.local_afm_file.exists():
-                self.local_afm_file.unlink()
-                print(f"🗑️ [CLEANUP] Session-Datei gelöscht: {self.local_afm_file.name}")
+            if self.session_overlay.overlay_file.exists():
+                self.session_overlay.clear()
+                print(f"🗑️ [CLEANUP] Session-Overlay gelöscht: {self.session_overlay.overlay_file.name}")
             
             # Gesamtes Session-Verzeichnis löschen
             if self.session_temp_dir.exists():
@@ -566,18 +449,11 @@ class DataService:
             print(f"⚠️ [CLEANUP] Session-Cleanup fehlgeschlagen: {e}")
     
     def _cleanup_old_session_exports(self):
-        """Bereinigt alte Export-Dateien (älter als 24h)"""
+        """Bereinigt alte Export-Dateien (älter als 24h) - über den Export-Katalog"""
         try:
-            import time
-            current_time = time.time()
-            
-            for export_file in self.exports_dir.glob("afm_export_*.json"):
-                file_age = current_time - export_file.stat().st_mtime
-                
-                # Dateien älter als 24 Stunden löschen
-                if file_age > 86400:  # 24 * 60 * 60 Sekunden
-                    export_file.unlink()
-                    print(f"🗑️ [CLEANUP] Alter Export gelöscht: {export_file.name}")
+            removed = self.export_service.cleanup_exports(keep_count=None, max_age=86400)  # 24 * 60 * 60 Sekunden
+            if removed:
+                print(f"🗑️ [CLEANUP] {removed} alte Exports gelöscht")
                     
         except Exception as e:
             print(f"⚠️ [CLEANUP] Export-Bereinigung fehlgeschlagen: {e}")
@@ -585,13 +461,12 @@ class DataService:
     def get_export_status(self):
         """Status des neuesten Exports"""
         try:
-            latest_export = self.export_service.get_latest_export()
+            latest_export = self.export_service.latest_export_info()
             if not latest_export:
                 return "Kein Export vorhanden"
             
-            # Zeitstempel der Export-Datei
-            import os
-            timestamp = datetime.fromtimestamp(os.path.getmtime(latest_export))
+            # Zeitstempel aus dem Export-Katalog (ohne stat)
+            timestamp = datetime.fromisoformat(latest_export["timestamp"])
             now = datetime.now()
             
             # Zeitdifferenz berechnen
@@ -10,6 +10,8 @@ import sys
 # Utils importieren
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from utils.afm_pure import AFMPureStorage
+from utils.afm_utils import get_case_status
+from utils.afm_import import import_afm_strings
 from .export_service import AFMExportService
 
 class DataService:
@@ -26,11 +28,11 @@ class DataService:
         self._initialize_pure_data()
     
     def _initialize_pure_data(self):
-        """Lädt Pure AFM-Daten"""
+        """Storage initialisieren - Case-Anzahl aus den Metadaten (ohne Dekodierung)"""
         try:
             print("🔄 [PURE AFM] Initialisiere Pure AFM System...")
-            cases = self.pure_storage.load_pure_afm_data()
-            print(f"✅ [PURE AFM] {len(cases)} Cases aus AFM-Strings geladen")
+            case_count = self.pure_storage.get_cases_count()
+            print(f"✅ [PURE AFM] {case_count} Cases verfügbar")
         except Exception as e:
             print(f"⚠️ [PURE AFM] Initialisierung: {e}")
     
@@ -49,18 +51,7 @@ class DataService:
     
     def get_case_status(self, case):
         """Status eines Cases ermitteln anhand der Zeitstempel"""
-        timestamps = case.get("zeitstempel", [])
-        if not timestamps:
-            return "neu"
-        
-        if any("archivierung:" in ts for ts in timestamps):
-            return "archivierung"
-        elif any("validierung:" in ts for ts in timestamps):
-            return "validierung"
-        elif any("verarbeitung:" in ts for ts in timestamps):
-            return "verarbeitung"
-        else:
-            return "erfassung"
+        return get_case_status(case)
     
     def update_case(self, case_index, updates):
         """Case aktualisieren und als AFM-String speichern"""
@@ -131,11 +122,19 @@ class DataService:
         return self.export_service.create_export()
     
     def import_from_json(self, file_path):
-        """Import aus Datei"""
-        cases = self.export_service.load_export_cases(Path(file_path))
-        if cases:
-            self._save_cases({"cases": cases})
-        return len(cases)
+        """
+        Import aus Datei - parallel geprüft, gegen den Storage dedupliziert, ein Schreibvorgang
+        
+        Returns:
+            int: Anzahl neuer und geänderter Cases
+        """
+        try:
+            chunks = self.export_service.iter_import_chunks(Path(file_path))
+            report = import_afm_strings(self.pure_storage, chunks, workers=self.pure_storage.decode_workers)
+        except (OSError, ValueError) as e:
+            print(f"❌ [IMPORT] Import fehlgeschlagen: {e}")
+            return 0
+        return report["inserted"] + report["updated"]
     
     def sync_session_data(self):
         """Session-Daten synchronisieren (Pure AFM: direkt persistent)"""
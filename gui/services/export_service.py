@@ -4,87 +4,204 @@ AFM Pure Export Service
 Direkter AFM-String Export ohne Case-Rekonstruktion
 """
 
-import json
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
+import os
 import sys
 
 # Utils importieren
 sys.path.append(str(Path(__file__).parent.parent))
 from utils.logger import log_action
 from utils.afm_pure import AFMPureStorage
+from utils.afm_stream import iter_json_array, read_json_format
+from utils.afm_parallel import decode_afm_strings
+from utils.afm_export import (
+    write_tracked_export, read_export_afm_strings, read_export_trailer, reconstruct_export, DIFF_FORMAT,
+    new_checksum, update_checksum, format_checksum
+)
+from utils.afm_export_parts import (
+    write_parts_export, iter_export_parts, read_parts_entries, read_parts_index, remove_export, PARTS_FORMAT
+)
+from utils.afm_import import IMPORT_CHUNK_SIZE
+from utils.export_manifest import AFMExportManifest
+
+EXPORT_MODES = ("full", "differential")
+EXPORT_FORMATS = ("json", "parts")
+# Standard-Modus: "full" (vollständiger Snapshot) oder "differential" (nur Änderungen)
+EXPORT_MODE = os.environ.get("AFM_EXPORT_MODE", "full")
+# Differenz-Exports bis zum nächsten Voll-Export (begrenzt den Replay beim Import)
+FULL_EXPORT_INTERVAL = int(os.environ.get("AFM_FULL_EXPORT_INTERVAL", "10"))
+# Voll-Exports: "json" (eine Datei) oder "parts" (komprimierte Teile + Index, siehe utils/afm_export_parts)
+EXPORT_FORMAT = os.environ.get("AFM_EXPORT_FORMAT", "json")
 
 class AFMExportService:
     """Service für direkten AFM-String Export"""
     
-    def __init__(self, cases_file, exports_dir):
-        self.pure_storage = AFMPureStorage(cases_file)
+    def __init__(self, cases_file, exports_dir, storage=None):
+        self.pure_storage = storage if storage is not None else AFMPureStorage(cases_file)
         self.exports_dir = Path(exports_dir)
         self.exports_dir.mkdir(exist_ok=True)
+        self.manifest = AFMExportManifest(self.exports_dir)
+        self.export_mode = EXPORT_MODE
+        self.full_export_interval = FULL_EXPORT_INTERVAL
+        self.export_format = EXPORT_FORMAT
+        # Teilgröße und Kompression mehrteiliger Exports (None = AFM_EXPORT_PART_SIZE / AFM_EXPORT_COMPRESSION)
+        self.part_size = None
+        self.compression = None
+        if not self.manifest.exists():
+            self._register_existing_exports()
     
-    def create_export(self):
-        """Erstellt direkten AFM-String Export"""
+    def create_export(self, mode=None):
+        """
+        Erstellt direkten AFM-String Export - gestreamt, ohne Dekodierung, mit Prüfsumme
+        
+        Args:
+            mode (str): "full" oder "differential" (Standard: export_mode)
+        """
         try:
+            mode = mode or self.export_mode
+            if mode not in EXPORT_MODES:
+                raise ValueError(f"Unbekannter Export-Modus '{mode}' - erlaubt: {', '.join(EXPORT_MODES)}")
+            if self.export_format not in EXPORT_FORMATS:
+                raise ValueError(f"Unbekanntes Export-Format '{self.export_format}' - "
+                                 f"erlaubt: {', '.join(EXPORT_FORMATS)}")
             print("📤 [PURE EXPORT] Starte direkten AFM-Export...")
             
-            # Pure AFM-Daten laden
-            cases = self.pure_storage.load_pure_afm_data()
-            if not cases:
-                print("⚠️ [PURE EXPORT] Keine AFM-Daten gefunden")
-                return False, "Keine AFM-Daten gefunden"
-            
-            print(f"📂 [LOAD] {len(cases)} Cases aus Pure AFM geladen")
-            
-            # Direkte AFM-Strings aus Storage extrahieren
-            with open(self.pure_storage.storage_file, 'r', encoding='utf-8') as f:
-                pure_data = json.load(f)
-            
-            afm_strings = pure_data.get('afm_strings', [])
-            
-            # Export-Datei erstellen
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            export_file = self.exports_dir / f"afm_pure_export_{timestamp}.json"
+            # Differenz nur gegen einen bekannten Vorgänger, regelmäßig Voll-Export (begrenzt die Kette)
+            base = self.manifest.latest() if mode == "differential" else None
+            previous = None
+            if base is not None and self.manifest.diffs_since_full() < self.full_export_interval:
+                previous = self.manifest.read_state(base["name"])
+            kind = "full" if previous is None else "diff"
+            multipart = kind == "full" and self.export_format == "parts"
             
-            export_data = {
+            prefix = "afm_pure_diff" if kind == "diff" else "afm_pure_parts" if multipart else "afm_pure_export"
+            export_file = self._new_export_file(prefix)
+            header = {
                 "export_timestamp": datetime.now().isoformat(),
                 "export_version": "pure_v1.0",
-                "case_count": len(afm_strings),
-                "format": "encrypted_afm_strings",
-                "afm_strings": afm_strings
+                "format": None,  # setzt write_tracked_export (Voll- oder Differenz-Format)
             }
+            if kind == "diff":
+                header["base_export"] = base["name"]
             
-            # Export speichern
-            with open(export_file, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            # Hashes je Case nur als Basis künftiger Differenz-Exports
+            track = mode == "differential"
             
-            print(f"💾 [SAVE] Pure Export erstellt: {export_file.name}")
+            # (Case-ID, AFM-String) einmal aus dem Storage direkt in die Datei streamen
+            with self.pure_storage.lock.shared():
+                entries = iter(self.pure_storage.iter_case_afm_strings())
+                first = next(entries, None)
+                if first is None:
+                    print("⚠️ [PURE EXPORT] Keine AFM-Daten gefunden")
+                    return False, "Keine AFM-Daten gefunden"
+                if multipart:
+                    result = write_parts_export(
+                        export_file, chain((first,), entries), header, part_size=self.part_size,
+                        compression=self.compression, durability=self.pure_storage.durability, track=track
+                    )
+                else:
+                    result = write_tracked_export(
+                        export_file, chain((first,), entries), header,
+                        previous=previous, durability=self.pure_storage.durability, track=track
+                    )
+            
+            hashes = result.pop("hashes")
+            self.manifest.add({
+                "name": export_file.name,
+                "type": kind,
+                "base": header.get("base_export"),
+                "timestamp": header["export_timestamp"],
+                "case_count": len(hashes) if hashes is not None else result["case_count"],
+                "entries": result["case_count"],
+                "added": result["added"],
+                "changed": result["changed"],
+                "deleted": result["deleted"],
+                "checksum": result["checksum"],
+                "size": result.get("size") or export_file.stat().st_size,
+                "parts": result.get("parts"),
+            })
+            if hashes is not None:
+                self.manifest.save_state(export_file.name, hashes)
+            
+            summary = (f"{result['case_count']} AFM-Strings" if kind == "full" else
+                       f"+{result['added']} ~{result['changed']} -{result['deleted']} seit {base['name']}")
+            print(f"💾 [SAVE] Pure Export erstellt: {export_file.name} ({summary}, {result['checksum']})")
             
             # Alte Exports bereinigen
-            self._cleanup_old_exports()
+            self.cleanup_exports()
             
-            log_action(f"Pure AFM Export: {export_file.name} ({len(afm_strings)} AFM-Strings)")
+            log_action("EXPORT", f"{export_file.name} ({summary}, {result['checksum']})")
             print(f"✅ [PURE EXPORT] Direkter AFM-Export abgeschlossen")
             return True, export_file
             
         except Exception as e:
             return False, f"Pure Export-Fehler: {str(e)}"
     
+    def _new_export_file(self, prefix):
+        """Export-Dateiname mit Zeitstempel - bei mehreren Exports pro Sekunde mit Zähler"""
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        export_file = self.exports_dir / f"{prefix}_{timestamp}.json"
+        counter = 1
+        while export_file.exists():
+            counter += 1
+            export_file = self.exports_dir / f"{prefix}_{timestamp}_{counter}.json"
+        return export_file
+    
+    def _register_existing_exports(self):
+        """Einmalig: vorhandene Exports ohne Katalog aufnehmen (ältere Versionen, keine Kette)"""
+        existing = [
+            export_file for pattern in ("afm_export_*.json", "afm_pure_export_*.json")
+            for export_file in self.exports_dir.glob(pattern)
+        ]
+        entries = []
+        for export_file in sorted(existing, key=lambda x: x.stat().st_mtime):
+            stat = export_file.stat()
+            trailer = read_export_trailer(export_file)
+            entries.append({
+                "name": export_file.name,
+                "type": "full",
+                "base": None,
+                "timestamp": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                "case_count": trailer["case_count"],
+                "checksum": trailer["checksum"],
+                "size": stat.st_size,
+            })
+        self.manifest.save(entries)
+        if entries:
+            print(f"🗂️ [EXPORT] {len(entries)} vorhandene Exports in den Katalog aufgenommen")
+    
+    def latest_export_info(self):
+        """Katalog-Eintrag des neuesten Exports (Name, Zeitstempel, Case-Anzahl, Größe, Prüfsumme, Basis)"""
+        return self.manifest.latest()
+    
     def get_latest_export(self):
-        """Findet den neuesten Export"""
-        try:
-            export_files = list(self.exports_dir.glob("afm_export_*.json"))
-            if not export_files:
-                return None
-            
-            # Nach Datum sortieren (neuester zuerst)
-            export_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-            return export_files[0]
-            
-        except Exception:
-            return None
+        """Findet den neuesten Export - aus dem Katalog, ohne Verzeichnis-Scan"""
+        entry = self.manifest.latest()
+        return self.exports_dir / entry["name"] if entry is not None else None
+    
+    def iter_export_cases(self, export_file):
+        """Dekodiert die AFM-Strings eines Exports nacheinander (gestreamt, mehrteilige Exports Teil für Teil)"""
+        if read_json_format(export_file) == PARTS_FORMAT:
+            afm_strings = (afm for _, part in iter_export_parts(export_file) for afm in part)
+        else:
+            afm_strings = iter_json_array(export_file, "afm_strings")
+        for i, encrypted_afm in enumerate(afm_strings):
+            case = self.pure_storage.parse_afm_string_to_case(encrypted_afm)
+            if case is None:
+                print(f"⚠️ [PARSE] AFM-String {i+1} ungültig - übersprungen")
+                continue
+            yield case
     
-    def load_export_cases(self, export_file=None):
-        """Lädt Cases aus Pure AFM Export"""
+    def load_export_cases(self, export_file=None, parts=None):
+        """
+        Lädt Cases aus Pure AFM Export
+        
+        Args:
+            export_file (Path): Export (None = neuester)
+            parts: Teil-Nummern eines mehrteiligen Exports (None = alle)
+        """
         try:
             if export_file is None:
                 export_file = self.get_latest_export()
@@ -96,43 +213,90 @@ class AFMExportService:
                 print("❌ [PURE IMPORT] Export-Datei nicht gefunden")
                 return []
             
-            with open(export_file, 'r', encoding='utf-8') as f:
-                export_data = json.load(f)
-            
-            afm_strings = export_data.get("afm_strings", [])
+            # AFM-Strings gestreamt lesen (Prüfsumme kontrolliert) und als Bulk (ggf. parallel) dekodieren
+            afm_strings = self._export_afm_strings(export_file, parts)
             print(f"📂 [LOAD] {len(afm_strings)} Verschlüsselte AFM-Strings geladen")
             
-            # AFM-Strings direkt zu Cases konvertieren
             cases = []
-            for i, encrypted_afm in enumerate(afm_strings):
-                try:
-                    case_data = self.pure_storage._decrypt_afm_string(encrypted_afm)
-                    if case_data:
-                        case = json.loads(case_data)
-                        cases.append(case)
-                except Exception:
+            decoded = decode_afm_strings(afm_strings, workers=self.pure_storage.decode_workers)
+            for i, case in enumerate(decoded):
+                if case is None:
                     print(f"⚠️ [PARSE] AFM-String {i+1} ungültig - übersprungen")
                     continue
+                cases.append(case)
             
             print(f"✅ [PURE IMPORT] {len(cases)} Cases erfolgreich dekodiert")
             return cases
             
+        except ValueError as e:
+            print(f"❌ [PURE IMPORT] {e}")
+            return []
         except Exception:
             return []
     
-    def _cleanup_old_exports(self, keep_count=10):
-        """Bereinigt alte Export-Dateien"""
+    def iter_import_chunks(self, export_file, chunk_size=IMPORT_CHUNK_SIZE):
+        """
+        AFM-Strings eines Exports in Chunks für den Bulk-Import
+        
+        Mehrteilige Exports liefern Teil für Teil (dekomprimiert, während der Import
+        vorherige Teile prüft). Die Gesamtprüfsumme wird nach dem letzten Teil
+        kontrolliert - vor dem Schreiben in den Storage.
+        
+        Yields:
+            list: AFM-Strings je Chunk (ValueError bei beschädigtem Export)
+        """
+        if read_json_format(export_file) != PARTS_FORMAT:
+            afm_strings = self._export_afm_strings(export_file)
+            for start in range(0, len(afm_strings), chunk_size):
+                yield afm_strings[start:start + chunk_size]
+            return
+        
+        checksum = new_checksum()
+        for _, afm_strings in iter_export_parts(export_file):
+            for afm_string in afm_strings:
+                update_checksum(checksum, afm_string)
+            yield afm_strings
+        if format_checksum(checksum) != read_parts_index(export_file)["checksum"]:
+            raise ValueError(f"Prüfsumme stimmt nicht - Export beschädigt: {export_file}")
+    
+    def _export_afm_strings(self, export_file, parts=None):
+        """AFM-Strings zum Stand eines Exports - Differenz-Exports über ihre Kette aus dem Manifest"""
+        export_format = read_json_format(export_file)
+        if export_format == PARTS_FORMAT:
+            # Teile parallel dekomprimiert, bei Auswahl nur diese
+            return [afm_string for _, afm_string in read_parts_entries(export_file, parts)]
+        if parts is not None:
+            raise ValueError(f"Teil-Auswahl nur bei mehrteiligen Exports möglich: {export_file.name}")
+        if export_format != DIFF_FORMAT:
+            return read_export_afm_strings(export_file)
+        
+        chain_files = [self.exports_dir / entry["name"] for entry in self.manifest.chain(export_file.name)]
+        print(f"🔗 [PURE IMPORT] Rekonstruiere Stand aus {len(chain_files)} Exports "
+              f"({chain_files[0].name} + Differenzen)")
+        return list(reconstruct_export(chain_files).values())
+    
+    def cleanup_exports(self, keep_count=10, max_age=None):
+        """
+        Bereinigt alte Export-Dateien anhand des Katalogs - Basis-Exports behaltener Differenzen bleiben
+        
+        Args:
+            keep_count (int): neueste Exports, die behalten werden (None = alle)
+            max_age (float): Höchstalter in Sekunden (None = unbegrenzt)
+        
+        Returns:
+            int: Anzahl gelöschter Exports
+        """
         try:
-            export_files = list(self.exports_dir.glob("afm_export_*.json"))
-            if len(export_files) <= keep_count:
-                return
-            
-            # Nach Datum sortieren (älteste zuerst)
-            export_files.sort(key=lambda x: x.stat().st_mtime)
+            entries = self.manifest.entries()
+            keep = self.manifest.retained(keep_count, max_age)
+            if len(keep) == len(entries):
+                return 0
             
-            # Alte Dateien löschen
-            for old_file in export_files[:-keep_count]:
-                old_file.unlink()
+            for entry in entries:
+                if entry["name"] not in keep:
+                    remove_export(self.exports_dir / entry["name"])
+            self.manifest.save([entry for entry in entries if entry["name"] in keep])
+            return len(entries) - len(keep)
                 
         except Exception:
-            pass
+            return 0
@@ -3,7 +3,7 @@
 AFMTool1 - Minimales Python Tool
 """
 
-from utils.database import load_database
+from utils.database import iter_cases
 from utils.logger import log_action
 
 def main():
@@ -23,10 +23,11 @@ def main():
             print("❌ CLI Case-Erstellung entfernt - verwende GUI!")
             
         elif choice == "2":
-            data = load_database()
-            print(f"\nGefunden: {len(data['cases'])} Cases")
-            for i, case in enumerate(data['cases'], 1):
-                print(f"{i}. Quelle: {case['quelle']}, Fundstellen: {case['fundstellen']}")
+            # Cases gestreamt ausgeben - auch große Datenbanken ohne vollständiges Laden
+            count = 0
+            for count, case in enumerate(iter_cases(), 1):
+                print(f"{count}. Quelle: {case.get('quelle', '')}, Fundstellen: {case.get('fundstellen', '')}")
+            print(f"\nGefunden: {count} Cases")
                 
         elif choice == "3":
             log_action("STOP", "AFMTool1 beendet")
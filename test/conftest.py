@@ -0,0 +1,55 @@
+"""
+Gemeinsame Fixtures für die AFMTool1 Tests
+"""
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+def make_sample_case(nr):
+    """Realistischer Case mit stundengenauem erfassung-Zeitstempel"""
+    return {
+        "fallnummer": f"HR-2025-{nr:03d}",
+        "quelle": f"Handelsregister Wien {nr}",
+        "fundstellen": f"HRB {nr}, Seite 1",
+        "zeitstempel": [f"erfassung:2025-07-24T{nr % 24:02d}"]
+    }
+
+@pytest.fixture(autouse=True)
+def isolated_log(tmp_path, monkeypatch):
+    """log_action schreibt ins Test-Verzeichnis statt in logs/afmtool.log"""
+    monkeypatch.setattr("utils.logger.LOG_PATH", tmp_path / "logs" / "afmtool.log")
+    return tmp_path / "logs" / "afmtool.log"
+
+@pytest.fixture
+def sample_case():
+    """Fabrik für Beispiel-Cases: sample_case(nr)"""
+    return make_sample_case
+
+@pytest.fixture(scope="session")
+def gui_module():
+    """
+    Module aus gui/ laden, ohne die Paket-__init__ auszuführen
+
+    gui/__init__ importiert das Hauptfenster (PIL), gui/components/__init__ den
+    Bildbetrachter - für Service- und Komponententests werden die Pakete als
+    leere Namespaces registriert und die Module einzeln importiert.
+
+    Returns:
+        Funktion: Modulname (z.B. "gui.services.data_service") → Modul
+    """
+    saved = {name: module for name, module in sys.modules.items() if name == "gui" or name.startswith("gui.")}
+    for name in ("gui", "gui.services", "gui.components"):
+        package = types.ModuleType(name)
+        package.__path__ = [str(ROOT / name.replace(".", "/"))]
+        sys.modules[name] = package
+    yield importlib.import_module
+
+    for name in [name for name in sys.modules if name == "gui" or name.startswith("gui.")]:
+        del sys.modules[name]
+    sys.modules.update(saved)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests für AFMCase, LazyAFMCase und geparste Zeitstempel - pytest kompatibel
+"""
+
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure import AFMPureStorage
+
+def test_case_records_are_compact_and_dict_compatible(tmp_path, sample_case):
+    """Cases teilen internierte Werte, haben kein Instanz-__dict__ und bleiben dict-kompatibel"""
+    import json
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    first, second = sample_case(1), sample_case(25)
+    first["quelle"] = second["quelle"] = "Grundbuch Graz"
+    storage.save_pure_afm_data([first, second])
+    cases = AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()
+
+    assert not hasattr(cases[0], "__dict__")
+    assert cases[0]["quelle"] is cases[1]["quelle"]
+    assert cases[0]["zeitstempel"][0] is cases[1]["zeitstempel"][0]
+    assert json.loads(json.dumps(cases[0])) == dict(cases[0])
+
+def test_timestamps_are_parsed_once_per_revision(sample_case):
+    """Status und erfassung kommen aus der geparsten Zeitstempel-Struktur"""
+    from datetime import datetime
+    from uuid import UUID
+    from utils.afm_case import AFMCase
+    from utils.afm_timestamps import TimestampType
+    from utils.afm_utils import get_case_status
+
+    case = AFMCase(sample_case(1))
+    parsed = case.timestamps()
+    assert case.timestamps() is parsed
+    assert parsed.status == "erfassung" == get_case_status(case)
+    assert parsed.erfassung.art is TimestampType.ERFASSUNG
+    assert parsed.erfassung.datum == datetime(2025, 7, 24, 1)
+
+    uuid = "9d08b9e7-1abe-401a-8056-df2a518f32e5"
+    case["zeitstempel"].append(f"validierung:2025-07-25T10:15:00.000000:{uuid}")
+    assert case.timestamps() is not parsed
+    assert case.timestamps().status == "validierung"
+    assert case.timestamps().entries[1].uuid == UUID(uuid)
+    assert get_case_status({"zeitstempel": []}) == "neu"
+    assert get_case_status({"zeitstempel": ["verarbeitung:2025-07-25T10"]}) == "verarbeitung"
+
+def test_nested_mutations_invalidate_cached_afm_strings(tmp_path, sample_case):
+    """Änderungen in verschachtelten Dicts und Listen verwerfen den zwischengespeicherten AFM-String"""
+    import copy
+    from utils.afm_case import AFMCase
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    data = sample_case(1)
+    data["meta"] = {"bearbeiter": "A", "tags": ["x"]}
+    storage.save_pure_afm_data([data])
+    case = storage.load_pure_afm_data()[0]
+    assert not case.is_dirty("pure_afm")
+
+    case["meta"]["bearbeiter"] = "B"
+    assert case.is_dirty("pure_afm")
+    storage.update_case(case["uuid"], case)
+    revision = case.revision
+    case["meta"]["tags"].append({"neu": []})
+    case["meta"]["tags"][1]["neu"].append("y")
+    assert case.revision == revision + 2
+    case["meta"].setdefault("stufe", 1)
+    storage.update_case(case["uuid"], case)
+
+    stored = AFMPureStorage(tmp_path / "cases.json").get_case(case["uuid"])
+    assert stored["meta"] == {"bearbeiter": "B", "tags": ["x", {"neu": ["y"]}], "stufe": 1}
+    plain = copy.deepcopy(stored)
+    assert type(plain) is dict and type(plain["meta"]) is dict and type(plain["meta"]["tags"]) is list
+    assert AFMCase(plain) == stored
+
+def test_lazy_cases_decode_on_first_access(tmp_path, monkeypatch, sample_case):
+    """load_pure_afm_data dekodiert erst beim Feldzugriff - und nur den gelesenen Case"""
+    import json
+    import utils.afm_case as afm_case
+
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    cases = [sample_case(i) for i in range(5)]
+    storage.save_pure_afm_data(cases)
+
+    decoded = []
+    parse = afm_case.parse_afm_string
+    monkeypatch.setattr(afm_case, "parse_afm_string", lambda afm: decoded.append(afm) or parse(afm))
+    loaded = AFMJournalStorage(tmp_path / "cases.json").load_pure_afm_data()
+    assert [case.get("uuid") for case in loaded] == storage.case_ids()
+    assert decoded == []
+
+    assert loaded[2]["quelle"] == "Handelsregister Wien 2"
+    assert len(decoded) == 1 and [case.is_decoded() for case in loaded] == [False, False, True, False, False]
+    assert json.loads(json.dumps(loaded[3])) == cases[3] == dict(loaded[3])
+    assert loaded == cases
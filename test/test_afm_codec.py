@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests für Kodierung und Bulk-Dekodierung der AFM-Strings - pytest kompatibel
+"""
+
+from utils.afm_pure import AFMPureStorage
+
+def test_zlib_encoding_is_smaller_and_reads_old_strings(tmp_path, sample_case):
+    """zlib-Kodierung mit Preset-Dictionary; Base64-Strings bleiben lesbar"""
+    from utils.afm_codec import encrypt_afm_string, decrypt_afm_string
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(10)])
+    base64_size = storage.storage_file.stat().st_size
+
+    storage.afm_encoding = "zlib"
+    ids = storage.case_ids()
+    changed = sample_case(2)
+    changed["quelle"] = "Grundbuch Graz"
+    storage.update_case(ids[2], changed)
+
+    strings = storage.load_afm_strings()
+    assert strings[2].startswith("z1:") and not strings[3].startswith("z1:")
+    assert AFMPureStorage(tmp_path / "cases.json").get_case(ids[2])["quelle"] == "Grundbuch Graz"
+
+    storage.save_pure_afm_data([sample_case(i) for i in range(10)])
+    assert storage.storage_file.stat().st_size < base64_size * 0.75
+
+    afm_json = storage.convert_case_to_pure_afm(sample_case(5))
+    assert len(encrypt_afm_string(afm_json, "zlib")) < len(encrypt_afm_string(afm_json, "base64")) / 2
+    assert decrypt_afm_string(encrypt_afm_string(afm_json, "zlib")) == afm_json
+
+def test_parallel_decode_matches_serial(tmp_path, sample_case):
+    """Bulk-Dekodierung im Prozess-Pool liefert dieselbe Reihenfolge wie seriell"""
+    from utils.afm_parallel import decode_afm_strings
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    afm_strings = [storage.encode_case(sample_case(i))[0] for i in range(50)]
+    afm_strings[13] = "kein gültiger AFM-String"
+
+    serial = decode_afm_strings(afm_strings, workers=1)
+    parallel = decode_afm_strings(afm_strings, workers=2, chunk_size=8, min_parallel=0)
+
+    assert parallel == serial
+    assert serial[13] is None
+    assert serial[42]["fallnummer"] == "HR-2025-042"
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests für gestreamte, differenzielle und mehrteilige Exports - pytest kompatibel
+"""
+
+import pytest
+
+from utils.afm_journal import AFMJournalStorage
+
+def test_streaming_export_checksum(tmp_path, sample_case):
+    """Export streamt die AFM-Strings einmal aus dem Storage und prüft sich über die Prüfsumme"""
+    import json
+    from utils.afm_export import write_export, verify_export, read_export_trailer
+
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(20)])
+    storage.append_case(sample_case(20))
+
+    reopened = AFMJournalStorage(tmp_path / "cases.json")
+    export_file = tmp_path / "afm_pure_export.json"
+    count, checksum = write_export(export_file, reopened.iter_afm_strings(), {"format": "encrypted_afm_strings"})
+
+    data = json.loads(export_file.read_text(encoding="utf-8"))
+    assert count == data["case_count"] == 21
+    assert data["afm_strings"] == storage.load_afm_strings()
+    assert read_export_trailer(export_file) == {"case_count": 21, "checksum": checksum}
+    assert verify_export(export_file) is True
+
+    export_file.write_text(export_file.read_text(encoding="utf-8").replace(data["afm_strings"][3], "eA=="),
+                           encoding="utf-8")
+    assert verify_export(export_file) is False
+
+    assert write_export(tmp_path / "empty.json", iter(()), {})[0] == 0
+    assert json.loads((tmp_path / "empty.json").read_text(encoding="utf-8"))["afm_strings"] == []
+
+def test_differential_export_chain_reconstructs_each_state(tmp_path, sample_case):
+    """Differenz-Exports enthalten nur Änderungen; die Kette ergibt jeden exportierten Stand"""
+    from utils.afm_export import write_tracked_export, reconstruct_export
+
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(30)])
+    full = write_tracked_export(tmp_path / "full.json", storage.iter_case_afm_strings(), {}, track=True)
+    assert (full["case_count"], full["added"]) == (30, 30)
+    first_state = dict(storage.iter_case_afm_strings())
+
+    ids = storage.case_ids()
+    changed = storage.get_case(ids[4])
+    changed["quelle"] = "Grundbuch Graz"
+    storage.update_case(ids[4], changed)
+    storage.delete_case(ids[9])
+    storage.append_case(sample_case(30))
+    diff = write_tracked_export(tmp_path / "diff.json", storage.iter_case_afm_strings(), {}, previous=full["hashes"])
+    assert (diff["case_count"], diff["added"], diff["changed"], diff["deleted"]) == (2, 1, 1, 1)
+
+    assert reconstruct_export([tmp_path / "full.json"]) == first_state
+    assert reconstruct_export([tmp_path / "full.json", tmp_path / "diff.json"]) == dict(storage.iter_case_afm_strings())
+    with pytest.raises(ValueError):
+        reconstruct_export([tmp_path / "diff.json"])
+
+def test_export_catalog_retention_keeps_chain_bases(tmp_path):
+    """Aufbewahrung aus dem Katalog: behaltene Differenzen behalten ihre Kette bis zum Voll-Export"""
+    from datetime import datetime
+    from utils.export_manifest import AFMExportManifest
+
+    catalog = AFMExportManifest(tmp_path)
+    kinds = ["full", "diff", "diff", "full", "diff", "diff", "diff"]
+    base = None
+    for nr, kind in enumerate(kinds):
+        base = None if kind == "full" else base
+        catalog.add({"name": f"e{nr}", "type": kind, "base": base, "timestamp": f"2025-07-{nr + 1:02d}T12:00:00"})
+        base = f"e{nr}"
+
+    assert catalog.latest()["name"] == "e6"
+    assert catalog.retained(2) == {"e3", "e4", "e5", "e6"}
+    assert catalog.retained(10) == {f"e{nr}" for nr in range(7)}
+    assert catalog.retained(None, max_age=3 * 86400, now=datetime(2025, 7, 7, 12)) == {"e3", "e4", "e5", "e6"}
+    assert catalog.retained(0) == {"e3", "e4", "e5", "e6"}
+    assert [entry["name"] for entry in catalog.chain("e5")] == ["e3", "e4", "e5"]
+
+@pytest.mark.parametrize("compression", ["gzip", "xz", "none"])
+def test_multipart_export_roundtrip(tmp_path, compression, sample_case):
+    """Mehrteiliger Export: Teile mit Prüfsummen, vollständig, selektiv und als Kettenbasis lesbar"""
+    from utils.afm_export import read_export_trailer, reconstruct_export
+    from utils.afm_export_parts import write_parts_export, read_parts_entries, parts_directory, remove_export
+
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(23)])
+    entries = list(storage.iter_case_afm_strings())
+    index_file = tmp_path / "afm_pure_parts.json"
+
+    result = write_parts_export(index_file, entries, {}, part_size=10, compression=compression, workers=2)
+    assert (result["case_count"], result["parts"]) == (23, 3)
+    assert read_export_trailer(index_file) == {"case_count": 23, "checksum": result["checksum"]}
+    assert read_parts_entries(index_file) == entries
+    assert read_parts_entries(index_file, parts=[2]) == entries[20:]
+    assert reconstruct_export([index_file]) == dict(entries)
+
+    part = sorted(parts_directory(index_file).iterdir())[1]
+    data = part.read_bytes()
+    part.write_bytes(data[:-1] + bytes([data[-1] ^ 0xFF]))
+    with pytest.raises(ValueError):
+        read_parts_entries(index_file)
+    assert read_parts_entries(index_file, parts=[0]) == entries[:10]
+
+    remove_export(index_file)
+    assert not index_file.exists() and not parts_directory(index_file).exists()
+
+def test_export_service_streams_without_loading_state(tmp_path, sample_case, gui_module, isolated_log):
+    """ExportService: Voll-Exports ohne Hashes/IDs, Differenz-Ketten mit Stand - der Storage wird nie geladen"""
+    import json
+    from utils.afm_export import reconstruct_export
+
+    export_service = gui_module("gui.services.export_service")
+    AFMJournalStorage(tmp_path / "cases.json").save_pure_afm_data([sample_case(i) for i in range(30)])
+    reader = AFMJournalStorage(tmp_path / "cases.json")
+    service = export_service.AFMExportService(tmp_path / "cases.json", tmp_path / "exports", storage=reader)
+
+    ok, plain = service.create_export("full")
+    assert ok
+    data = json.loads(plain.read_text(encoding="utf-8"))
+    assert len(data["afm_strings"]) == 30 and "case_ids" not in data
+    assert service.latest_export_info()["case_count"] == 30
+    assert not service.manifest.state_file.exists()
+    assert reader._slots is None
+
+    ok, base = service.create_export("differential")
+    assert ok and "case_ids" in json.loads(base.read_text(encoding="utf-8"))
+    writer = AFMJournalStorage(tmp_path / "cases.json")
+    ids = writer.case_ids()
+    changed = writer.get_case(ids[3])
+    changed["quelle"] = "Grundbuch Graz"
+    writer.write_batch([('set', ids[3], changed), ('del', ids[4], None), ('add', None, sample_case(30))])
+
+    ok, diff = service.create_export("differential")
+    assert ok
+    entry = service.latest_export_info()
+    assert (entry["type"], entry["base"], entry["case_count"]) == ("diff", base.name, 30)
+    assert (entry["added"], entry["changed"], entry["deleted"]) == (1, 1, 1)
+    assert reader._slots is None
+    assert reconstruct_export([base, diff]) == dict(writer.iter_case_afm_strings())
+    logged = isolated_log.read_text(encoding="utf-8").splitlines()
+    assert len(logged) == 3 and f"EXPORT: {diff.name} (+1 ~1 -1 seit {base.name}, " in logged[-1]
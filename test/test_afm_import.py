@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests für den Bulk-Import - pytest kompatibel
+"""
+
+import pytest
+
+from utils.afm_pure import AFMPureStorage
+
+def test_bulk_import_dedupes_and_rejects(tmp_path, sample_case):
+    """Bulk-Import: neue und geänderte Cases in einem Schreibvorgang, Duplikate übersprungen, Ungültiges abgelehnt"""
+    from utils.afm_codec import encrypt_afm_string
+    from utils.afm_import import import_afm_strings
+    from utils import json_codec
+
+    source = AFMPureStorage(tmp_path / "source.json")
+    source.save_pure_afm_data([sample_case(i) for i in range(6)])
+    exported = [afm_string for _, afm_string in source.iter_case_afm_strings()]
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data(source.load_pure_afm_data()[:3])
+    changed = storage.get_case(storage.case_ids()[0])
+    changed["quelle"] = "Grundbuch Graz"
+    storage.update_case(changed["uuid"], changed)
+
+    invalid = dict(sample_case(7), zeitstempel=["erfassung:gestern"])
+    chunks = [exported[:4], exported[4:] + [exported[5], "kein AFM-String"],
+              [encrypt_afm_string(json_codec.canonical_dumps(invalid))]]
+    report = import_afm_strings(storage, chunks, workers=2)
+
+    assert (report["total"], report["inserted"], report["updated"], report["unchanged"]) == (9, 3, 1, 3)
+    assert [entry["position"] for entry in report["rejected"]] == [8, 9]
+    assert report["cases_per_second"] > 0
+    assert dict(storage.iter_case_afm_strings()) == dict(source.iter_case_afm_strings())
+
+def test_reimport_is_idempotent(tmp_path, sample_case):
+    """Zweiter Import derselben Daten: nichts neu, nichts geändert - auch Cases ohne uuid-Feld"""
+    from utils.afm_codec import encrypt_afm_string
+    from utils.afm_import import import_afm_strings
+    from utils import json_codec
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    with_id = dict(sample_case(1), uuid="11111111-1111-4111-8111-111111111111")
+    erfassung_id = dict(sample_case(2), zeitstempel=["erfassung:2025-07-24T16:27:16.96:22222222-2222-4222-8222-222222222222"])
+    without_id = [sample_case(3), sample_case(4)]
+    # Rohe Strings, wie ein Fremdsystem sie liefert (voller erfassung-Zeitstempel)
+    afm_strings = [encrypt_afm_string(json_codec.canonical_dumps(case)) for case in [with_id, erfassung_id] + without_id]
+    # Case ohne ID doppelt im selben Import
+    chunks = [afm_strings, afm_strings[2:3]]
+
+    first = import_afm_strings(storage, chunks, workers=1)
+    assert (first["inserted"], first["updated"], first["unchanged"]) == (4, 0, 1)
+    assert len(storage.case_ids()) == 4
+    assert "22222222-2222-4222-8222-222222222222" in storage.case_ids()
+
+    second = import_afm_strings(storage, chunks, workers=1)
+    assert (second["inserted"], second["updated"], second["unchanged"]) == (0, 0, 5)
+    assert not second["rejected"]
+    assert len(storage.case_ids()) == 4
+
+@pytest.mark.parametrize("fail", ["start", "submit", "result"])
+def test_import_falls_back_to_serial_without_losing_chunks(tmp_path, monkeypatch, sample_case, isolated_log, fail):
+    """Fällt der Prozess-Pool aus, werden alle offenen Chunks genau einmal seriell geprüft"""
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+    from utils import afm_import
+
+    class FlakyExecutor:
+        """Prozess-Pool-Ersatz: rechnet im Prozess und bricht nach zwei Aufgaben ab"""
+        def __init__(self, max_workers):
+            if fail == "start":
+                raise OSError("keine Prozesse")
+            self.submitted = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args):
+            self.submitted += 1
+            future = Future()
+            if self.submitted > 2 and fail == "submit":
+                raise BrokenProcessPool("Pool beendet")
+            if self.submitted > 2:
+                future.set_exception(BrokenProcessPool("Worker abgestürzt"))
+            else:
+                future.set_result(fn(*args))
+            return future
+
+    monkeypatch.setattr(afm_import, "ProcessPoolExecutor", FlakyExecutor)
+    source = AFMPureStorage(tmp_path / "source.json")
+    source.save_pure_afm_data([sample_case(i) for i in range(12)])
+    exported = [afm_string for _, afm_string in source.iter_case_afm_strings()]
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    report = afm_import.import_afm_strings(storage, [exported[i:i + 2] for i in range(0, 12, 2)], workers=2)
+
+    assert (report["total"], report["inserted"], report["unchanged"]) == (12, 12, 0)
+    assert storage.case_ids() == source.case_ids()
+    assert "IMPORT: Prozess-Pool nicht verfügbar" in isolated_log.read_text(encoding="utf-8")
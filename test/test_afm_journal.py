@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests für den Journal-Storage (AFMJournalStorage) - pytest kompatibel
+"""
+
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure import AFMPureStorage
+
+def test_journal_replay_matches_snapshot(tmp_path, sample_case):
+    """Journal-Änderungen ergeben denselben Stand wie ein vollständiger Snapshot"""
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(3)])
+    ids = storage.case_ids()
+
+    storage.append_case(sample_case(3))
+    changed = sample_case(1)
+    changed["quelle"] = "Grundbuch Graz"
+    storage.update_case(ids[1], changed)
+    storage.delete_case(ids[0])
+
+    assert storage.journal_file.exists()
+    assert storage.journal_size() == 3
+
+    cases = storage.load_pure_afm_data()
+    assert [c["fallnummer"] for c in cases] == ["HR-2025-001", "HR-2025-002", "HR-2025-003"]
+    assert cases[0]["quelle"] == "Grundbuch Graz"
+
+    plain = AFMPureStorage(tmp_path / "cases.json")
+    assert plain.load_pure_afm_data() != cases
+
+    assert storage.compact() == 3
+    assert not storage.journal_file.exists()
+    assert plain.load_pure_afm_data() == cases
+
+def test_journal_write_is_constant_size(tmp_path, sample_case):
+    """Eine Änderung hängt nur einen Eintrag an, unabhängig von der Case-Anzahl"""
+    storage = AFMJournalStorage(tmp_path / "cases.json", compact_threshold=10_000)
+    storage.save_pure_afm_data([sample_case(i) for i in range(500)])
+    snapshot_size = storage.storage_file.stat().st_size
+
+    storage.update_case(storage.case_ids()[42], sample_case(42))
+
+    assert storage.storage_file.stat().st_size == snapshot_size
+    assert storage.journal_file.stat().st_size < 500
+
+def test_journal_auto_compaction_and_torn_line(tmp_path, sample_case):
+    """Kompaktierung ab Schwelle; abgebrochene Journal-Zeilen werden ignoriert"""
+    storage = AFMJournalStorage(tmp_path / "cases.json", compact_threshold=3)
+    storage.append_case(sample_case(1))
+    storage.append_case(sample_case(2))
+    with open(storage.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"op": "add", "afm": "eyJ')
+
+    assert len(storage.load_pure_afm_data()) == 2
+
+    storage.append_case(sample_case(3))
+    assert not storage.journal_file.exists()
+    assert len(AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()) == 3
+
+def test_fingerprint_tracks_journal_writes(tmp_path, sample_case):
+    """Fingerprint und Inhalts-Hash ändern sich bei jeder Journal-Änderung"""
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(1)])
+    fingerprint, content_hash = storage.fingerprint(), storage.content_hash()
+
+    assert storage.fingerprint() == fingerprint
+    storage.append_case(sample_case(2))
+
+    assert storage.fingerprint() != fingerprint
+    assert storage.content_hash() != content_hash
+
+def test_iter_cases_streams_snapshot_and_journal(tmp_path, sample_case):
+    """iter_cases liefert ohne geladenen Zustand denselben Stand wie load_pure_afm_data"""
+    from utils.afm_stream import iter_json_array
+
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(50)])
+    ids = storage.case_ids()
+    changed = sample_case(7)
+    changed["quelle"] = "Grundbuch Graz"
+    storage.update_case(ids[7], changed)
+    storage.delete_case(ids[3])
+    storage.append_case(sample_case(50))
+
+    expected = storage.load_pure_afm_data()
+    fresh = AFMJournalStorage(tmp_path / "cases.json")
+    assert list(fresh.iter_cases()) == expected
+    assert fresh._slots is None
+
+    strings = list(iter_json_array(tmp_path / "cases.json", "afm_strings", chunk_size=5))
+    assert strings == AFMPureStorage(tmp_path / "cases.json")._read_pure_data()["afm_strings"]
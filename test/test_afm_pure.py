@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Tests für den Pure AFM Storage (Primärindex, Batches, Status- und erfassung-Index, Metadaten) - pytest kompatibel
+"""
+
+import pytest
+
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure import AFMPureStorage
+
+def test_case_index_addresses_by_uuid(tmp_path, sample_case):
+    """Cases bleiben über ihre UUID adressierbar, auch nach Löschungen davor"""
+    legacy = sample_case(1)
+    legacy["zeitstempel"] = ["erfassung:2025-07-24T16:27:16.96:2b5e0c1a-7d9e-4a53-9d54-0b6a4a3e9f11"]
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([legacy, sample_case(2), sample_case(3)])
+
+    first, second, third = storage.case_ids()
+    assert first == "2b5e0c1a-7d9e-4a53-9d54-0b6a4a3e9f11"
+    assert storage.case_index.index_file.exists()
+
+    storage.delete_case(first)
+    assert storage.get_case(third)["fallnummer"] == "HR-2025-003"
+
+    reopened = AFMJournalStorage(tmp_path / "cases.json")
+    assert reopened.case_ids() == [second, third]
+    assert reopened.get_case(second)["uuid"] == second
+    assert reopened.get_case(first) is None
+
+def _write_legacy_snapshot(path, cases):
+    """Snapshot im alten Format: AFM-Strings ohne uuid-Feld, ohne Index und Sidecar"""
+    import json
+
+    encoder = AFMPureStorage(path.with_name("encoder.json"))
+    path.write_text(json.dumps({
+        "format": "afm_pure_v1.0",
+        "afm_strings": [encoder.encode_case(case)[0] for case in cases],
+        "erfassung_timestamps": [encoder.encode_case(case)[1] for case in cases],
+    }), encoding="utf-8")
+    return path
+
+def test_legacy_snapshot_is_migrated_on_first_write(tmp_path, sample_case):
+    """Lesende Zugriffe auf einen Snapshot ohne UUIDs ändern ihn nicht - die Migration folgt beim Schreiben"""
+    legacy_file = _write_legacy_snapshot(tmp_path / "cases.json", [sample_case(i) for i in range(3)])
+    before = legacy_file.read_bytes()
+
+    reader = AFMJournalStorage(legacy_file)
+    ids = reader.case_ids()
+    assert reader.get_case(ids[1])["fallnummer"] == "HR-2025-001"
+    assert reader.get_cases_count() == 3
+    assert legacy_file.read_bytes() == before
+    assert reader.lock.version() == 0
+    assert not reader.journal_file.exists()
+    # Jeder Leser vergibt dieselben IDs, solange die Migration nicht geschrieben ist
+    assert AFMJournalStorage(legacy_file).case_ids() == ids
+
+    changed = reader.get_case(ids[1])
+    changed["quelle"] = "Grundbuch Graz"
+    reader.update_case(ids[1], changed)
+    assert legacy_file.read_bytes() != before
+    assert not reader.journal_file.exists()
+
+    reopened = AFMJournalStorage(legacy_file)
+    assert reopened.case_ids() == ids
+    assert [reopened.get_case(case_id)["uuid"] for case_id in ids] == ids
+    assert reopened.get_case(ids[1])["quelle"] == "Grundbuch Graz"
+    assert not reopened._migration_pending
+
+def test_legacy_snapshot_reopens_without_decoding(tmp_path, monkeypatch, sample_case):
+    """Index und Sidecar werden beim ersten Lesen gespeichert - weitere Leser dekodieren nichts"""
+    import utils.afm_pure as afm_pure
+
+    legacy_file = _write_legacy_snapshot(tmp_path / "cases.json", [sample_case(i) for i in range(4)])
+    before = legacy_file.read_bytes()
+    first = AFMJournalStorage(legacy_file)
+    ids = first.case_ids()
+    assert first.get_cases_count() == 4
+    assert first.case_index.index_file.exists() and first.case_metadata.meta_file.exists()
+    assert legacy_file.read_bytes() == before
+
+    decoded = []
+    monkeypatch.setattr(afm_pure, "decode_afm_strings", lambda afm_strings, **kw: decoded.extend(afm_strings))
+    second = AFMJournalStorage(legacy_file)
+    assert second.case_ids() == ids
+    assert second.count_by_status() == {"erfassung": 4}
+    assert second.get_cases_count() == 4
+    assert second._migration_pending
+    assert not decoded
+    monkeypatch.undo()
+
+    # Gelesene Cases tragen ihre Index-ID, auch als LazyAFMCase
+    assert second.get_case(ids[2])["uuid"] == ids[2]
+    lazy = second.load_pure_afm_data()
+    assert [case["uuid"] for case in lazy] == ids
+    assert lazy[0].get_derived('pure_afm') is None
+
+    second.append_case(sample_case(4))
+    reopened = AFMPureStorage(legacy_file)
+    assert reopened.case_ids()[:4] == ids and not reopened._migration_pending
+    assert [reopened.parse_afm_string_to_case(afm)["uuid"] for afm in reopened.load_afm_strings()[:4]] == ids
+
+def test_unchanged_cases_are_not_reencoded(tmp_path, monkeypatch, sample_case):
+    """Nur geänderte Cases werden beim Speichern neu serialisiert"""
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(20)])
+    cases = storage.load_pure_afm_data()
+
+    calls = []
+    original = storage.convert_case_to_pure_afm
+    monkeypatch.setattr(storage, "convert_case_to_pure_afm", lambda case: calls.append(case) or original(case))
+
+    cases[4]["quelle"] = "Grundbuch Graz"
+    cases[9]["zeitstempel"].append("verarbeitung:2025-07-25T10")
+    storage.save_pure_afm_data(cases)
+
+    assert [c["fallnummer"] for c in calls] == ["HR-2025-004", "HR-2025-009"]
+    reloaded = AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()
+    assert reloaded[4]["quelle"] == "Grundbuch Graz"
+    assert reloaded[9]["zeitstempel"][-1] == "verarbeitung:2025-07-25T10"
+
+def test_write_batch_persists_once(tmp_path, monkeypatch, sample_case):
+    """Mehrere Änderungen werden in einem Schreibvorgang persistiert"""
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(3)])
+    ids = storage.case_ids()
+
+    writes = []
+    original = storage._write_snapshot
+    monkeypatch.setattr(storage, "_write_snapshot", lambda: writes.append(1) or original())
+    changed = sample_case(1)
+    changed["quelle"] = "Grundbuch Graz"
+    applied = storage.write_batch([
+        ("set", ids[1], changed),
+        ("del", ids[0], None),
+        ("add", None, sample_case(3)),
+        ("del", "unbekannt", None),
+    ])
+
+    assert len(writes) == 1
+    assert len(applied) == 3
+    cases = AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()
+    assert [c["fallnummer"] for c in cases] == ["HR-2025-001", "HR-2025-002", "HR-2025-003"]
+    assert cases[0]["quelle"] == "Grundbuch Graz"
+
+    journal = AFMJournalStorage(tmp_path / "journal.json")
+    journal.save_pure_afm_data([sample_case(0)])
+    journal.write_batch([("add", None, sample_case(i)) for i in range(1, 4)])
+    assert journal.journal_size() == 3
+    assert len(journal.load_pure_afm_data()) == 4
+
+def test_status_index_is_maintained_incrementally(tmp_path, monkeypatch, sample_case):
+    """Status-Zähler und Status-Filter kommen ohne Dekodierung aus dem Index"""
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    cases = [sample_case(i) for i in range(4)]
+    cases[3]["zeitstempel"].append("verarbeitung:2025-07-25T10")
+    storage.save_pure_afm_data(cases)
+    ids = storage.case_ids()
+    assert storage.count_by_status() == {"erfassung": 3, "verarbeitung": 1}
+
+    advanced = storage.get_case(ids[1])
+    advanced["zeitstempel"].append("validierung:2025-07-26T10")
+    storage.update_case(ids[1], advanced)
+    storage.delete_case(ids[0])
+    assert storage.count_by_status() == {"erfassung": 1, "verarbeitung": 1, "validierung": 1}
+    assert storage.case_ids_by_status("erfassung") == [ids[2]]
+
+    # Neue Instanz: Status aus Index + Journal, ohne AFM-Strings zu dekodieren
+    reopened = AFMJournalStorage(tmp_path / "cases.json")
+    monkeypatch.setattr(reopened, "parse_afm_string_to_case", lambda afm: pytest.fail("dekodiert"))
+    assert reopened.count_by_status() == {"erfassung": 1, "verarbeitung": 1, "validierung": 1}
+    assert reopened.case_ids_by_status("validierung") == [ids[1]]
+
+def test_metadata_sidecar_tracks_writes(tmp_path, monkeypatch, sample_case):
+    """Anzahl, Status, Feldkatalog und letzter Case kommen ohne Parsing aus dem Sidecar"""
+    from utils.afm_sqlite import AFMSQLiteStorage
+
+    for storage in (AFMJournalStorage(tmp_path / "cases.json", compact_threshold=3),
+                    AFMSQLiteStorage(tmp_path / "cases.sqlite")):
+        storage.save_pure_afm_data([sample_case(i) for i in range(4)])
+        ids = storage.case_ids()
+        extra = dict(sample_case(9), kategorie="Firmenbuch")
+        storage.append_case(extra)
+        storage.delete_case(ids[0])
+        changed = storage.get_case(ids[1])
+        changed["zeitstempel"].append("verarbeitung:2025-07-25T10")
+        del changed["fundstellen"]
+        storage.update_case(ids[1], changed)
+        storage.compact()
+
+        expected_fields = {"fallnummer": 4, "quelle": 4, "fundstellen": 3, "zeitstempel": 4, "uuid": 4,
+                           "kategorie": 1}
+        metadata = storage.metadata()
+        assert metadata["case_count"] == storage.get_cases_count() == 4
+        assert metadata["status_counts"] == {"erfassung": 3, "verarbeitung": 1}
+        assert metadata["fields"] == expected_fields
+        assert storage.get_latest_case()["fallnummer"] == "HR-2025-009"
+
+    reopened = AFMJournalStorage(tmp_path / "cases.json")
+    monkeypatch.setattr(reopened, "parse_afm_string_to_case", lambda afm: pytest.fail("dekodiert"))
+    monkeypatch.setattr(reopened, "_load_state", lambda: pytest.fail("geladen"))
+    assert reopened.metadata()["fields"] == expected_fields
+    assert reopened.metadata()["version"] == reopened.lock.version()
+
+def test_missing_metadata_sidecar_is_rebuilt_once(tmp_path, monkeypatch, sample_case):
+    """Ein fehlender Sidecar wird beim ersten Lesen neu aufgebaut und gespeichert, der Storage bleibt unverändert"""
+    from utils.afm_sqlite import AFMSQLiteStorage, migrate_to_sqlite
+
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(4)])
+    storage.case_metadata.meta_file.unlink()
+
+    before = (tmp_path / "cases.json").read_bytes()
+    reader = AFMJournalStorage(tmp_path / "cases.json")
+    assert reader.metadata()["case_count"] == 4
+    assert reader.case_metadata.meta_file.exists()
+    assert (tmp_path / "cases.json").read_bytes() == before and reader.lock.version() == 1
+    other = AFMJournalStorage(tmp_path / "cases.json")
+    monkeypatch.setattr(other, "_compute_metadata", lambda: pytest.fail("neu berechnet"))
+    assert other.get_cases_count() == 4
+    monkeypatch.undo()
+
+    reader.append_case(sample_case(4))
+    assert reader.case_metadata.meta_file.exists()
+    assert AFMJournalStorage(tmp_path / "cases.json").metadata()["fields"]["quelle"] == 5
+
+    migrate_to_sqlite(tmp_path / "cases.json", tmp_path / "cases.sqlite")
+    sqlite = AFMSQLiteStorage(tmp_path / "cases.sqlite")
+    assert sqlite.metadata()["fields"]["quelle"] == 5
+    assert sqlite._field_counts() is None
+    sqlite.append_case(sample_case(5))
+    assert sqlite._field_counts()["quelle"] == 6
+    sqlite.close()
+
+def test_erfassung_index_queries_decode_only_matches(tmp_path, monkeypatch, sample_case):
+    """Zeitraum-, Seit- und Neueste-N-Abfragen per Binärsuche über erfassung_timestamps"""
+    from datetime import date, datetime
+    from utils.afm_sqlite import AFMSQLiteStorage
+
+    def case(nr, day, hour):
+        return dict(sample_case(nr), zeitstempel=[f"erfassung:2025-07-{day:02d}T{hour:02d}:15:00"])
+
+    cases = [case(0, 25, 9), case(1, 24, 16), case(2, 26, 8), case(3, 24, 23), case(4, 25, 17)]
+    for storage in (AFMJournalStorage(tmp_path / "cases.json"), AFMSQLiteStorage(tmp_path / "cases.sqlite")):
+        storage.save_pure_afm_data([dict(c) for c in cases])
+        fallnummern = lambda found: [c["fallnummer"] for c in found]
+
+        assert fallnummern(storage.get_cases_by_erfassung(date(2025, 7, 25), date(2025, 7, 26))) == [
+            "HR-2025-000", "HR-2025-004"]
+        assert fallnummern(storage.get_cases_since(datetime(2025, 7, 25, 17, 30))) == ["HR-2025-004", "HR-2025-002"]
+        assert fallnummern(storage.get_cases_by_erfassung(end="2025-07-24T23:30")) == ["HR-2025-001", "HR-2025-003"]
+        assert fallnummern(storage.get_newest_cases(2)) == ["HR-2025-004", "HR-2025-002"]
+
+        # Inkrementell nachgeführt: Änderung verschiebt den Case im Index
+        ids = storage.case_ids()
+        moved = storage.get_case(ids[2])
+        moved["zeitstempel"] = ["erfassung:2025-07-24T10:00:00"]
+        storage.update_case(ids[2], moved)
+        storage.delete_case(ids[4])
+        assert storage.case_ids_by_erfassung("2025-07-24", "2025-07-25") == [ids[2], ids[1], ids[3]]
+
+    decoded = []
+    parse = storage.parse_afm_string_to_case
+    reopened = AFMJournalStorage(tmp_path / "cases.json")
+    monkeypatch.setattr(reopened, "parse_afm_string_to_case", lambda afm: decoded.append(afm) or parse(afm))
+    assert fallnummern(reopened.get_newest_cases(1)) == ["HR-2025-000"]
+    assert len(decoded) == 1
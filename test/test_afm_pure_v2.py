@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests für den binären afm_pure_v2 Container - pytest kompatibel
+"""
+
+from utils.afm_case import AFMCase
+from utils.afm_pure import AFMPureStorage
+
+def test_pure_v2_random_access_and_roundtrip(tmp_path, sample_case):
+    """afm_pure_v2 liefert Einzel-Cases und Bereiche; v1 ↔ v2 ist verlustfrei"""
+    from utils.afm_pure_v2 import AFMPureV2Storage, convert_v1_to_v2, convert_v2_to_v1
+
+    v1 = AFMPureStorage(tmp_path / "cases.json")
+    v1.save_pure_afm_data([sample_case(i) for i in range(20)])
+    assert convert_v1_to_v2(tmp_path / "cases.json", tmp_path / "cases.afm2") == 20
+
+    storage = AFMPureV2Storage(tmp_path / "cases.afm2")
+    assert storage.get_cases_count() == 20
+    case = storage.get_case_at(5)
+    assert isinstance(case, AFMCase) and not case.is_dirty("pure_afm")
+    assert case["fallnummer"] == "HR-2025-005"
+    page = list(storage.iter_case_range(18, 25))
+    assert all(isinstance(c, AFMCase) for c in page)
+    assert [c["fallnummer"] for c in page] == ["HR-2025-018", "HR-2025-019"]
+    assert storage.get_case_at(5)["uuid"] == storage.case_ids()[5]
+    assert storage.load_pure_afm_data() == v1.load_pure_afm_data()
+
+    case_id = storage.append_case(sample_case(20))
+    assert storage.get_cases_count() == 21
+    assert storage.get_case(case_id)["fallnummer"] == "HR-2025-020"
+    storage.close()
+
+    assert convert_v2_to_v1(tmp_path / "cases.afm2", tmp_path / "back.json") == 21
+    assert AFMPureStorage(tmp_path / "back.json").load_afm_strings() == storage.load_afm_strings()
+
+def test_pure_v2_reads_single_records_on_demand(tmp_path, monkeypatch, sample_case):
+    """Einzelzugriffe lesen nur den betroffenen Record; Schreiben gibt das Mapping vorher frei"""
+    from utils import afm_pure_v2
+    from utils.afm_pure_v2 import AFMPureV2File, AFMPureV2Slots, AFMPureV2Storage
+
+    AFMPureV2Storage(tmp_path / "cases.afm2").save_pure_afm_data([sample_case(i) for i in range(50)])
+    storage = AFMPureV2Storage(tmp_path / "cases.afm2")
+    ids = storage.case_ids()
+
+    reads = []
+    read_slot = AFMPureV2File.read_slot
+    monkeypatch.setattr(AFMPureV2File, "read_slot",
+                        lambda self, position: reads.append(position) or read_slot(self, position))
+    assert storage.get_case(ids[17])["fallnummer"] == "HR-2025-017"
+    assert reads == [17]
+    assert isinstance(storage._slots, AFMPureV2Slots)
+
+    mapped = []
+    write_pure_v2 = afm_pure_v2.write_pure_v2
+    monkeypatch.setattr(afm_pure_v2, "write_pure_v2",
+                        lambda *args, **kwargs: mapped.append(storage._container) or write_pure_v2(*args, **kwargs))
+    changed = storage.get_case(ids[3])
+    changed["quelle"] = "Grundbuch Graz"
+    storage.update_case(ids[3], changed)
+    storage.delete_case(ids[4])
+    assert mapped == [None, None]
+    assert isinstance(storage._slots, AFMPureV2Slots)
+
+    del reads[:]
+    assert storage.get_case(ids[3])["quelle"] == "Grundbuch Graz"
+    assert storage.get_case(ids[4]) is None
+    assert storage.get_cases_count() == 49
+    assert reads == [3]
+    storage.close()
+    assert AFMPureV2Storage(tmp_path / "cases.afm2").case_ids() == ids[:4] + ids[5:]
+
+def test_pure_v2_count_skips_undecodable_records(tmp_path, sample_case):
+    """Die Case-Anzahl kommt aus den Metadaten - ungültige Records im Container zählen nicht mit"""
+    from utils.afm_pure_v2 import AFMPureV2File, AFMPureV2Storage, write_pure_v2
+
+    AFMPureV2Storage(tmp_path / "cases.afm2").save_pure_afm_data([sample_case(i) for i in range(3)])
+    with AFMPureV2File(tmp_path / "cases.afm2") as container:
+        slots = list(container.iter_slots())
+    write_pure_v2(tmp_path / "cases.afm2", [s[0] for s in slots] + ["kein-afm-string"],
+                  [s[1] for s in slots] + [""])
+
+    storage = AFMPureV2Storage(tmp_path / "cases.afm2")
+    assert storage.get_cases_count() == 3
+    assert storage.get_case_at(3) is None
+    assert [c["fallnummer"] for c in storage.iter_case_range()] == ["HR-2025-000", "HR-2025-001", "HR-2025-002"]
+    storage.close()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests für den SQLite-Storage - pytest kompatibel
+"""
+
+from utils.afm_journal import AFMJournalStorage
+
+def test_sqlite_storage_migration_and_indexed_queries(tmp_path, sample_case):
+    """Migration aus afm_pure_v1.0 (inkl. Journal) und indizierte Abfragen in SQLite"""
+    from utils.afm_sqlite import AFMSQLiteStorage, migrate_to_sqlite
+
+    source = AFMJournalStorage(tmp_path / "cases.json")
+    source.save_pure_afm_data([sample_case(i) for i in range(10)])
+    changed = sample_case(3)
+    changed["zeitstempel"].append("verarbeitung:2025-07-25T10")
+    source.update_case(source.case_ids()[3], changed)
+
+    assert migrate_to_sqlite(tmp_path / "cases.json", tmp_path / "cases.sqlite") == 10
+
+    storage = AFMSQLiteStorage(tmp_path / "cases.sqlite")
+    assert storage.case_ids() == source.case_ids()
+    assert storage.load_pure_afm_data() == source.load_pure_afm_data()
+    assert storage.count_by_status() == {"erfassung": 9, "verarbeitung": 1}
+    assert [c["fallnummer"] for c in storage.get_cases_by_status("verarbeitung")] == ["HR-2025-003"]
+    assert storage.find_by_fallnummer("HR-2025-007")[0]["uuid"] == source.case_ids()[7]
+    # Sortierung nach Fallnummer ohne Dekodierung - SQLite und Pure AFM gleich
+    for other in (storage, source):
+        renamed = other.get_case(source.case_ids()[1])
+        renamed["fallnummer"] = "HR-2025-999"
+        other.update_case(renamed["uuid"], renamed)
+        ordered = other.case_ids_by_status("erfassung", by_fallnummer=True)
+        assert ordered[0] == source.case_ids()[0] and ordered[-1] == source.case_ids()[1]
+
+    fingerprint = storage.fingerprint()
+    case_id = storage.append_case(sample_case(10))
+    assert storage.fingerprint() != fingerprint
+    assert storage.delete_case(source.case_ids()[0])
+    assert storage.get_cases_count() == 10
+    assert storage.get_last_cases(1)[0]["uuid"] == case_id
+    storage.close()
+
+def test_database_iter_cases_closes_sqlite_connection(tmp_path, monkeypatch, sample_case):
+    """database.iter_cases schließt die SQLite-Verbindung nach vollständigem und abgebrochenem Durchlauf"""
+    from utils import database
+    from utils.afm_sqlite import AFMSQLiteStorage
+
+    AFMSQLiteStorage(tmp_path / "cases.sqlite").save_pure_afm_data([sample_case(i) for i in range(5)])
+    closed = []
+    close = AFMSQLiteStorage.close
+    monkeypatch.setattr(AFMSQLiteStorage, "close", lambda self: closed.append(self) or close(self))
+
+    assert [case["fallnummer"] for case in database.iter_cases(str(tmp_path / "cases.sqlite"))][-1] == "HR-2025-004"
+    assert len(closed) == 1
+
+    cases = database.iter_cases(str(tmp_path / "cases.sqlite"))
+    assert next(cases)["fallnummer"] == "HR-2025-000"
+    cases.close()
+    assert len(closed) == 2
+
+def test_sqlite_uses_one_connection_per_thread(tmp_path, sample_case):
+    """Jeder Thread schreibt über eine eigene Verbindung, der Fingerprint ist in allen gleich"""
+    import threading
+    from utils.afm_sqlite import AFMSQLiteStorage
+
+    storage = AFMSQLiteStorage(tmp_path / "cases.sqlite")
+    storage.save_pure_afm_data([sample_case(i) for i in range(3)])
+    fingerprint = storage.fingerprint()
+    used = []
+
+    def run(action):
+        thread = threading.Thread(target=lambda: used.append((storage.connection, action(), storage.fingerprint())))
+        thread.start()
+        thread.join()
+        return used[-1]
+
+    connection, case_id, written = run(lambda: storage.append_case(sample_case(3)))
+    assert connection is not storage.connection
+    assert written == storage.fingerprint() != fingerprint
+    assert storage.get_case(case_id)["fallnummer"] == "HR-2025-003"
+
+    # Die Verbindung des beendeten Threads wird beim nächsten Öffnen geschlossen
+    second, ids, _ = run(storage.case_ids)
+    assert ids == storage.case_ids() and second is not connection
+    assert connection not in storage._connections.values() and len(storage._connections) == 2
+    storage.close()
+    assert not storage._connections
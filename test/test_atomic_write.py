@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Tests für atomares Schreiben - pytest kompatibel
+"""
+
+from utils.afm_pure import AFMPureStorage
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path, sample_case):
+    """Ein abgebrochener Schreibvorgang hinterlässt die bisherige Datei unverändert"""
+    from utils.atomic_write import atomic_write, atomic_write_json, sync_pending
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(3)])
+    before = storage.storage_file.read_bytes()
+
+    try:
+        with atomic_write(storage.storage_file) as f:
+            f.write('{"format": "afm_pure_v1.0", "afm_str')
+            raise RuntimeError("Absturz während des Schreibens")
+    except RuntimeError:
+        pass
+
+    assert storage.storage_file.read_bytes() == before
+    assert not list(tmp_path.glob("*.tmp"))
+    assert len(AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()) == 3
+
+    for durability in ("always", "batched", "never"):
+        atomic_write_json(tmp_path / "data.json", {"durability": durability}, durability=durability)
+    sync_pending()
+    assert '"never"' in (tmp_path / "data.json").read_text(encoding='utf-8')
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests für den CaseCache (Fingerprint-Invalidierung, In-place Pflege) - pytest kompatibel
+"""
+
+import pytest
+
+from utils.afm_journal import AFMJournalStorage
+
+@pytest.fixture
+def storage(tmp_path, sample_case):
+    """Journal-Storage mit 5 Cases"""
+    storage = AFMJournalStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(5)])
+    return storage
+
+@pytest.fixture
+def case_cache_module(gui_module):
+    return gui_module("gui.services.case_cache")
+
+@pytest.mark.parametrize("validation", ["stat", "hash"])
+def test_cache_hits_until_external_write(tmp_path, storage, sample_case, case_cache_module, validation):
+    """Wiederholte Zugriffe treffen den Cache, Schreiben einer anderen Storage-Instanz invalidiert ihn"""
+    cache = case_cache_module.CaseCache(storage, validation=validation)
+    cases = cache.get_cases()
+    assert cache.get_cases() is cases
+    assert cache.get_case(cases[2]["uuid"]) is cases[2]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    other = AFMJournalStorage(tmp_path / "cases.json")
+    changed = other.get_case(cases[2]["uuid"])
+    changed["quelle"] = "Grundbuch Graz"
+    other.update_case(changed["uuid"], changed)
+
+    assert not cache.is_current()
+    assert cache.get_case(cases[2]["uuid"]) is None
+    reloaded = cache.get_cases()
+    assert reloaded is not cases
+    assert reloaded[2]["quelle"] == "Grundbuch Graz"
+    assert cache.misses == 2
+
+def test_commit_keeps_or_drops_cases(storage, case_cache_module):
+    """commit übernimmt eigene Schreibvorgänge, war der Cache vorher veraltet, wird er verworfen"""
+    cache = case_cache_module.CaseCache(storage)
+    ids = [case["uuid"] for case in cache.get_cases()]
+    storage.delete_case(ids[0])
+    cache.remove(ids[0])
+    cache.commit()
+    assert cache.is_current()
+    assert len(cache.get_cases()) == 4
+
+    storage.delete_case(ids[1])
+    cache.commit(was_current=False)
+    assert not cache.is_current()
+    assert [case["fallnummer"] for case in cache.get_cases()] == ["HR-2025-002", "HR-2025-003", "HR-2025-004"]
+
+def test_replace_takes_new_list(storage, sample_case, case_cache_module):
+    """replace übernimmt eine vollständig gespeicherte Liste samt aktuellem Fingerprint"""
+    cache = case_cache_module.CaseCache(storage)
+    cache.get_cases()
+    cases = [sample_case(i) for i in range(10, 13)]
+    storage.save_pure_afm_data(cases)
+    cache.replace(cases)
+    assert cache.is_current()
+    assert cache.get_cases() == cases
+    assert cache.get_case(cases[1]["uuid"]) is cases[1]
+
+def test_put_and_remove_in_place(storage, sample_case, case_cache_module):
+    """put ersetzt an gleicher Position oder hängt an, remove entfernt - Reihenfolge bleibt erhalten"""
+    cache = case_cache_module.CaseCache(storage)
+    cases = cache.get_cases()
+    ids = [case["uuid"] for case in cases]
+
+    replacement = dict(cases[3], quelle="Grundbuch Graz")
+    cache.put(ids[3], replacement)
+    assert cases[3] is replacement
+    cache.remove(ids[1])
+    added = dict(sample_case(9), uuid="neu")
+    cache.put("neu", added)
+    # Nach dem Entfernen sind die Positionen verschoben
+    second = dict(cases[2], quelle="Firmenbuch Linz")
+    cache.put(ids[4], dict(cases[3], quelle="Grundbuch Wien"))
+    cache.put(ids[3], second)
+
+    assert [case["uuid"] for case in cache.get_cases()] == [ids[0], ids[2], ids[3], ids[4], "neu"]
+    assert cache.get_cases()[2] is second
+    assert cache.get_cases()[3]["quelle"] == "Grundbuch Wien"
+    assert cache.get_case("neu") is added
+    assert cache.get_case(ids[1]) is None
+
+    cache.invalidate()
+    cache.put("neu", added)
+    cache.remove(ids[0])
+    assert cache.get_cases() is not cases
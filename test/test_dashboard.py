@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests für die Dashboard-Tabelle (seitenweises Füllen ohne Volldekodierung) - pytest kompatibel
+"""
+
+from types import SimpleNamespace
+
+from utils.afm_journal import AFMJournalStorage
+
+STATUS_MAPPING = {
+    "erfassung": {"name": "NEU", "emoji": "🔴"},
+    "verarbeitung": {"name": "Bearbeitung", "emoji": "🟡"},
+    "validierung": {"name": "Freigegeben", "emoji": "🟢"},
+    "archivierung": {"name": "Abgeschlossen", "emoji": "⚫"},
+}
+
+class FakeTree:
+    """Minimaler Treeview-Ersatz: merkt sich eingefügte Zeilen"""
+
+    def __init__(self):
+        self.rows = []
+
+    def get_children(self):
+        return list(range(len(self.rows)))
+
+    def delete(self, item):
+        self.rows.pop()
+
+    def insert(self, parent, index, values, tags):
+        self.rows.append((values, tags))
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+def test_dashboard_decodes_only_displayed_rows(tmp_path, monkeypatch, sample_case, gui_module):
+    """Die Tabelle holt IDs aus dem Status-Index und dekodiert nur die eingefügte Seite"""
+    data_service = gui_module("gui.services.data_service")
+    dashboard = gui_module("gui.components.dashboard")
+
+    # Status "neu" (ohne Zeitstempel) vorn, sonst absteigende Fallnummern
+    cases = [dict(sample_case(i), zeitstempel=[]) for i in range(250, 253)]
+    cases += [sample_case(i) for i in reversed(range(250))]
+    for case in cases[-10:]:
+        case["zeitstempel"].append("verarbeitung:2025-07-25T10")
+    AFMJournalStorage(tmp_path / "cases.json").save_pure_afm_data(cases)
+
+    service = data_service.DataService(tmp_path / "cases.json")
+    decoded = []
+    parse = service.pure_storage.parse_afm_string_to_case
+    monkeypatch.setattr(service.pure_storage, "parse_afm_string_to_case",
+                        lambda afm: decoded.append(afm) or parse(afm))
+
+    component = dashboard.DashboardComponent(SimpleNamespace(data_service=service, status_mapping=STATUS_MAPPING))
+    component.tree = FakeTree()
+    component.populate_table()
+
+    assert len(decoded) == dashboard.ROW_PAGE_SIZE
+    assert len(component.tree.rows) == dashboard.ROW_PAGE_SIZE
+    assert len(component.row_ids) == 253
+    assert component.filter_statuses[-1] == "neu"
+    # NEU vor Bearbeitung, innerhalb eines Status nach Fallnummer
+    fallnummern = [values[1] for values, _ in component.tree.rows]
+    assert fallnummern[:2] == ["HR-2025-010", "HR-2025-011"]
+    assert component.tree.rows[0][1][0] == component.tree.rows[0][0][0]
+
+    for _ in range(3):
+        component.on_tree_scroll("0.8", "1.0")
+    assert len(component.tree.rows) == 253
+    assert len(decoded) == 253
+    assert [values[1] for values, _ in component.tree.rows[240:250]] == [f"HR-2025-{i:03d}" for i in range(10)]
+    assert component.tree.rows[249][0][4] == "🟡 Bearbeitung"
+    # Status ohne Mapping erscheinen zuletzt statt zu fehlen
+    assert [values[1] for values, _ in component.tree.rows[-3:]] == ["HR-2025-250", "HR-2025-251", "HR-2025-252"]
+    assert component.tree.rows[-1][0][4] == "⚪ Ohne Zeitstempel"
+
+    component.on_tree_scroll("0.9", "1.0")
+    assert len(decoded) == 253
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests für den DataService (Unit of Work, Cache-Konsistenz) - pytest kompatibel
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure import AFMPureStorage
+
+@pytest.fixture
+def make_service(tmp_path, sample_case, gui_module):
+    """Fabrik: DataService über einem Journal-Storage mit 5 Cases"""
+    data_service = gui_module("gui.services.data_service")
+    AFMJournalStorage(tmp_path / "cases.json").save_pure_afm_data([sample_case(i) for i in range(5)])
+
+    def make(**options):
+        options.setdefault("storage_mode", "journal")
+        return data_service.DataService(tmp_path / "cases.json", **options)
+    return make
+
+def _count_writes(monkeypatch, storage):
+    """write_batch-Aufrufe des Storage mitzählen"""
+    calls = []
+    write_batch = storage.write_batch
+
+    def counting(operations):
+        calls.append(list(operations))
+        return write_batch(operations)
+    monkeypatch.setattr(storage, "write_batch", counting)
+    return calls
+
+def _stored_quellen(tmp_path):
+    return [case["quelle"] for case in AFMJournalStorage(tmp_path / "cases.json").load_pure_afm_data()]
+
+def test_transaction_writes_once(tmp_path, monkeypatch, make_service):
+    """Alle Änderungen einer (verschachtelten) Transaktion gehen in einen Schreibvorgang"""
+    service = make_service()
+    ids = [case["uuid"] for case in service.get_cases()]
+    calls = _count_writes(monkeypatch, service.pure_storage)
+
+    with service.transaction():
+        service.update_case(ids[0], {"quelle": "Grundbuch Graz"})
+        with service.transaction():
+            service.advance_case_status(ids[1])
+            service.delete_case(ids[2])
+        new_id = service.create_empty_case()
+        service.delete_case(new_id)
+        assert not calls
+
+    assert len(calls) == 1
+    assert sorted(op for op, _, _ in calls[0]) == ["del", "set", "set"]
+    assert _stored_quellen(tmp_path)[:2] == ["Grundbuch Graz", "Handelsregister Wien 1"]
+    assert len(service.get_cases()) == 4
+    assert service.case_cache.is_current()
+
+def test_debounced_changes_flush_after_delay(tmp_path, monkeypatch, make_service):
+    """Mit flush_delay fallen schnelle Änderungen zu einem Schreibvorgang zusammen"""
+    service = make_service(flush_delay=0.05)
+    ids = [case["uuid"] for case in service.get_cases()]
+    calls = _count_writes(monkeypatch, service.pure_storage)
+
+    service.update_case(ids[0], {"quelle": "Grundbuch Graz"})
+    service.update_case(ids[0], {"fundstellen": "EZ 12"})
+    service.update_case(ids[3], {"quelle": "Firmenbuch Linz"})
+    assert not calls
+    assert service.get_case(ids[0])["fundstellen"] == "EZ 12"
+
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with service._lock:
+        assert len(calls) == 1 and len(calls[0]) == 2
+    assert service.flush() == 0
+    assert _stored_quellen(tmp_path)[3] == "Firmenbuch Linz"
+
+def test_failed_flush_keeps_cache_and_pending_consistent(tmp_path, monkeypatch, make_service):
+    """Fehlgeschlagenes Schreiben verändert keinen gecachten Case und verliert keine Änderung"""
+    service = make_service()
+    ids = [case["uuid"] for case in service.get_cases()]
+    cached = service.get_case(ids[0])
+    write_batch = service.pure_storage.write_batch
+
+    def failing(operations):
+        raise OSError("Datenträger voll")
+    monkeypatch.setattr(service.pure_storage, "write_batch", failing)
+
+    with pytest.raises(OSError):
+        service.update_case(ids[0], {"quelle": "Grundbuch Graz"})
+    assert cached["quelle"] == "Handelsregister Wien 0"
+    assert not service.case_cache.is_current()
+    assert service.get_case(ids[0])["quelle"] == "Grundbuch Graz"
+    assert _stored_quellen(tmp_path)[0] == "Handelsregister Wien 0"
+
+    monkeypatch.setattr(service.pure_storage, "write_batch", write_batch)
+    assert service.flush() == 1
+    assert _stored_quellen(tmp_path)[0] == "Grundbuch Graz"
+    assert service.get_cases()[0]["quelle"] == "Grundbuch Graz"
+
+def test_sync_and_shutdown_flushes_pending(tmp_path, make_service):
+    """Beim Beenden werden ausstehende Änderungen geschrieben und das Journal kompaktiert"""
+    service = make_service(flush_delay=60)
+    ids = [case["uuid"] for case in service.get_cases()]
+    service.update_case(ids[4], {"quelle": "Grundbuch Graz"})
+    assert _stored_quellen(tmp_path)[4] == "Handelsregister Wien 4"
+
+    success, _ = service.sync_and_shutdown()
+    assert success
+    assert service._flush_timer is None
+    assert service.pure_storage.journal_size() == 0
+    assert _stored_quellen(tmp_path)[4] == "Grundbuch Graz"
+
+def test_status_queries_wait_for_running_flush(make_service):
+    """Status-Abfragen laufen unter der Service-Sperre - nie zwischen Flush und Index-Update"""
+    service = make_service()
+    case_id = service.get_cases()[0]["uuid"]
+    results = []
+    with service._lock:
+        service.update_case(case_id, {"zeitstempel": ["erfassung:2025-07-24T00", "verarbeitung:2025-07-25T10"]})
+        thread = threading.Thread(target=lambda: results.append(
+            (service.get_status_counts(), service.get_case_ids_by_status("verarbeitung"))))
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive() and not results
+    thread.join(5)
+    assert results == [({"erfassung": 4, "verarbeitung": 1}, [case_id])]
+
+def test_default_storage_mode_keeps_plain_snapshot(tmp_path, make_service):
+    """Ohne Opt-in schreibt der DataService weiter nur den Snapshot - kein Journal"""
+    service = make_service(storage_mode=None)
+    assert type(service.pure_storage) is AFMPureStorage
+    case_id = service.get_cases()[0]["uuid"]
+    service.update_case(case_id, {"quelle": "Grundbuch Graz"})
+    assert not (tmp_path / "cases.journal").exists()
+    assert _stored_quellen(tmp_path)[0] == "Grundbuch Graz"
+
+    with pytest.raises(ValueError):
+        make_service(storage_mode="journl")
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Tests für den JSON-Codec - pytest kompatibel
+"""
+
+import pytest
+
+from .conftest import make_sample_case
+
+@pytest.mark.parametrize("data", [
+    make_sample_case(7),
+    {"quelle": "Grundbuch Österreich", "fundstellen": "EZ 12, KG: Wien", "zeitstempel": []},
+    {"bemerkung": "Zeile 1\nZeile \"2\"", "nr": 12, "anteil": 0.5, "leer": None, "ok": True},
+    {"groß": 2 ** 70, "liste": [{}, [], ""]},
+])
+def test_json_codec_backends_are_byte_identical(data):
+    """Alle JSON-Backends erzeugen exakt die Ausgabe der Standardbibliothek"""
+    import json
+    from utils import json_codec
+
+    for backend in json_codec.JSON_BACKENDS:
+        assert json_codec.canonical_dumps(data, backend=backend) == json.dumps(data, ensure_ascii=False, sort_keys=True)
+        assert json_codec.dumps(data, indent=2, backend=backend) == json.dumps(data, ensure_ascii=False, indent=2)
+        assert json_codec.dumps(data, compact=True, backend=backend) == json.dumps(
+            data, ensure_ascii=False, separators=(',', ':'))
+        assert json_codec.loads(json.dumps(data), backend=backend) == data
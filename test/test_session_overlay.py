@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests für das Session-Overlay - pytest kompatibel
+"""
+
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure import AFMPureStorage
+
+def test_session_overlay_commits_only_deltas(tmp_path, sample_case):
+    """Session-Overlay speichert nur berührte Cases und schreibt beim Übernehmen nur diese"""
+    from utils.session_overlay import AFMSessionOverlay
+
+    storage = AFMJournalStorage(tmp_path / "cases.json", compact_threshold=10_000)
+    storage.save_pure_afm_data([sample_case(i) for i in range(200)])
+    overlay = AFMSessionOverlay(tmp_path / "session_overlay.json")
+
+    cases = overlay.apply(storage.load_pure_afm_data())
+    cases[5]["quelle"] = "Grundbuch Graz"
+    overlay.record("set", cases[5])
+    overlay.record("del", cases[7])
+    temporary = sample_case(300)
+    overlay.record("add", temporary)
+    overlay.record("del", temporary)
+    overlay.record("add", sample_case(201))
+    overlay.save()
+
+    reopened = AFMSessionOverlay(tmp_path / "session_overlay.json")
+    assert len(reopened.changes) == 3
+    assert overlay.overlay_file.stat().st_size < 1000
+    cases = reopened.apply(storage.load_pure_afm_data())
+    assert len(cases) == 200 + reopened.count_delta()
+    assert cases[5]["quelle"] == "Grundbuch Graz"
+    assert [c["fallnummer"] for c in cases[6:8]] == ["HR-2025-006", "HR-2025-008"]
+    assert cases[-1]["fallnummer"] == "HR-2025-201"
+
+    assert len(storage.write_batch(reopened.operations())) == 3
+    assert storage.journal_size() == 3
+    reopened.clear()
+    assert not reopened.overlay_file.exists()
+    assert [c["fallnummer"] for c in storage.load_pure_afm_data()] == [c["fallnummer"] for c in cases]
+
+def test_data_service_keeps_session_changes_in_overlay(tmp_path, monkeypatch, sample_case, gui_module):
+    """DataService (Session-Variante) ändert den Storage erst beim Session-Sync"""
+    import tempfile
+
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(tmp_path))
+    data_service_old = gui_module("gui.services.data_service_old")
+
+    storage = AFMPureStorage(tmp_path / "cases.json")
+    storage.save_pure_afm_data([sample_case(i) for i in range(5)])
+    service = data_service_old.DataService(tmp_path / "cases.json")
+
+    assert service.update_case(1, {"quelle": "Grundbuch Graz"})
+    deleted, case = service.delete_case(3)
+    assert deleted and case["fallnummer"] == "HR-2025-003"
+    assert service.get_case_count() == 4
+    assert service.get_cases()[1]["quelle"] == "Grundbuch Graz"
+
+    # Storage unverändert, nur das Overlay ist geschrieben
+    assert service.session_overlay.overlay_file.exists()
+    assert len(service.session_overlay.changes) == 2
+    stored = AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()
+    assert len(stored) == 5 and stored[1]["quelle"] == "Handelsregister Wien 1"
+
+    synced, _ = service.sync_session_data()
+    assert synced
+    assert not service.session_overlay.changes
+    assert not service.session_overlay.overlay_file.exists()
+    stored = AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()
+    assert [c["fallnummer"] for c in stored] == ["HR-2025-000", "HR-2025-001", "HR-2025-002", "HR-2025-004"]
+    assert stored[1]["quelle"] == "Grundbuch Graz"
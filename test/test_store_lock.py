@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests für prozessübergreifende Sperren und optimistische Schreiber - pytest kompatibel
+"""
+
+import time
+
+import pytest
+
+from utils.afm_journal import AFMJournalStorage
+from utils.afm_pure import AFMPureStorage
+from .conftest import make_sample_case
+
+def _append_cases(storage_file, start, count):
+    """Worker: hängt Cases über eine eigene Storage-Instanz an"""
+    storage = AFMPureStorage(storage_file)
+    for nr in range(start, start + count):
+        storage.append_case(make_sample_case(nr))
+
+def _hold_shared(storage_file, ready, seconds):
+    """Worker: hält die geteilte Lesesperre des Storage für einige Sekunden"""
+    storage = AFMPureStorage(storage_file)
+    with storage.lock.shared():
+        ready.set()
+        time.sleep(seconds)
+
+def test_concurrent_writers_do_not_lose_updates(tmp_path, sample_case):
+    """Veraltete Schreiber wenden nur ihre eigenen Änderungen auf den neuen Stand an"""
+    import multiprocessing
+
+    first = AFMPureStorage(tmp_path / "cases.json")
+    first.save_pure_afm_data([sample_case(i) for i in range(3)])
+    second = AFMPureStorage(tmp_path / "cases.json")
+    ids = second.case_ids()
+    version = first.lock.version()
+
+    changed = sample_case(0)
+    changed["quelle"] = "Grundbuch Graz"
+    first.update_case(ids[0], changed)
+    # second hat den Stand vor dem Update gelesen
+    other = sample_case(1)
+    other["quelle"] = "Firmenbuch Linz"
+    second.update_case(ids[1], other)
+
+    assert first.lock.version() == version + 2
+    cases = AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()
+    assert [c["quelle"] for c in cases[:2]] == ["Grundbuch Graz", "Firmenbuch Linz"]
+
+    workers = [
+        multiprocessing.Process(target=_append_cases, args=(tmp_path / "cases.json", 100 + 10 * i, 10))
+        for i in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(AFMPureStorage(tmp_path / "cases.json").load_pure_afm_data()) == 33
+
+def test_compaction_waits_for_shared_lock_of_other_process(tmp_path, sample_case):
+    """Kompaktierung wartet auf fremde Leser und wandelt keine eigene geteilte Sperre um"""
+    import multiprocessing
+
+    storage = AFMJournalStorage(tmp_path / "cases.json", compact_threshold=10_000)
+    storage.save_pure_afm_data([sample_case(i) for i in range(5)])
+    storage.append_case(sample_case(5))
+    storage.append_case(sample_case(6))
+    assert storage.journal_size() == 2
+
+    with storage.lock.shared():
+        with pytest.raises(RuntimeError):
+            with storage.lock.exclusive():
+                pass
+
+    ready = multiprocessing.Event()
+    reader = multiprocessing.Process(target=_hold_shared, args=(tmp_path / "cases.json", ready, 0.5))
+    reader.start()
+    try:
+        assert ready.wait(10)
+        start = time.monotonic()
+        assert storage.compact() == 2
+        assert time.monotonic() - start >= 0.3
+    finally:
+        reader.join(10)
+    assert reader.exitcode == 0
+    assert storage.journal_size() == 0
+    assert len(AFMJournalStorage(tmp_path / "cases.json").case_ids()) == 7
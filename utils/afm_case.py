@@ -0,0 +1,352 @@
+"""
+AFMTool1 - Case mit Änderungsverfolgung
+Ein Case-Dict, das bei jeder Änderung seine Revision erhöht und abgeleitete
+AFM-Strings (kanonischer AFM-String, kodierter Pure AFM String) je Revision
+zwischenspeichert. Unveränderte Cases werden so nicht erneut serialisiert.
+
+Für große Bestände (100k+ Cases) ist der Case kompakt: Verwaltungsdaten
+liegen in __slots__ statt in einem Instanz-__dict__, Feldnamen sowie Werte
+mit wenigen Ausprägungen (Quelle, Kategorie, vereinfachte Zeitstempel)
+werden interniert und von allen Cases gemeinsam genutzt. Verschachtelte
+Listen und Dicts melden Änderungen an ihren Case. LazyAFMCase hält
+nur den Pure AFM String und dekodiert ihn beim ersten Feldzugriff.
+"""
+import sys
+
+from .afm_codec import parse_afm_string
+from .afm_timestamps import parse_case_timestamps
+
+# Abgeleitete Felder - ihr Setzen gilt nicht als inhaltliche Änderung
+DERIVED_FIELDS = ('afm_string',)
+
+# Zwischengespeicherte abgeleitete Werte (Name → Slot)
+DERIVED_SLOTS = {'pure_afm': '_pure_afm', 'afm_string': '_afm_string'}
+
+# Felder mit wenigen Ausprägungen - Werte werden interniert
+INTERNED_FIELDS = ('quelle', 'kategorie', 'status', 'bemerkung')
+# Listeneinträge (z.B. "erfassung:2025-07-24T16") nur bis zu dieser Länge internieren
+INTERN_MAX_LENGTH = 40
+
+def _intern_short(value):
+    """Kurze Strings internieren (gleiche Werte teilen sich ein Objekt)"""
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+def _track(owner, value):
+    """
+    Verfolgte Form eines (verschachtelten) Werts
+
+    Listen und Dicts auf jeder Ebene melden Änderungen an den Case, damit
+    z.B. case["meta"]["x"] = 1 die zwischengespeicherten AFM-Strings verwirft.
+    """
+    if isinstance(value, list):
+        return AFMCaseList(owner, value)
+    if isinstance(value, dict):
+        return AFMCaseDict(owner, value)
+    return _intern_short(value)
+
+class AFMCaseList(list):
+    """Liste innerhalb eines Cases (z.B. zeitstempel) - meldet Änderungen an den Case"""
+
+    __slots__ = ('_owner',)
+
+    def __init__(self, owner, values=()):
+        super().__init__(_track(owner, value) for value in values)
+        self._owner = owner
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def _touch(self):
+        self._owner._touch()
+
+    def append(self, value):
+        super().append(_track(self._owner, value))
+        self._touch()
+
+    def extend(self, values):
+        super().extend(_track(self._owner, value) for value in values)
+        self._touch()
+
+    def insert(self, index, value):
+        super().insert(index, _track(self._owner, value))
+        self._touch()
+
+    def remove(self, value):
+        super().remove(value)
+        self._touch()
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._touch()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._touch()
+
+    def reverse(self):
+        super().reverse()
+        self._touch()
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [_track(self._owner, item) for item in value]
+        else:
+            value = _track(self._owner, value)
+        super().__setitem__(index, value)
+        self._touch()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._touch()
+
+    def __iadd__(self, values):
+        result = super().__iadd__([_track(self._owner, value) for value in values])
+        self._touch()
+        return result
+
+    def __imul__(self, factor):
+        result = super().__imul__(factor)
+        self._touch()
+        return result
+
+class AFMCaseDict(dict):
+    """Verschachteltes Dict innerhalb eines Cases - meldet Änderungen an den Case"""
+
+    __slots__ = ('_owner',)
+
+    def __init__(self, owner, data=()):
+        super().__init__()
+        self._owner = owner
+        for key, value in dict(data).items():
+            dict.__setitem__(self, key, _track(owner, value))
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def _touch(self):
+        self._owner._touch()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, _track(self._owner, value))
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            dict.__setitem__(self, key, _track(self._owner, value))
+        self._touch()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *args):
+        value = super().pop(key, *args)
+        self._touch()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._touch()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+class AFMCase(dict):
+    """Dict-kompatibler, kompakter Case mit Revision und Cache für abgeleitete AFM-Strings"""
+
+    __slots__ = ('revision', '_pure_afm', '_afm_string', '_timestamps')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.revision = 0
+        self._pure_afm = None
+        self._afm_string = None
+        self._timestamps = None
+        data = args[0] if len(args) == 1 and not kwargs and isinstance(args[0], dict) else dict(*args, **kwargs)
+        self._fill(data)
+
+    def _fill(self, data):
+        """Felder ohne Änderungsverfolgung in kompakter Form übernehmen"""
+        for key, value in data.items():
+            dict.__setitem__(self, _intern_short(key), self._compact(key, value))
+
+    def _compact(self, key, value):
+        """Gespeicherte Form eines Feldwerts (Listen und Dicts verfolgt, kurze Werte interniert)"""
+        if isinstance(value, (list, dict)):
+            return _track(self, value)
+        if key in INTERNED_FIELDS and type(value) is str:
+            return sys.intern(value)
+        return value
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    @classmethod
+    def from_storage(cls, data, **derived):
+        """Sauberen Case aus gespeicherten Daten mit bereits bekannten abgeleiteten Strings"""
+        case = cls(data)
+        for name, value in derived.items():
+            case.set_derived(name, value)
+        return case
+
+    def _touch(self):
+        self.revision += 1
+
+    def get_derived(self, name):
+        """Abgeleiteten Wert der aktuellen Revision - None wenn veraltet"""
+        entry = getattr(self, DERIVED_SLOTS[name])
+        if entry is None or entry[0] != self.revision:
+            return None
+        return entry[1]
+
+    def set_derived(self, name, value):
+        """Abgeleiteten Wert (Name aus DERIVED_SLOTS) für die aktuelle Revision merken"""
+        setattr(self, DERIVED_SLOTS[name], (self.revision, value))
+
+    def is_dirty(self, name):
+        """True wenn der abgeleitete Wert seit der letzten Erzeugung veraltet ist"""
+        return self.get_derived(name) is None
+
+    def timestamps(self):
+        """
+        Geparste Zeitstempel inkl. Status und erfassung-Eintrag - einmal je Revision
+
+        Returns:
+            ParsedTimestamps
+        """
+        if self._timestamps is None or self._timestamps[0] != self.revision:
+            self._timestamps = (self.revision, parse_case_timestamps(self.get("zeitstempel")))
+        return self._timestamps[1]
+
+    def __setitem__(self, key, value):
+        value = self._compact(key, value)
+        unchanged = key in self and dict.__getitem__(self, key) == value
+        super().__setitem__(key, value)
+        if key not in DERIVED_FIELDS and not unchanged:
+            self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *args):
+        value = super().pop(key, *args)
+        self._touch()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._touch()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._touch()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+class LazyAFMCase(AFMCase):
+    """
+    AFMCase, der seinen Pure AFM String erst beim ersten Feldzugriff dekodiert
+
+    Listenansichten und Ladevorgänge zahlen so nur für tatsächlich gelesene
+    Cases. Die Case-ID ist ohne Dekodierung bekannt, unveränderte Cases
+    werden beim Speichern mit ihrem ursprünglichen AFM-String übernommen.
+    """
+
+    __slots__ = ('_encoded', '_case_id')
+
+    def __init__(self, pure_afm, case_id=None):
+        super().__init__()
+        self._encoded = pure_afm
+        self._case_id = case_id
+        self.set_derived('pure_afm', pure_afm)
+        # Platzhalter: C-Code (z.B. der JSON-Encoder) prüft die Größe direkt am Dict
+        dict.__setitem__(self, 'uuid', case_id)
+
+    def is_decoded(self):
+        """True sobald die Felder dekodiert wurden"""
+        return self._encoded is None
+
+    def _decode(self):
+        """AFM-String einmalig dekodieren (ungültige Strings ergeben einen leeren Case)"""
+        encoded = self._encoded
+        if encoded is None:
+            return
+        self._encoded = None
+        dict.clear(self)
+        data = parse_afm_string(encoded)
+        if isinstance(data, dict):
+            self._fill(data)
+            if self._case_id is not None and data.get('uuid') != self._case_id:
+                # Noch nicht migrierter Slot: ID aus dem Index, der AFM-String gilt nicht mehr
+                AFMCase.__setitem__(self, 'uuid', self._case_id)
+
+    def get(self, key, default=None):
+        if key == 'uuid' and self._encoded is not None and self._case_id is not None:
+            return self._case_id
+        self._decode()
+        return dict.get(self, key, default)
+
+    def __eq__(self, other):
+        self._decode()
+        if isinstance(other, LazyAFMCase):
+            other._decode()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+def _decoding(name):
+    """Methode des AFMCase, die vorher den AFM-String dekodiert"""
+    method = getattr(AFMCase, name)
+
+    def wrapper(self, *args, **kwargs):
+        if self._encoded is not None:
+            self._decode()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+# Alle lesenden und schreibenden Zugriffe - auch dict(case), json.dump und
+# copy gehen bei überschriebenem __iter__ über diese Methoden
+for _name in (
+        '__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__', '__reversed__', '__len__',
+        '__repr__', '__or__', '__ror__', '__ior__', '__reduce__', 'keys', 'values', 'items', 'copy',
+        'update', 'setdefault', 'pop', 'popitem', 'clear', 'timestamps'):
+    setattr(LazyAFMCase, _name, _decoding(_name))
+del _name
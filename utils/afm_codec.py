@@ -0,0 +1,85 @@
+"""
+AFM Codec - Kodierung einzelner AFM-Strings
+Zustandslose Funktionen, damit auch Worker-Prozesse AFM-Strings dekodieren
+können, ohne eine Storage-Instanz zu übertragen.
+
+Kodierungen:
+    base64 : Base64 des kanonischen JSON (bisheriges Format, ohne Präfix)
+    zlib   : "z1:" + Base64 des mit Preset-Dictionary komprimierten JSON
+Die Versionskennung im Präfix legt das Dictionary fest - alte Strings
+bleiben daher dekodierbar, auch wenn neue Dictionary-Versionen hinzukommen.
+"""
+import base64
+import os
+import zlib
+
+from . import json_codec
+
+# Standard-Kodierung für neue AFM-Strings: AFM_STRING_ENCODING=base64|zlib
+AFM_ENCODING = os.environ.get("AFM_STRING_ENCODING", "base64")
+
+# Preset-Dictionaries je Version - niemals ändern, nur neue Versionen ergänzen.
+# Häufigste Fragmente stehen am Ende (kürzeste Rückverweise).
+AFM_DICTIONARIES = {
+    "z1": (
+        'Grundbuch Firmenbuch Markenschutzregister Einlage Auszug GB FN '
+        'Wien Graz Linz Salzburg Innsbruck Klagenfurt '
+        '"archivierung:2025-", "validierung:2025-", '
+        '"kategorie": "", "status": "", "bemerkung": "", "afm_string": "", '
+        '"uuid": "", "fallnummer": "FB-2025-00", "fallnummer": "HR-2025-00", '
+        '"fundstellen": "HRB , Seite ", "quelle": "Handelsregister Wien", '
+        '"zeitstempel": ["erfassung:2025-07-24T", "verarbeitung:2025-07-24T'
+    ).encode('utf-8'),
+}
+ZLIB_VERSION = "z1"
+ZLIB_LEVEL = 9
+# Raw Deflate (ohne Header/Prüfsumme) mit 2 KB Fenster: AFM-Strings sind kurz,
+# ein kleines Fenster macht das Anlegen des Kompressors ~6x schneller
+ZLIB_WBITS = -11
+ZLIB_MEMLEVEL = 1
+
+def _compress(data, version):
+    """Raw Deflate mit Preset-Dictionary"""
+    compressor = zlib.compressobj(
+        ZLIB_LEVEL, zlib.DEFLATED, ZLIB_WBITS, ZLIB_MEMLEVEL, zdict=AFM_DICTIONARIES[version]
+    )
+    return compressor.compress(data) + compressor.flush()
+
+def _decompress(data, version):
+    """Gegenstück zu _compress"""
+    decompressor = zlib.decompressobj(ZLIB_WBITS, zdict=AFM_DICTIONARIES[version])
+    return decompressor.decompress(data) + decompressor.flush()
+
+def encrypt_afm_string(afm_string, encoding=None):
+    """
+    Verschlüsselt AFM-String
+
+    Args:
+        afm_string (str): kanonisches AFM-JSON
+        encoding (str): "base64" oder "zlib" (Standard: AFM_ENCODING)
+
+    Returns:
+        str: kodierter AFM-String
+    """
+    encoding = encoding or AFM_ENCODING
+    data = afm_string.encode('utf-8')
+    if encoding == "zlib":
+        return f"{ZLIB_VERSION}:" + base64.b64encode(_compress(data, ZLIB_VERSION)).decode('ascii')
+    return base64.b64encode(data).decode('utf-8')
+
+def decrypt_afm_string(encrypted_string):
+    """Entschlüsselt AFM-String jeder Version (unverschlüsselte Strings werden durchgereicht)"""
+    try:
+        version, separator, payload = encrypted_string.partition(":")
+        if separator and version in AFM_DICTIONARIES:
+            return _decompress(base64.b64decode(payload), version).decode('utf-8')
+        return base64.b64decode(encrypted_string).decode('utf-8')
+    except (ValueError, TypeError, AttributeError, zlib.error):
+        return encrypted_string
+
+def parse_afm_string(afm_string):
+    """Parst AFM-String zu Case-Daten - None bei ungültigem String"""
+    try:
+        return json_codec.loads(decrypt_afm_string(afm_string))
+    except (ValueError, TypeError):
+        return None
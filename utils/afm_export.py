@@ -0,0 +1,214 @@
+"""
+AFMTool1 - Gestreamter Pure AFM Export
+Die kodierten AFM-Strings werden direkt aus dem Storage in die Export-Datei
+geschrieben - ohne Dekodierung und ohne die Liste im Speicher aufzubauen.
+Die Prüfsumme entsteht beim Schreiben und steht hinter dem Array, zusammen
+mit der erst dann bekannten Case-Anzahl.
+
+Prüfsumme: SHA-256 über alle AFM-Strings (UTF-8, je gefolgt von "\\n").
+Sie hängt nur vom Inhalt ab und lässt sich beim Import gestreamt prüfen.
+
+Differenzielle Exports enthalten nur seit dem Vorgänger hinzugekommene,
+geänderte (Case-ID + Inhalts-Hash) und gelöschte Cases. Jeder Stand der
+Kette entsteht aus dem letzten Voll-Export plus den Differenzen danach.
+"""
+import hashlib
+import re
+
+from .atomic_write import atomic_write
+from .afm_stream import iter_json_array, read_json_format
+from . import json_codec
+
+EXPORT_FORMAT = "encrypted_afm_strings"
+DIFF_FORMAT = "encrypted_afm_diff"
+CHECKSUM_ALGORITHM = "sha256"
+EXPORT_TRAILER_SIZE = 1024
+
+_CHECKSUM_PATTERN = re.compile(r'"checksum"\s*:\s*"([^"]*)"')
+_CASE_COUNT_PATTERN = re.compile(r'"case_count"\s*:\s*(\d+)')
+
+def new_checksum():
+    """Leere Prüfsumme für AFM-Strings"""
+    return hashlib.new(CHECKSUM_ALGORITHM)
+
+def update_checksum(checksum, afm_string):
+    """Einen AFM-String in die Prüfsumme aufnehmen"""
+    checksum.update(afm_string.encode('utf-8'))
+    checksum.update(b"\n")
+
+def format_checksum(checksum):
+    """Prüfsumme in Dateiform, z.B. "sha256:9f2c..." """
+    return f"{CHECKSUM_ALGORITHM}:{checksum.hexdigest()}"
+
+def afm_strings_checksum(afm_strings):
+    """Prüfsumme einer Folge von AFM-Strings (z.B. zur Kontrolle eines Imports)"""
+    checksum = new_checksum()
+    for afm_string in afm_strings:
+        update_checksum(checksum, afm_string)
+    return format_checksum(checksum)
+
+def write_export(export_file, afm_strings, header, durability=None, trailer=None):
+    """
+    AFM-Strings gestreamt als Export schreiben (Layout wie json indent=2)
+
+    Args:
+        export_file: Zieldatei (atomar ersetzt)
+        afm_strings: Iterable der kodierten AFM-Strings (wird genau einmal durchlaufen)
+        header (dict): Felder vor dem Array (z.B. export_timestamp, format)
+        durability (str): "always", "batched" oder "never" (Standard: AFM_DURABILITY)
+        trailer: Funktion → dict mit Feldern hinter dem Array (erst nach dem Streamen aufgerufen)
+
+    Returns:
+        tuple: (case_count, checksum)
+    """
+    checksum = new_checksum()
+    count = 0
+    with atomic_write(export_file, 'wb', durability=durability) as f:
+        f.write(b"{\n")
+        for key, value in header.items():
+            f.write(f'  {json_codec.dumps(key)}: {json_codec.dumps(value)},\n'.encode('utf-8'))
+        f.write(b'  "afm_strings": [')
+        separator = b"\n    "
+        for afm_string in afm_strings:
+            update_checksum(checksum, afm_string)
+            f.write(separator + json_codec.dumps_bytes(afm_string))
+            separator = b",\n    "
+            count += 1
+        f.write(b"\n  ],\n" if count else b"],\n")
+        # Case-Anzahl und Prüfsumme zuletzt - read_export_trailer findet sie am Dateiende
+        fields = dict(trailer() if trailer is not None else {}, case_count=count, checksum=format_checksum(checksum))
+        f.write(",\n".join(f'  "{key}": {json_codec.dumps(value)}' for key, value in fields.items()).encode('utf-8'))
+        f.write(b"\n}")
+    return count, fields["checksum"]
+
+def read_export_trailer(export_file):
+    """
+    Case-Anzahl und Prüfsumme vom Dateiende lesen (ohne das Array zu parsen)
+
+    Returns:
+        dict: case_count und checksum - fehlende Felder (ältere Exports) als None
+    """
+    with open(export_file, 'rb') as f:
+        f.seek(0, 2)
+        f.seek(max(0, f.tell() - EXPORT_TRAILER_SIZE))
+        tail = f.read().decode('utf-8', errors='replace')
+    # Letzter Treffer: Index-Dateien mehrteiliger Exports führen auch Teil-Prüfsummen
+    checksum = _CHECKSUM_PATTERN.findall(tail)
+    case_count = _CASE_COUNT_PATTERN.findall(tail)
+    return {
+        "case_count": int(case_count[-1]) if case_count else None,
+        "checksum": checksum[-1] if checksum else None,
+    }
+
+def verify_export(export_file):
+    """
+    Export gestreamt gegen seine Prüfsumme prüfen
+
+    Returns:
+        bool or None: None wenn der Export keine Prüfsumme enthält
+    """
+    expected = read_export_trailer(export_file)["checksum"]
+    if expected is None:
+        return None
+    return afm_strings_checksum(iter_json_array(export_file, "afm_strings")) == expected
+
+def content_hash(afm_string):
+    """Inhalts-Hash eines AFM-Strings (Erkennung geänderter Cases zwischen Exports)"""
+    return hashlib.blake2b(afm_string.encode('utf-8'), digest_size=16).hexdigest()
+
+def write_tracked_export(export_file, entries, header, previous=None, durability=None, track=False):
+    """
+    Voll- oder Differenz-Export schreiben - für Export-Ketten mit Case-IDs und Inhalts-Hashes
+
+    Ohne Kette (track=False, kein Vorgänger) wird nur gestreamt: weder Hashes noch
+    Case-IDs werden für alle Cases im Speicher gehalten oder in die Datei geschrieben.
+
+    Args:
+        export_file: Zieldatei
+        entries: Iterable von (Case-ID, AFM-String) in Speicherreihenfolge
+        header (dict): Felder vor dem Array (format wird gesetzt)
+        previous (dict): Case-ID → Inhalts-Hash des Vorgänger-Exports (None = Voll-Export)
+        durability (str): "always", "batched" oder "never" (Standard: AFM_DURABILITY)
+        track (bool): Voll-Export als Basis künftiger Differenz-Exports (mit Differenz immer)
+
+    Returns:
+        dict: case_count (Einträge in der Datei), checksum, hashes (Stand nach dem Export,
+              None ohne track), added, changed, deleted
+    """
+    track = track or previous is not None
+    hashes = {} if track else None
+    case_ids = []
+    stats = {"added": 0, "changed": 0, "deleted": 0}
+    known = previous or {}
+
+    def changed_afm_strings():
+        for case_id, afm_string in entries:
+            if not track:
+                stats["added"] += 1
+                yield afm_string
+                continue
+            digest = content_hash(afm_string)
+            hashes[case_id] = digest
+            old = known.get(case_id)
+            if old == digest:
+                continue
+            stats["added" if old is None else "changed"] += 1
+            case_ids.append(case_id)
+            yield afm_string
+
+    def trailer():
+        if not track:
+            return {}
+        fields = {"case_ids": case_ids}
+        if previous is not None:
+            deleted = [case_id for case_id in previous if case_id not in hashes]
+            stats["deleted"] = len(deleted)
+            fields["deleted"] = deleted
+        return fields
+
+    header = dict(header, format=EXPORT_FORMAT if previous is None else DIFF_FORMAT)
+    count, checksum = write_export(export_file, changed_afm_strings(), header, durability, trailer)
+    return dict(stats, case_count=count, checksum=checksum, hashes=hashes)
+
+def read_export_afm_strings(export_file):
+    """
+    AFM-Strings eines Exports lesen und gegen die Prüfsumme prüfen
+
+    Returns:
+        list: AFM-Strings (ValueError bei beschädigtem Export)
+    """
+    afm_strings = list(iter_json_array(export_file, "afm_strings"))
+    expected = read_export_trailer(export_file)["checksum"]
+    if expected is not None and afm_strings_checksum(afm_strings) != expected:
+        raise ValueError(f"Prüfsumme stimmt nicht - Export beschädigt: {export_file}")
+    return afm_strings
+
+def reconstruct_export(export_files):
+    """
+    Stand einer Export-Kette herstellen
+
+    Args:
+        export_files: Voll-Export (einteilig oder mehrteilig) gefolgt von den Differenz-Exports
+
+    Returns:
+        dict: Case-ID → AFM-String in Speicherreihenfolge (ValueError bei beschädigter Kette)
+    """
+    from .afm_export_parts import PARTS_FORMAT, read_parts_entries
+
+    state = {}
+    for position, export_file in enumerate(export_files):
+        export_format = read_json_format(export_file)
+        is_diff = export_format == DIFF_FORMAT
+        if is_diff != (position > 0):
+            raise ValueError(f"Export-Kette muss mit einem Voll-Export beginnen: {export_file}")
+        if export_format == PARTS_FORMAT:
+            state.update(read_parts_entries(export_file))
+            continue
+        afm_strings = read_export_afm_strings(export_file)
+        case_ids = list(iter_json_array(export_file, "case_ids"))
+        if len(case_ids) != len(afm_strings):
+            raise ValueError(f"Export ohne passende Case-IDs: {export_file}")
+        state.update(zip(case_ids, afm_strings))
+        for case_id in iter_json_array(export_file, "deleted") if is_diff else ():
+            state.pop(case_id, None)
+    return state
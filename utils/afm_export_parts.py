@@ -0,0 +1,279 @@
+"""
+AFMTool1 - Mehrteilige, komprimierte Pure AFM Exports
+Große Datenbanken werden in Teile zu je N Cases zerlegt. Jeder Teil wird
+komprimiert (gzip, xz oder zstd falls installiert) und mit Prüfsumme in
+einer Index-Datei verzeichnet. Teile werden parallel geschrieben und lassen
+sich einzeln oder parallel importieren.
+
+Layout:
+    afm_pure_parts_<zeit>.json          Index (Format, Kompression, Teile, Prüfsumme)
+    afm_pure_parts_<zeit>.parts/        part-00000.json.gz, part-00001.json.gz, ...
+
+Kompression (AFM_EXPORT_COMPRESSION): auto | zstd | gzip | xz | none
+"""
+import gzip
+import hashlib
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .afm_export import new_checksum, update_checksum, format_checksum, content_hash
+from .atomic_write import atomic_write, atomic_write_json
+from . import json_codec
+
+PARTS_FORMAT = "encrypted_afm_parts"
+# Cases pro Teil
+EXPORT_PART_SIZE = int(os.environ.get("AFM_EXPORT_PART_SIZE") or 10000)
+# Threads für Kompression/Dekompression (zlib, lzma und zstd geben den GIL frei)
+PART_WORKERS = int(os.environ.get("AFM_EXPORT_WORKERS") or 0) or min(4, os.cpu_count() or 1)
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+# Kompression → (Dateiendung, compress, decompress)
+COMPRESSIONS = {
+    "none": (".json", bytes, bytes),
+    "gzip": (".json.gz", lambda data: gzip.compress(data, compresslevel=6, mtime=0), gzip.decompress),
+    "xz": (".json.xz", lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+if zstandard is not None:
+    COMPRESSIONS["zstd"] = (".json.zst", _zstd_compress, _zstd_decompress)
+
+def select_compression(name):
+    """Kompression prüfen ("auto" = zstd falls installiert, sonst gzip)"""
+    if name == "auto":
+        return "zstd" if "zstd" in COMPRESSIONS else "gzip"
+    if name not in COMPRESSIONS:
+        raise ValueError(f"Kompression '{name}' nicht verfügbar - erlaubt: auto, {', '.join(COMPRESSIONS)}")
+    return name
+
+EXPORT_COMPRESSION = select_compression(os.environ.get("AFM_EXPORT_COMPRESSION", "auto"))
+
+def parts_directory(index_file):
+    """Verzeichnis der Teile zu einer Index-Datei"""
+    index_file = Path(index_file)
+    return index_file.with_name(index_file.stem + ".parts")
+
+def _ordered_map(function, items, workers):
+    """function parallel über items - Ergebnisse in Eingabereihenfolge, höchstens 2 × workers in Arbeit"""
+    if workers <= 1:
+        yield from map(function, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _part_checksum(data):
+    """Prüfsumme einer Teil-Datei (komprimierte Bytes)"""
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+def write_parts_export(index_file, entries, header, part_size=None, compression=None, workers=None,
+                       durability=None, track=False):
+    """
+    Voll-Export in komprimierten Teilen schreiben
+
+    Args:
+        index_file: Index-Datei (Teile im Verzeichnis daneben)
+        entries: Iterable von (Case-ID, AFM-String) in Speicherreihenfolge (einmal durchlaufen)
+        header (dict): Felder am Anfang des Index (format wird gesetzt)
+        part_size (int): Cases pro Teil (Standard: EXPORT_PART_SIZE)
+        compression (str): Kompression (Standard: EXPORT_COMPRESSION)
+        workers (int): parallel komprimierte Teile (Standard: PART_WORKERS)
+        durability (str): "always", "batched" oder "never" (Standard: AFM_DURABILITY)
+        track (bool): Inhalts-Hashes als Basis künftiger Differenz-Exports sammeln
+
+    Returns:
+        dict: case_count, checksum, hashes (Case-ID → Inhalts-Hash, None ohne track), added, changed,
+              deleted, parts (Anzahl), size (Bytes inkl. Index)
+    """
+    part_size = part_size or EXPORT_PART_SIZE
+    compression = select_compression(compression or EXPORT_COMPRESSION)
+    workers = PART_WORKERS if workers is None else workers
+    suffix, compress, _ = COMPRESSIONS[compression]
+    parts_dir = parts_directory(index_file)
+    checksum = new_checksum()
+    hashes = {} if track else None
+
+    def chunks():
+        entries_iter = iter(entries)
+        for number in range(sys.maxsize):
+            chunk = list(islice(entries_iter, part_size))
+            if not chunk:
+                return
+            case_ids = [case_id for case_id, _ in chunk]
+            afm_strings = [afm_string for _, afm_string in chunk]
+            for case_id, afm_string in chunk:
+                update_checksum(checksum, afm_string)
+                if track:
+                    hashes[case_id] = content_hash(afm_string)
+            yield number, case_ids, afm_strings
+
+    def write_part(chunk):
+        number, case_ids, afm_strings = chunk
+        data = compress(json_codec.dumps_bytes({"case_ids": case_ids, "afm_strings": afm_strings}, compact=True))
+        name = f"part-{number:05d}{suffix}"
+        with atomic_write(parts_dir / name, 'wb', durability=durability) as f:
+            f.write(data)
+        return {"name": name, "case_count": len(case_ids), "checksum": _part_checksum(data), "size": len(data)}
+
+    parts_dir.mkdir(exist_ok=True)
+    try:
+        parts = list(_ordered_map(write_part, chunks(), workers))
+        count = sum(part["case_count"] for part in parts)
+        index = dict(header, format=PARTS_FORMAT, compression=compression, part_size=part_size, parts=parts)
+        # Case-Anzahl und Prüfsumme zuletzt - read_export_trailer findet sie am Dateiende
+        index.update(case_count=count, checksum=format_checksum(checksum))
+        atomic_write_json(index_file, index, durability=durability, indent=2)
+    except BaseException:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        raise
+
+    size = Path(index_file).stat().st_size + sum(part["size"] for part in parts)
+    return {"added": count, "changed": 0, "deleted": 0, "case_count": count, "checksum": index["checksum"],
+            "hashes": hashes, "parts": len(parts), "size": size}
+
+def read_parts_index(index_file):
+    """Index eines mehrteiligen Exports lesen (ValueError bei fremdem Format oder fehlender Kompression)"""
+    with open(index_file, 'r', encoding='utf-8') as f:
+        index = json_codec.load(f)
+    if index.get("format") != PARTS_FORMAT:
+        raise ValueError(f"Kein mehrteiliger Export: {index_file}")
+    if index.get("compression") not in COMPRESSIONS:
+        raise ValueError(f"Kompression '{index.get('compression')}' nicht verfügbar (z.B. zstandard installieren)")
+    return index
+
+def iter_export_parts(index_file, parts=None, workers=None):
+    """
+    Teile eines Exports lesen - parallel dekomprimiert, in Teil-Reihenfolge
+
+    Args:
+        index_file: Index-Datei
+        parts: Teil-Nummern für selektiven Import (None = alle)
+        workers (int): parallel gelesene Teile (Standard: PART_WORKERS)
+
+    Yields:
+        tuple: (case_ids, afm_strings) je Teil (ValueError bei falscher Prüfsumme)
+    """
+    index = read_parts_index(index_file)
+    decompress = COMPRESSIONS[index["compression"]][2]
+    parts_dir = parts_directory(index_file)
+    selected = index["parts"] if parts is None else [index["parts"][number] for number in parts]
+
+    def read_part(part):
+        data = (parts_dir / part["name"]).read_bytes()
+        if _part_checksum(data) != part["checksum"]:
+            raise ValueError(f"Prüfsumme stimmt nicht - Teil beschädigt: {part['name']}")
+        payload = json_codec.loads(decompress(data))
+        return payload["case_ids"], payload["afm_strings"]
+
+    yield from _ordered_map(read_part, selected, PART_WORKERS if workers is None else workers)
+
+def read_parts_entries(index_file, parts=None, workers=None):
+    """
+    (Case-ID, AFM-String) eines mehrteiligen Exports - vollständig gelesen auch gegen die Gesamtprüfsumme
+
+    Returns:
+        list: Paare in Speicherreihenfolge (ValueError bei beschädigtem Export)
+    """
+    entries = []
+    for case_ids, afm_strings in iter_export_parts(index_file, parts, workers):
+        entries.extend(zip(case_ids, afm_strings))
+    if parts is None:
+        checksum = new_checksum()
+        for _, afm_string in entries:
+            update_checksum(checksum, afm_string)
+        if format_checksum(checksum) != read_parts_index(index_file)["checksum"]:
+            raise ValueError(f"Prüfsumme stimmt nicht - Export beschädigt: {index_file}")
+    return entries
+
+def remove_export(export_file):
+    """Export-Datei samt Teil-Verzeichnis (falls mehrteilig) löschen"""
+    export_file = Path(export_file)
+    export_file.unlink(missing_ok=True)
+    parts_dir = parts_directory(export_file)
+    if parts_dir.is_dir():
+        shutil.rmtree(parts_dir)
+
+def benchmark(case_count=20000, part_size=5000, rounds=3):
+    """
+    Vergleicht Kompressionen auf realistischen Cases (kodierte AFM-Strings wie im Storage)
+
+    Args:
+        case_count (int): Cases im Export
+        part_size (int): Cases pro Teil
+        rounds (int): Wiederholungen (bester Durchlauf zählt)
+
+    Returns:
+        dict: Kompression → {"ratio", "bytes", "write_ms", "write_ms_serial", "read_ms", "mb_s"}
+    """
+    from .afm_codec import encrypt_afm_string
+    from .json_codec import _benchmark_case
+
+    entries = []
+    for nr in range(case_count):
+        case = _benchmark_case(nr)
+        entries.append((case["uuid"], encrypt_afm_string(json_codec.canonical_dumps(case))))
+    raw_size = sum(len(afm_string) + len(case_id) + 6 for case_id, afm_string in entries)
+
+    def best(operation):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            operation()
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for compression in COMPRESSIONS:
+            index_file = Path(directory) / f"bench_{compression}.json"
+            write = lambda workers: write_parts_export(
+                index_file, entries, {}, part_size, compression, workers, durability="never"
+            )
+            serial_ms = best(lambda: write(1))
+            write_ms = best(lambda: write(None))
+            size = write(None)["size"]
+            read_ms = best(lambda: read_parts_entries(index_file))
+            results[compression] = {
+                "ratio": raw_size / size,
+                "bytes": size,
+                "write_ms_serial": serial_ms,
+                "write_ms": write_ms,
+                "read_ms": read_ms,
+                "mb_s": raw_size / 1e6 / (write_ms / 1000),
+            }
+    return results
+
+def main():
+    """Benchmark per Kommandozeile: python -m utils.afm_export_parts [cases] [teilgröße]"""
+    case_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    part_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    print(f"⏱️ [EXPORT] {case_count} Cases in Teilen zu {part_size}, {PART_WORKERS} Threads")
+    for compression, result in benchmark(case_count, part_size).items():
+        print(f"   {compression:<5} {result['bytes'] / 1e6:7.2f} MB  Faktor {result['ratio']:5.2f}  "
+              f"schreiben {result['write_ms_serial']:7.1f} ms seriell / {result['write_ms']:7.1f} ms parallel "
+              f"({result['mb_s']:6.1f} MB/s)  lesen {result['read_ms']:7.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+AFMTool1 - Paralleler, deduplizierender Bulk-Import
+Die AFM-Strings eines Exports werden chunkweise (z.B. je Export-Teil) in
+einem Prozess-Pool dekodiert und geprüft. Gültige Cases werden gegen den
+Storage abgeglichen - über die Case-ID (`uuid` bzw. erfassung-UUID) und den Inhalt:
+    neu         → "add"
+    geändert    → "set"
+    unverändert → übersprungen
+Alle Einfügungen und Änderungen gehen als ein write_batch in den Storage.
+Der Storage wird dafür nicht dekodiert, verglichen werden kodierte Strings
+(Cases mit ID nur aus der erfassung-UUID erhalten vorher ihr `uuid`-Feld).
+
+Cases ganz ohne ID werden über ihren Inhalt (ohne `uuid`) dedupliziert -
+gegen den Import selbst und gegen den Storage. Nur dafür wird der Storage
+einmal dekodiert, und nur wenn solche Cases im Import vorkommen.
+
+Abgelehnt werden nicht dekodierbare Strings, Cases mit ungültigen
+Zeitstempeln oder mehreren erfassung-Zeitstempeln sowie doppelte
+Case-IDs mit abweichendem Inhalt innerhalb des Imports.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+
+from .afm_codec import parse_afm_string
+from .afm_export import content_hash
+from .afm_parallel import DECODE_WORKERS, decode_afm_strings
+from .afm_timestamps import parse_timestamp, TimestampType
+from .case_index import ensure_case_id, get_case_id
+from .logger import log_action
+
+# AFM-Strings pro Worker-Aufgabe bei einteiligen Exports (mehrteilige: je Teil)
+IMPORT_CHUNK_SIZE = int(os.environ.get("AFM_IMPORT_CHUNK_SIZE") or 5000)
+# Abgelehnte Records, die im Protokoll einzeln erscheinen
+REJECTED_PRINT_LIMIT = 10
+
+def validate_case(case):
+    """
+    Prüft einen dekodierten Case auf gültige Zeitstempel
+
+    Args:
+        case: Ergebnis von parse_afm_string
+
+    Returns:
+        str or None: Ablehnungsgrund, None wenn gültig
+    """
+    if not isinstance(case, dict):
+        return "AFM-String nicht dekodierbar"
+    zeitstempel = case.get("zeitstempel", [])
+    if not isinstance(zeitstempel, list):
+        return "zeitstempel ist keine Liste"
+
+    erfassungen = 0
+    for ts in zeitstempel:
+        if not isinstance(ts, str):
+            return f"ungültiger Zeitstempel: {ts!r}"
+        entry = parse_timestamp(ts)
+        if entry.art is None or entry.datum is None:
+            return f"ungültiger Zeitstempel: {ts!r}"
+        erfassungen += entry.art is TimestampType.ERFASSUNG
+    if erfassungen > 1:
+        return "mehrere erfassung-Zeitstempel"
+    return None
+
+def _validate_chunk(afm_strings):
+    """Worker: dekodiert und prüft einen Chunk → Liste von (Case, Ablehnungsgrund)"""
+    results = []
+    for afm_string in afm_strings:
+        case = parse_afm_string(afm_string)
+        reason = validate_case(case)
+        results.append((None, reason) if reason else (case, None))
+    return results
+
+def _validated_chunks(chunks, workers):
+    """
+    Chunks parallel dekodieren und prüfen - in Eingabereihenfolge, höchstens 2 × workers in Arbeit
+
+    Yields:
+        tuple: (AFM-Strings, Ergebnisse) je Chunk
+    """
+    chunks = iter(chunks)
+    head = list(islice(chunks, 2))
+    if workers <= 1 or len(head) < 2:
+        # Ein einzelner Chunk lohnt den Start der Worker-Prozesse nicht
+        for afm_strings in chain(head, chunks):
+            yield afm_strings, _validate_chunk(afm_strings)
+        return
+
+    source = chain(head, chunks)
+    # Chunks ohne gelieferte Ergebnisse - bei einem Pool-Ausfall seriell nachgeholt
+    pending = deque()
+    futures = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for afm_strings in source:
+                pending.append(afm_strings)
+                futures.append(executor.submit(_validate_chunk, afm_strings))
+                if len(futures) >= 2 * workers:
+                    yield pending[0], futures[0].result()
+                    pending.popleft()
+                    futures.popleft()
+            while futures:
+                yield pending[0], futures[0].result()
+                pending.popleft()
+                futures.popleft()
+    except (OSError, BrokenProcessPool) as e:
+        log_action("IMPORT", f"Prozess-Pool nicht verfügbar ({e}) - prüfe {len(pending)} offene Chunks seriell")
+        for afm_strings in chain(pending, source):
+            yield afm_strings, _validate_chunk(afm_strings)
+
+def _content_key(storage, case):
+    """Inhalts-Hash eines Cases ohne `uuid` (Deduplizierung von Cases ohne ID)"""
+    return content_hash(storage.convert_case_to_pure_afm({k: v for k, v in case.items() if k != 'uuid'}))
+
+def _stored_content_keys(storage, existing, workers):
+    """Inhalts-Hashes aller gespeicherten Cases - dekodiert den Storage einmal"""
+    cases = decode_afm_strings(list(existing.values()), workers=workers)
+    return {_content_key(storage, case) for case in cases if isinstance(case, dict)}
+
+def import_afm_strings(storage, chunks, workers=None):
+    """
+    AFM-Strings validiert und dedupliziert in den Storage übernehmen (ein Schreibvorgang)
+
+    Args:
+        storage: AFMPureStorage (oder Unterklasse)
+        chunks: Iterable von AFM-String-Listen (z.B. je Export-Teil, einmal durchlaufen)
+        workers (int): Worker-Prozesse (Standard: DECODE_WORKERS, 1 = seriell)
+
+    Returns:
+        dict: total, inserted, updated, unchanged, rejected (Liste von position/case_id/reason),
+              seconds, cases_per_second
+    """
+    start = time.perf_counter()
+    workers = DECODE_WORKERS if workers is None else workers
+    existing = dict(storage.iter_case_afm_strings())
+    # Case-ID → Inhalts-Hash innerhalb des Imports
+    seen = {}
+    # Inhalts-Hashes (ohne uuid) für Cases ohne ID - Storage-Anteil erst bei Bedarf
+    content_keys = None
+    operations = []
+    rejected = []
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    position = 0
+
+    for afm_strings, results in _validated_chunks(chunks, workers):
+        for afm_string, (case, reason) in zip(afm_strings, results):
+            position += 1
+            if reason is not None:
+                rejected.append({"position": position, "case_id": None, "reason": reason})
+                continue
+
+            case_id = get_case_id(case)
+            if case_id is None:
+                # Ohne ID nur über den Inhalt zuzuordnen - neue Cases erhalten beim Schreiben eine ID
+                if content_keys is None:
+                    content_keys = _stored_content_keys(storage, existing, workers)
+                key = _content_key(storage, case)
+                if key in content_keys:
+                    stats["unchanged"] += 1
+                else:
+                    content_keys.add(key)
+                    operations.append(('add', None, case))
+                    stats["inserted"] += 1
+                continue
+            if not case.get("uuid"):
+                # ID nur aus der erfassung-UUID - wie beim Speichern als uuid-Feld kodieren
+                ensure_case_id(case)
+                afm_string = storage.encode_case(case)[0]
+
+            digest = content_hash(afm_string)
+            if case_id in seen:
+                if seen[case_id] == digest:
+                    stats["unchanged"] += 1
+                else:
+                    rejected.append({"position": position, "case_id": case_id,
+                                     "reason": "erfassung-UUID doppelt im Import mit abweichendem Inhalt"})
+                continue
+            seen[case_id] = digest
+
+            stored = existing.get(case_id)
+            if stored is None:
+                operations.append(('add', case_id, case))
+                stats["inserted"] += 1
+            elif stored == afm_string or storage.encode_case(case)[0] == stored:
+                # Gleicher Inhalt - ggf. nur anders kodiert
+                stats["unchanged"] += 1
+            else:
+                operations.append(('set', case_id, case))
+                stats["updated"] += 1
+
+    if operations:
+        storage.write_batch(operations)
+
+    seconds = time.perf_counter() - start
+    report = dict(stats, total=position, rejected=rejected, seconds=seconds,
+                  cases_per_second=position / seconds if seconds > 0 else 0.0)
+    print_import_report(report)
+    return report
+
+def print_import_report(report):
+    """Import-Ergebnis protokollieren (Durchsatz und abgelehnte Records)"""
+    print(f"📥 [IMPORT] {report['total']} Cases in {report['seconds']:.2f}s "
+          f"({report['cases_per_second']:.0f} Cases/s): {report['inserted']} neu, {report['updated']} geändert, "
+          f"{report['unchanged']} unverändert, {len(report['rejected'])} abgelehnt")
+    for entry in report['rejected'][:REJECTED_PRINT_LIMIT]:
+        print(f"⚠️ [IMPORT] Record {entry['position']} abgelehnt: {entry['reason']}")
+    if len(report['rejected']) > REJECTED_PRINT_LIMIT:
+        print(f"⚠️ [IMPORT] ... und {len(report['rejected']) - REJECTED_PRINT_LIMIT} weitere")
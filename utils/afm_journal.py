@@ -0,0 +1,128 @@
+"""
+AFM Journal Storage - Append-only Änderungsprotokoll über Pure AFM Snapshot
+Einzelne Case-Änderungen werden als JSON-Zeilen angehängt statt die gesamte
+cases.json neu zu schreiben. Ab einer Schwelle wird das Journal in den
+Snapshot gefaltet, damit die Ladezeit begrenzt bleibt.
+"""
+from .afm_pure import AFMPureStorage
+from .atomic_write import sync_file
+from . import json_codec
+
+DEFAULT_COMPACT_THRESHOLD = 500
+
+class AFMJournalStorage(AFMPureStorage):
+    """Pure AFM Storage mit Append-only Journal (O(1) Schreibkosten pro Änderung)"""
+
+    def __init__(self, storage_file, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        super().__init__(storage_file)
+        self.journal_file = self.storage_file.with_suffix('.journal')
+        self.compact_threshold = compact_threshold
+        self._journal_records = None
+
+    def _storage_files(self):
+        """Snapshot und Journal bilden gemeinsam den Storage-Zustand"""
+        return [self.storage_file, self.journal_file]
+
+    def _read_journal(self):
+        """Liest alle gültigen Journal-Einträge (abgebrochene Zeilen werden ignoriert)"""
+        records = []
+        if not self.journal_file.exists():
+            return records
+
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json_codec.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def journal_size(self):
+        """Anzahl der Journal-Einträge seit dem letzten Snapshot"""
+        if self._journal_records is None:
+            self._journal_records = len(self._read_journal())
+        return self._journal_records
+
+    def _replay_changes(self):
+        """Journal-Einträge auf den geladenen Snapshot anwenden"""
+        records = self._read_journal()
+        for record in records:
+            self._apply_change(record)
+        self._journal_records = len(records)
+
+    def _stream_afm_strings(self):
+        """Snapshot streamen und Journal-Einträge unterwegs anwenden"""
+        if not self.journal_file.exists():
+            yield from super()._stream_afm_strings()
+            return
+        for _, afm_string in self._stream_case_afm_strings():
+            yield afm_string
+
+    def _stream_case_afm_strings(self):
+        """(Case-ID, AFM-String) aus Snapshot und Journal - Journal-Einträge unterwegs angewendet"""
+        changes = {}
+        for record in self._read_journal():
+            changes[record.get('id')] = record
+
+        for case_id, afm_string in super()._stream_case_afm_strings():
+            record = changes.pop(case_id, None)
+            if record is None:
+                yield case_id, afm_string
+            elif record.get('op') != 'del':
+                yield case_id, record['afm']
+
+        # Neu angelegte Cases in Journal-Reihenfolge
+        for case_id, record in changes.items():
+            if record.get('op') != 'del':
+                yield case_id, record['afm']
+    
+    def _persist_changes(self, records):
+        """Hängt Journal-Einträge in einem Schreibvorgang an und faltet bei Bedarf in den Snapshot"""
+        count = self.journal_size()
+        lines = "".join(
+            json_codec.dumps(record, compact=True) + "\n" for record in records
+        )
+        with open(self.journal_file, 'a+b') as f:
+            # Abgebrochene letzte Zeile (z.B. nach Absturz) abschließen
+            if f.tell() > 0:
+                f.seek(-1, 2)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write(lines.encode('utf-8'))
+            sync_file(f, self.durability)
+
+        self._journal_records = count + len(records)
+        self._state_fingerprint = self.fingerprint()
+        if self._journal_records >= self.compact_threshold:
+            self.compact()
+
+    def _write_snapshot(self):
+        """Vollständiger Snapshot - ersetzt zugleich das Journal"""
+        super()._write_snapshot()
+        if self.journal_file.exists():
+            self.journal_file.unlink()
+        self._journal_records = 0
+
+    def compact(self):
+        """Journal in den Snapshot falten"""
+        with self.lock.exclusive():
+            self._ensure_state()
+            records = self.journal_size()
+            if not records and not self._migration_pending:
+                return 0
+
+            before = self.fingerprint()
+            migrating = self._migration_pending
+            self._write_snapshot()
+            self._state_version = self.lock.bump_version()
+            self._state_fingerprint = self.fingerprint()
+            if migrating:
+                # Migrierte Cases haben jetzt ein uuid-Feld
+                self._rebuild_metadata()
+            else:
+                self._refresh_metadata(before)
+        print(f"🗜️ [JOURNAL] {records} Journal-Einträge in Snapshot gefaltet")
+        return records
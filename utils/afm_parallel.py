@@ -0,0 +1,50 @@
+"""
+AFM Parallel Decoding - Bulk-Dekodierung von AFM-Strings auf mehreren Kernen
+Große String-Listen werden in Chunks aufgeteilt und in einem Prozess-Pool
+dekodiert (Base64 → UTF-8 → json.loads). Kleine Eingaben laufen seriell,
+da sich der Start der Worker-Prozesse erst ab einigen tausend Strings lohnt.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .afm_codec import parse_afm_string
+
+# Worker-Anzahl: AFM_DECODE_WORKERS (0/leer = alle Kerne, 1 = immer seriell)
+DECODE_WORKERS = int(os.environ.get("AFM_DECODE_WORKERS") or 0) or (os.cpu_count() or 1)
+PARALLEL_MIN_STRINGS = 20000
+DECODE_CHUNK_SIZE = 5000
+
+def _decode_chunk(afm_strings):
+    """Worker: dekodiert einen Chunk (None für ungültige Strings)"""
+    return [parse_afm_string(afm_string) for afm_string in afm_strings]
+
+def decode_afm_strings(afm_strings, workers=None, chunk_size=DECODE_CHUNK_SIZE,
+                       min_parallel=PARALLEL_MIN_STRINGS):
+    """
+    Dekodiert viele AFM-Strings - parallel ab `min_parallel` Strings
+
+    Args:
+        afm_strings: verschlüsselte AFM-Strings
+        workers (int): Anzahl Worker-Prozesse (Standard: DECODE_WORKERS)
+        chunk_size (int): Strings pro Worker-Aufgabe
+        min_parallel (int): darunter wird seriell dekodiert
+
+    Returns:
+        list: Case-Dicts in Eingabereihenfolge, None für ungültige Strings
+    """
+    afm_strings = list(afm_strings)
+    workers = DECODE_WORKERS if workers is None else workers
+    if workers <= 1 or len(afm_strings) < max(min_parallel, 2 * chunk_size):
+        return _decode_chunk(afm_strings)
+
+    chunks = [afm_strings[i:i + chunk_size] for i in range(0, len(afm_strings), chunk_size)]
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            cases = []
+            for decoded in executor.map(_decode_chunk, chunks):
+                cases.extend(decoded)
+            return cases
+    except (OSError, BrokenProcessPool) as e:
+        print(f"⚠️ [DECODE] Prozess-Pool nicht verfügbar ({e}) - dekodiere seriell")
+        return _decode_chunk(afm_strings)
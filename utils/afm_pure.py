@@ -1,17 +1,93 @@
 """
 AFM Pure String System - Single Source of Truth Implementation
 """
-import json
-import base64
-from datetime import datetime
+import bisect
+import hashlib
+import uuid
+from collections import ChainMap
+from datetime import date, datetime
 from pathlib import Path
 
+from .case_index import AFMCaseIndex, IndexData, ensure_case_id, get_case_id
+from .case_metadata import AFMCaseMetadata, count_fields
+from .afm_stream import iter_json_array
+from .afm_codec import encrypt_afm_string, decrypt_afm_string, parse_afm_string
+from .afm_parallel import decode_afm_strings
+from .afm_case import AFMCase, LazyAFMCase
+from .afm_timestamps import case_timestamps
+from .atomic_write import atomic_write_json
+from .store_lock import StoreLock
+from . import json_codec
+
+ERFASSUNG_PREFIX = "erfassung:"
+# Namensraum für IDs von Cases ohne eindeutige UUID (Migration älterer Snapshots)
+LEGACY_ID_NAMESPACE = uuid.UUID("5d0f3a52-8c1e-4b7a-9f36-2e4c8a1d7b90")
+# Vereinfachte Zeitstempel sind stundengenau: "erfassung:2025-07-24T16"
+ERFASSUNG_KEY_LENGTH = len("2025-07-24T16")
+
+def erfassung_bounds(start=None, end=None):
+    """
+    Suchgrenzen für vereinfachte erfassung-Zeitstempel (stundengenau)
+
+    Args:
+        start: ab (inklusive) - ISO-String, date oder datetime; eine angebrochene Stunde zählt mit
+        end: bis (exklusive) - ISO-String, date oder datetime; eine angebrochene Stunde zählt mit
+
+    Returns:
+        tuple: (untere Grenze inklusive, obere Grenze exklusive) - Cases ohne erfassung liegen außerhalb
+    """
+    def bound(value):
+        value = value.isoformat() if isinstance(value, date) else str(value)
+        return ERFASSUNG_PREFIX + value[:ERFASSUNG_KEY_LENGTH], value[ERFASSUNG_KEY_LENGTH:].strip(":0.")
+
+    low = bound(start)[0] if start is not None else ERFASSUNG_PREFIX
+    if end is None:
+        # Größer als jeder erfassung-Schlüssel
+        return low, ERFASSUNG_PREFIX + "~"
+    high, partial = bound(end)
+    return low, high + "~" if partial else high
+
 class AFMPureStorage:
     """AFM-String basierte Speicherung ohne redundante Case-Daten"""
     
     def __init__(self, storage_file):
         self.storage_file = Path(storage_file)
         self.storage_file.parent.mkdir(exist_ok=True)
+        self.case_index = AFMCaseIndex(self.storage_file.with_suffix('.index.json'))
+        # Case-Anzahl, Status-Zähler, Feldkatalog, ... ohne Parsing (z.B. cases.meta.json)
+        self.case_metadata = AFMCaseMetadata(self.storage_file.with_suffix('.meta.json'))
+        # Prozessübergreifende Sperre + Store-Version (z.B. cases.json.lock)
+        self.lock = StoreLock(self.storage_file.with_name(self.storage_file.name + '.lock'))
+        
+        # Worker-Prozesse für Bulk-Dekodierung (None = DECODE_WORKERS, 1 = seriell)
+        self.decode_workers = None
+        # load_pure_afm_data liefert LazyAFMCase (Dekodierung beim ersten Feldzugriff)
+        self.lazy_cases = True
+        # Kodierung neuer AFM-Strings: "base64" oder "zlib" (None = AFM_ENCODING)
+        self.afm_encoding = None
+        # fsync-Verhalten: "always", "batched" oder "never" (None = AFM_DURABILITY)
+        self.durability = None
+        
+        # In-Memory Zustand: kodierte Slots + Primärindex (Case-ID → Slot)
+        self._slots = None
+        self._ids = []
+        self._positions = {}
+        # Materialisierter Status: Case-ID → Status und Status → Case-IDs (geordnete Menge)
+        self._statuses = {}
+        self._status_index = {}
+        # Materialisierte Fallnummer je Case-ID - Sortierung ohne Dekodierung
+        self._fallnummern = {}
+        # Sekundärindex: sortierte (erfassung, Position) - erst bei der ersten Zeitabfrage aufgebaut
+        self._erfassung_index = None
+        self._state_fingerprint = None
+        self._state_version = None
+        # Case-IDs, deren Snapshot-Slot die UUID noch nicht enthält - migriert beim nächsten Schreibvorgang
+        self._unmigrated_ids = []
+    
+    @property
+    def _migration_pending(self):
+        """True solange Snapshot-Slots ohne ihre Index-UUID gespeichert sind"""
+        return bool(self._unmigrated_ids)
     
     def _simplify_timestamp(self, full_timestamp):
         """Vereinfacht Zeitstempel: 2025-07-24T16:27:16.960695"""
@@ -21,15 +97,12 @@ class AFMPureStorage:
         return full_timestamp
     
     def _encrypt_afm_string(self, afm_string):
-        """Verschlüsselt AFM-String (Base64 Platzhalter)"""
-        return base64.b64encode(afm_string.encode('utf-8')).decode('utf-8')
+        """Verschlüsselt AFM-String (Base64 oder zlib mit Preset-Dictionary)"""
+        return encrypt_afm_string(afm_string, self.afm_encoding)
     
     def _decrypt_afm_string(self, encrypted_string):
-        """Entschlüsselt AFM-String"""
-        try:
-            return base64.b64decode(encrypted_string).decode('utf-8')
-        except:
-            return encrypted_string
+        """Entschlüsselt AFM-String - erkennt die Kodierung am Versionspräfix"""
+        return decrypt_afm_string(encrypted_string)
     
     def convert_case_to_pure_afm(self, case_data):
         """Konvertiert Case zu Pure AFM-String mit vereinfachten Zeitstempeln"""
@@ -42,35 +115,29 @@ class AFMPureStorage:
         
         # AFM-String ohne afm_string Feld selbst
         afm_data = {k: v for k, v in simplified_case.items() if k != 'afm_string'}
-        return json.dumps(afm_data, ensure_ascii=False, sort_keys=True)
+        return json_codec.canonical_dumps(afm_data)
     
     def parse_afm_string_to_case(self, afm_string):
         """Parst AFM-String zurück zu Case-Daten"""
-        try:
-            decrypted = self._decrypt_afm_string(afm_string)
-            return json.loads(decrypted)
-        except:
-            return None
+        return parse_afm_string(afm_string)
     
-    def save_pure_afm_data(self, cases):
-        """Speichert nur AFM-Strings + Metadaten"""
-        afm_strings = []
-        erfassung_timestamps = []
-        
-        for case in cases:
-            # AFM-String generieren
-            pure_afm = self.convert_case_to_pure_afm(case)
-            encrypted_afm = self._encrypt_afm_string(pure_afm)
-            afm_strings.append(encrypted_afm)
-            
-            # Erfassung-Zeitstempel extrahieren
-            timestamps = case.get('zeitstempel', [])
-            erfassung_ts = next((ts for ts in timestamps if ts.startswith('erfassung:')), '')
-            if erfassung_ts:
-                erfassung_ts = self._simplify_timestamp(erfassung_ts)
-            erfassung_timestamps.append(erfassung_ts)
-        
-        # Pure Storage Format
+    def _extract_erfassung(self, case):
+        """Vereinfachten erfassung-Zeitstempel eines Cases ermitteln"""
+        erfassung = case_timestamps(case).erfassung
+        return self._simplify_timestamp(erfassung.raw) if erfassung is not None else ''
+    
+    def encode_case(self, case):
+        """Case zu (verschlüsselter AFM-String, erfassung-Zeitstempel) kodieren
+        Unveränderte AFMCase-Instanzen liefern ihren zwischengespeicherten String."""
+        encoded = case.get_derived('pure_afm') if isinstance(case, AFMCase) else None
+        if encoded is None:
+            encoded = self._encrypt_afm_string(self.convert_case_to_pure_afm(case))
+            if isinstance(case, AFMCase):
+                case.set_derived('pure_afm', encoded)
+        return encoded, self._extract_erfassung(case)
+    
+    def _write_pure_afm_strings(self, afm_strings, erfassung_timestamps):
+        """Schreibt bereits kodierte AFM-Strings als Pure Storage Snapshot"""
         pure_data = {
             "format": "afm_pure_v1.0",
             "created": datetime.now().isoformat(),
@@ -79,23 +146,654 @@ class AFMPureStorage:
             "erfassung_timestamps": erfassung_timestamps
         }
         
-        with open(self.storage_file, 'w', encoding='utf-8') as f:
-            json.dump(pure_data, f, indent=2, ensure_ascii=False)
+        atomic_write_json(self.storage_file, pure_data, durability=self.durability, indent=2)
     
-    def load_pure_afm_data(self):
-        """Lädt AFM-Strings und rekonstruiert Cases"""
+    def _storage_files(self):
+        """Alle Dateien, die den Storage-Zustand bilden"""
+        return [self.storage_file]
+    
+    def _file_fingerprint(self, path):
+        """mtime + Größe einer Datei (None wenn nicht vorhanden)"""
         try:
-            with open(self.storage_file, 'r', encoding='utf-8') as f:
-                pure_data = json.load(f)
+            stat = path.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def fingerprint(self):
+        """Günstiger Fingerprint (mtime + Größe) aller Storage-Dateien + Store-Version"""
+        return tuple(self._file_fingerprint(path) for path in self._storage_files()) + (self.lock.version(),)
+    
+    def content_hash(self):
+        """Inhalts-Hash aller Storage-Dateien (für grobe Dateisystem-Zeitstempel)"""
+        digest = hashlib.blake2b(digest_size=16)
+        for path in self._storage_files():
+            try:
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            except OSError:
+                digest.update(b"\0missing")
+        return digest.hexdigest()
+    
+    def _read_pure_data(self):
+        """Liest den Pure Storage Snapshot (ohne Dekodierung)"""
+        with open(self.storage_file, 'r', encoding='utf-8') as f:
+            return json_codec.load(f)
+    
+    def _load_snapshot_slots(self):
+        """Snapshot als Liste von [AFM-String, erfassung-Zeitstempel] laden"""
+        try:
+            pure_data = self._read_pure_data()
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            print(f"❌ [PURE AFM] {self.storage_file} nicht lesbar: {e}")
+            return []
+        
+        afm_strings = pure_data.get('afm_strings', [])
+        erfassung_timestamps = pure_data.get('erfassung_timestamps', [])
+        erfassung_timestamps += [''] * (len(afm_strings) - len(erfassung_timestamps))
+        return [[afm, ts] for afm, ts in zip(afm_strings, erfassung_timestamps)]
+    
+    def _legacy_case_id(self, position, afm_string):
+        """
+        Deterministische UUID für einen Slot ohne eindeutige ID
+        
+        Alle Leser eines nicht migrierten Snapshots vergeben so dieselben IDs,
+        auch bevor die Migration geschrieben wurde.
+        """
+        return str(uuid.uuid5(LEGACY_ID_NAMESPACE, f"{position}:{afm_string}"))
+    
+    def _rebuild_ids(self, slots):
+        """
+        Index per Vollscan neu aufbauen - Cases ohne eindeutige ID erhalten eine UUID
+        
+        Die Slots bleiben unverändert: Lesepfade übernehmen die ID beim Dekodieren
+        (_case_from_slot), der nächste Schreibvorgang kodiert sie neu (_migrate_slots).
+        
+        Returns:
+            IndexData: unmigrated - IDs, deren Slot die UUID noch nicht enthält
+        """
+        ids = []
+        statuses = []
+        fallnummern = []
+        unmigrated = []
+        
+        decoded = decode_afm_strings([slot[0] for slot in slots], workers=self.decode_workers)
+        for position, case in enumerate(decoded):
+            statuses.append(self._case_status(case))
+            fallnummern.append(self._case_fallnummer(case))
+            afm_string = slots[position][0]
+            if not isinstance(case, dict):
+                # Ungültiger AFM-String bleibt unverändert, erhält nur eine Index-ID
+                ids.append(self._legacy_case_id(position, afm_string))
+                continue
             
-            cases = []
-            afm_strings = pure_data.get('afm_strings', [])
+            previous_id = case.get('uuid')
+            case_id = get_case_id(case)
+            if not case_id or case_id in self._positions:
+                case_id = self._legacy_case_id(position, afm_string)
+            if case_id != previous_id:
+                unmigrated.append(case_id)
+            self._positions[case_id] = position
+            ids.append(case_id)
+        
+        return IndexData(ids, statuses, fallnummern, unmigrated)
+    
+    def _migrate_slots(self):
+        """Slots ohne ihre Index-UUID neu kodieren (nur im Schreibpfad, dekodiert nur diese Slots)"""
+        migrated = 0
+        for case_id in self._unmigrated_ids:
+            position = self._positions.get(case_id)
+            if position is None or self._slots[position] is None:
+                continue
+            case = self.parse_afm_string_to_case(self._slots[position][0])
+            # Zwischenzeitlich geänderte Cases wurden bereits mit ihrer ID kodiert
+            if isinstance(case, dict) and case.get('uuid') != case_id:
+                case['uuid'] = case_id
+                self._slots[position] = list(self.encode_case(case))
+                migrated += 1
+        self._unmigrated_ids = []
+        if migrated:
+            print(f"🗂️ [INDEX] {migrated} Cases mit UUID gespeichert")
+    
+    def _case_from_slot(self, case_id, case, afm_string):
+        """
+        Dekodierten Slot als AFMCase - noch nicht migrierte Slots erhalten ihre Index-ID
+        
+        Der zwischengespeicherte AFM-String gilt dann nicht mehr (die Revision
+        ändert sich), gespeichert wird die neu kodierte Fassung mit UUID.
+        """
+        case = AFMCase.from_storage(case, pure_afm=afm_string)
+        if case_id is not None and case.get('uuid') != case_id:
+            case['uuid'] = case_id
+        return case
+    
+    def _case_status(self, case):
+        """Workflow-Status eines dekodierten Cases (None bei ungültigem AFM-String)"""
+        return case_timestamps(case).status if isinstance(case, dict) else None
+    
+    def _case_fallnummer(self, case):
+        """Fallnummer eines dekodierten Cases für die Sortierung (None bei ungültigem AFM-String)"""
+        return str(case.get('fallnummer') or '') if isinstance(case, dict) else None
+    
+    def _set_fallnummer(self, case_id, fallnummer):
+        """Materialisierte Fallnummer eines Cases nachführen (None = entfernen)"""
+        if fallnummer is None:
+            self._fallnummern.pop(case_id, None)
+        else:
+            self._fallnummern[case_id] = fallnummer
+    
+    def _set_status(self, case_id, status):
+        """Materialisierten Status eines Cases inkrementell nachführen (None = entfernen)"""
+        previous = self._statuses.get(case_id)
+        if previous == status:
+            return
+        if previous is not None:
+            self._status_index[previous].pop(case_id, None)
+        if status is None:
+            self._statuses.pop(case_id, None)
+            return
+        self._statuses[case_id] = status
+        self._status_index.setdefault(status, {})[case_id] = None
+    
+    def _ensure_state(self):
+        """Slots und Primärindex laden, falls sich die Dateien geändert haben"""
+        fingerprint = self.fingerprint()
+        if self._slots is not None and fingerprint == self._state_fingerprint:
+            return
+        
+        with self.lock.shared():
+            self._load_state()
+    
+    def _load_state(self):
+        """Snapshot, Primärindex und Änderungen laden (unter Lesesperre)"""
+        self._state_version = self.lock.version()
+        slots = self._load_snapshot_slots()
+        snapshot_fingerprint = self._file_fingerprint(self.storage_file)
+        ids, statuses, fallnummern, unmigrated = self.case_index.read(snapshot_fingerprint)
+        self._positions = {}
+        if ids is None or len(ids) != len(slots):
+            ids, statuses, fallnummern, unmigrated = self._rebuild_ids(slots)
+            print(f"🗂️ [INDEX] Primärindex für {len(ids)} Cases neu aufgebaut")
+            # Nur der Index wird geschrieben - der Snapshot folgt mit dem nächsten Schreibvorgang
+            self.case_index.save(ids, snapshot_fingerprint, statuses, fallnummern, unmigrated)
+            if unmigrated:
+                print(f"🗂️ [INDEX] {len(unmigrated)} Cases ohne gespeicherte UUID - Migration beim nächsten Schreiben")
+        elif statuses is None or fallnummern is None:
+            # Index aus älterer Version ohne Status/Fallnummer: einmalig per Dekodierung ergänzen
+            decoded = decode_afm_strings([slot[0] for slot in slots], workers=self.decode_workers)
+            statuses = [self._case_status(case) for case in decoded]
+            fallnummern = [self._case_fallnummer(case) for case in decoded]
+            self.case_index.save(ids, snapshot_fingerprint, statuses, fallnummern, unmigrated)
+        
+        self._slots = slots
+        self._ids = list(ids)
+        self._positions = {case_id: i for i, case_id in enumerate(ids)}
+        self._statuses = {}
+        self._status_index = {}
+        self._fallnummern = {}
+        self._erfassung_index = None
+        for case_id, status, fallnummer in zip(ids, statuses, fallnummern):
+            self._set_status(case_id, status)
+            self._set_fallnummer(case_id, fallnummer)
+        self._unmigrated_ids = list(unmigrated)
+        self._replay_changes()
+        self._state_fingerprint = self.fingerprint()
+    
+    def _replay_changes(self):
+        """Hook für Storage-Modi mit Änderungsprotokoll"""
+    
+    def _apply_change(self, record):
+        """Wendet eine ID-basierte Änderung auf den In-Memory Zustand an"""
+        op = record.get('op')
+        case_id = record.get('id')
+        position = self._positions.get(case_id)
+        
+        if op in ('add', 'set'):
+            slot = [record['afm'], record.get('erfassung', '')]
+            if position is None:
+                self._positions[case_id] = len(self._slots)
+                self._index_erfassung(None, slot, len(self._slots))
+                self._slots.append(slot)
+                self._ids.append(case_id)
+            else:
+                self._index_erfassung(self._slots[position], slot, position)
+                self._slots[position] = slot
+            status, fallnummer = record.get('status'), record.get('fallnummer')
+            if status is None or fallnummer is None:
+                # Journal-Einträge älterer Versionen enthalten keinen Status bzw. keine Fallnummer
+                case = self.parse_afm_string_to_case(record['afm'])
+                status, fallnummer = self._case_status(case), self._case_fallnummer(case)
+            self._set_status(case_id, status)
+            self._set_fallnummer(case_id, fallnummer)
+        elif op == 'del' and position is not None:
+            self._index_erfassung(self._slots[position], None, position)
+            self._slots[position] = None
+            self._ids[position] = None
+            del self._positions[case_id]
+            self._set_status(case_id, None)
+            self._set_fallnummer(case_id, None)
+    
+    def _index_erfassung(self, old_slot, new_slot, position):
+        """Sekundärindex für eine geänderte Position nachführen (falls bereits aufgebaut)"""
+        index = self._erfassung_index
+        if index is None:
+            return
+        if old_slot is not None:
+            entry = (old_slot[1], position)
+            i = bisect.bisect_left(index, entry)
+            if i < len(index) and index[i] == entry:
+                del index[i]
+        if new_slot is not None:
+            bisect.insort(index, (new_slot[1], position))
+    
+    def _persist_changes(self, records):
+        """Snapshot-Modus: Änderungen schreiben gemeinsam einen vollständigen Snapshot"""
+        self._write_snapshot()
+    
+    def _write_snapshot(self):
+        """Schreibt den aktuellen In-Memory Zustand als Snapshot + Index"""
+        live = [(case_id, slot) for case_id, slot in zip(self._ids, self._slots) if slot is not None]
+        self._ids = [case_id for case_id, _ in live]
+        self._slots = [slot for _, slot in live]
+        self._positions = {case_id: i for i, case_id in enumerate(self._ids)}
+        self._erfassung_index = None
+        self._migrate_slots()
+        
+        self._write_pure_afm_strings([slot[0] for slot in self._slots], [slot[1] for slot in self._slots])
+        self.case_index.save(
+            self._ids, self._file_fingerprint(self.storage_file),
+            [self._statuses.get(i) for i in self._ids], [self._fallnummern.get(i) for i in self._ids]
+        )
+    
+    def _resolve_records(self, operations):
+        """Operationen gegen den geladenen Stand zu kodierten Records auflösen (ohne anzuwenden)"""
+        records = []
+        # Case-ID → existiert nach den bisherigen Operationen dieses Batches
+        batch = {}
+        for op, case_id, case in operations:
+            if op == 'add':
+                case_id = ensure_case_id(case, taken=ChainMap(batch, self._positions))
+            elif not batch.get(case_id, case_id in self._positions):
+                continue
+            batch[case_id] = op != 'del'
             
-            for afm_string in afm_strings:
-                case = self.parse_afm_string_to_case(afm_string)
-                if case:
-                    cases.append(case)
+            if op == 'del':
+                records.append({"op": "del", "id": case_id})
+                continue
+            case['uuid'] = case_id
+            afm, erfassung = self.encode_case(case)
+            records.append({
+                "op": op, "id": case_id, "afm": afm, "erfassung": erfassung,
+                "status": self._case_status(case), "fallnummer": self._case_fallnummer(case)
+            })
+        return records
+    
+    def _slot_afm(self, case_id):
+        """AFM-String eines Cases im geladenen Stand (None wenn nicht vorhanden)"""
+        position = self._positions.get(case_id)
+        return self._slots[position][0] if position is not None else None
+    
+    def _retry_records(self, operations, records):
+        """Veralteter Lesestand: neu laden und nur die eigenen Operationen erneut auflösen"""
+        read = {record['id']: self._slot_afm(record['id']) for record in records if record['op'] != 'add'}
+        self._load_state()
+        for case_id, afm_string in read.items():
+            if self._slot_afm(case_id) != afm_string:
+                print(f"⚠️ [LOCK] Case {case_id} wurde parallel geändert - letzte Änderung gewinnt")
+        
+        records = self._resolve_records(operations)
+        print(f"🔒 [LOCK] Storage von anderem Prozess geändert - {len(records)} Änderungen neu angewendet")
+        return records
+    
+    def write_batch(self, operations):
+        """
+        Mehrere Änderungen anwenden und gemeinsam persistieren (ein Schreibvorgang)
+        
+        Optimistisch: Records werden ohne Sperre gegen den gelesenen Stand kodiert.
+        Hat ein anderer Prozess seitdem geschrieben (Store-Version), werden unter
+        der exklusiven Sperre nur diese Records auf den neuen Stand angewendet.
+        
+        Args:
+            operations: Folge von (op, case_id, case) mit op in "add", "set", "del"
+        
+        Returns:
+            list: IDs der angewendeten Änderungen
+        """
+        operations = list(operations)
+        self._ensure_state()
+        read_version = self._state_version
+        records = self._resolve_records(operations)
+        
+        with self.lock.exclusive():
+            if self.lock.version() != read_version:
+                records = self._retry_records(operations, records)
+            before = self.fingerprint()
+            changes = [(self._slot_afm(record['id']), record.get('afm')) for record in records]
+            for record in records:
+                self._apply_change(record)
+            if records and self._migration_pending:
+                # Fehlende UUIDs gemeinsam mit den Änderungen festschreiben (vollständiger Snapshot)
+                self._write_snapshot()
+                self._state_version = self.lock.bump_version()
+                self._state_fingerprint = self.fingerprint()
+                self._rebuild_metadata()
+            elif records:
+                self._persist_changes(records)
+                self._state_version = self.lock.bump_version()
+                self._update_metadata(before, changes)
+            self._state_fingerprint = self.fingerprint()
+        return [record['id'] for record in records]
+    
+    def save_pure_afm_data(self, cases):
+        """Speichert nur AFM-Strings + Metadaten"""
+        self._slots = []
+        self._ids = []
+        self._statuses = {}
+        self._status_index = {}
+        self._fallnummern = {}
+        self._erfassung_index = None
+        seen = set()
+        
+        for case in cases:
+            case_id = ensure_case_id(case, taken=seen)
+            seen.add(case_id)
             
-            return cases
-        except:
+            self._slots.append(list(self.encode_case(case)))
+            self._ids.append(case_id)
+            self._set_status(case_id, self._case_status(case))
+            self._set_fallnummer(case_id, self._case_fallnummer(case))
+        
+        with self.lock.exclusive():
+            self._write_snapshot()
+            self._state_version = self.lock.bump_version()
+            self._state_fingerprint = self.fingerprint()
+            self.case_metadata.save(self._state_fingerprint, self._metadata(count_fields(cases)))
+    
+    def _metadata(self, fields, modified=None):
+        """Metadaten des In-Memory Zustands mit gegebenem Feldkatalog"""
+        status_counts = {status: len(case_ids) for status, case_ids in self._status_index.items() if case_ids}
+        latest = next((slot[0] for slot in reversed(self._slots) if slot is not None), None)
+        return {
+            "case_count": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "fields": fields,
+            "version": self._state_version,
+            "modified": modified or datetime.now().isoformat(),
+            "latest_afm": latest,
+        }
+    
+    def _compute_metadata(self):
+        """Metadaten vollständig aus dem Storage berechnen (dekodiert einmalig alle Cases)"""
+        self._ensure_state()
+        decoded = decode_afm_strings(
+            [slot[0] for slot in self._slots if slot is not None], workers=self.decode_workers
+        )
+        mtimes = [fp[0] for fp in self._state_fingerprint[:-1] if fp is not None]
+        modified = datetime.fromtimestamp(max(mtimes) / 1e9).isoformat() if mtimes else None
+        print(f"🗂️ [META] Metadaten für {len(decoded)} Cases neu aufgebaut")
+        return self._metadata(count_fields(decoded), modified)
+    
+    def _rebuild_metadata(self):
+        """Metadaten neu aufbauen und als Sidecar speichern"""
+        metadata = self._compute_metadata()
+        return self.case_metadata.save(self._state_fingerprint, metadata)
+    
+    def _update_metadata(self, before, changes):
+        """
+        Metadaten nach einem Schreibvorgang nachführen (unter exklusiver Sperre)
+        
+        Args:
+            before: Fingerprint vor dem Schreibvorgang (zu ihm muss der Sidecar passen)
+            changes: Folge von (alter AFM-String, neuer AFM-String) - None für fehlend/gelöscht
+        """
+        metadata = self.case_metadata.read(before)
+        if metadata is None:
+            self._state_fingerprint = self.fingerprint()
+            self._rebuild_metadata()
+            return
+        
+        fields = self._apply_field_changes(metadata["fields"], changes)
+        self.case_metadata.save(self.fingerprint(), self._metadata(fields))
+    
+    def _apply_field_changes(self, fields, changes):
+        """Feldkatalog um geänderte Cases fortschreiben - dekodiert nur alte und neue Fassung"""
+        for old_afm, new_afm in changes:
+            if old_afm == new_afm:
+                continue
+            for afm_string, step in ((old_afm, -1), (new_afm, 1)):
+                case = self.parse_afm_string_to_case(afm_string) if afm_string is not None else None
+                for field in case if isinstance(case, dict) else ():
+                    count = fields.get(field, 0) + step
+                    if count > 0:
+                        fields[field] = count
+                    else:
+                        fields.pop(field, None)
+        return fields
+    
+    def _refresh_metadata(self, before):
+        """Sidecar nach inhaltsneutralen Schreibvorgängen (z.B. Kompaktierung) neu verankern"""
+        metadata = self.case_metadata.read(before)
+        if metadata is not None:
+            self.case_metadata.save(self.fingerprint(), metadata)
+    
+    def metadata(self):
+        """
+        Storage-Metadaten ohne Parsing oder Dekodierung - O(1)
+        
+        Fehlt der Sidecar oder passt er nicht zum Storage (z.B. extern ersetzte
+        Datei), wird er einmalig neu aufgebaut und gespeichert - wie der
+        Primärindex nur die abgeleitete Datei, nie den Storage selbst.
+        
+        Returns:
+            dict: case_count, status_counts, fields (Feld → Anzahl Cases), version,
+                  modified (ISO), latest_afm (AFM-String des letzten Cases)
+        """
+        fingerprint = self.fingerprint()
+        metadata = self.case_metadata.read(fingerprint)
+        if metadata is not None:
+            return metadata
+        
+        with self.lock.shared():
+            return self._rebuild_metadata()
+    
+    def get_cases_count(self):
+        """Case-Anzahl aus den Metadaten"""
+        return self.metadata()["case_count"]
+    
+    def get_latest_case(self):
+        """Zuletzt gespeicherter Case - dekodiert nur diesen AFM-String"""
+        afm_string = self.metadata().get("latest_afm")
+        case = self.parse_afm_string_to_case(afm_string) if afm_string else None
+        return AFMCase.from_storage(case, pure_afm=afm_string) if isinstance(case, dict) else None
+    
+    def load_afm_strings(self):
+        """Lädt die verschlüsselten AFM-Strings ohne Case-Rekonstruktion"""
+        self._ensure_state()
+        return [slot[0] for slot in self._slots if slot is not None]
+    
+    def _load_lazy_cases(self):
+        """Cases als LazyAFMCase - ungültige AFM-Strings (ohne Status) entfallen wie beim Dekodieren"""
+        self._ensure_state()
+        statuses = self._statuses
+        return [
+            LazyAFMCase(slot[0], case_id)
+            for case_id, slot in zip(self._ids, self._slots) if slot is not None and case_id in statuses
+        ]
+    
+    def load_pure_afm_data(self):
+        """Lädt AFM-Strings und rekonstruiert Cases (bei lazy_cases erst beim ersten Feldzugriff)"""
+        try:
+            if self.lazy_cases:
+                return self._load_lazy_cases()
+            self._ensure_state()
+            live = [(case_id, slot[0]) for case_id, slot in zip(self._ids, self._slots) if slot is not None]
+            decoded = decode_afm_strings([afm_string for _, afm_string in live], workers=self.decode_workers)
+            # Bearbeitbare Cases merken sich ihren AFM-String bis zur nächsten Änderung
+            return [
+                self._case_from_slot(case_id, case, afm_string)
+                for case, (case_id, afm_string) in zip(decoded, live) if case and isinstance(case, dict)
+            ]
+        except (OSError, ValueError) as e:
+            print(f"❌ [PURE AFM] Laden fehlgeschlagen: {e}")
             return []
+    
+    def _stream_snapshot_afm_strings(self):
+        """AFM-Strings elementweise aus der Snapshot-Datei (ohne vollständiges json.load)"""
+        if not self.storage_file.exists():
+            return
+        yield from iter_json_array(self.storage_file, 'afm_strings')
+    
+    def _stream_afm_strings(self):
+        """AFM-Strings des aktuellen Stands gestreamt (Snapshot-Modus: der Snapshot)"""
+        return self._stream_snapshot_afm_strings()
+    
+    def _stream_case_id(self, position, afm_string):
+        """Case-ID eines gestreamten Slots ohne Primärindex - wie beim Neuaufbau (_rebuild_ids)"""
+        case = self.parse_afm_string_to_case(afm_string)
+        case_id = get_case_id(case) if isinstance(case, dict) else None
+        return case_id or self._legacy_case_id(position, afm_string)
+    
+    def _stream_case_afm_strings(self):
+        """(Case-ID, AFM-String) aus dem Snapshot streamen - IDs aus dem Primärindex, ohne ihn je Case dekodiert"""
+        ids = self.case_index.load(self._file_fingerprint(self.storage_file))
+        for position, afm_string in enumerate(self._stream_snapshot_afm_strings()):
+            if ids is not None and position < len(ids):
+                yield ids[position], afm_string
+            else:
+                yield self._stream_case_id(position, afm_string), afm_string
+    
+    def iter_afm_strings(self):
+        """AFM-Strings nacheinander - aus dem Speicher falls aktuell, sonst gestreamt"""
+        if self._slots is not None and self.fingerprint() == self._state_fingerprint:
+            yield from [slot[0] for slot in self._slots if slot is not None]
+            return
+        yield from self._stream_afm_strings()
+    
+    def iter_cases(self):
+        """Cases einzeln dekodiert liefern - begrenzter Speicher auch bei sehr großen Dateien"""
+        try:
+            for afm_string in self.iter_afm_strings():
+                case = self.parse_afm_string_to_case(afm_string)
+                if case and isinstance(case, dict):
+                    yield AFMCase.from_storage(case, pure_afm=afm_string)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ [PURE AFM] Streaming abgebrochen: {e}")
+    
+    def case_ids(self):
+        """Alle Case-IDs in Speicherreihenfolge (ohne Dekodierung)"""
+        self._ensure_state()
+        return [case_id for case_id in self._ids if case_id is not None]
+    
+    def iter_case_afm_strings(self):
+        """(Case-ID, AFM-String) in Speicherreihenfolge - aus dem Speicher falls aktuell, sonst gestreamt"""
+        if self._slots is not None and self.fingerprint() == self._state_fingerprint:
+            yield from [(case_id, slot[0]) for case_id, slot in zip(self._ids, self._slots) if slot is not None]
+            return
+        yield from self._stream_case_afm_strings()
+    
+    def get_case(self, case_id):
+        """Einzelnen Case per ID laden - O(1), dekodiert nur diesen AFM-String"""
+        self._ensure_state()
+        position = self._positions.get(case_id)
+        if position is None:
+            return None
+        afm_string = self._slots[position][0]
+        case = self.parse_afm_string_to_case(afm_string)
+        return self._case_from_slot(case_id, case, afm_string) if isinstance(case, dict) else None
+    
+    def count_by_status(self):
+        """Case-Anzahl je Status - aus dem materialisierten Status-Index, ohne Dekodierung"""
+        self._ensure_state()
+        return {status: len(case_ids) for status, case_ids in self._status_index.items() if case_ids}
+    
+    def case_ids_by_status(self, status, by_fallnummer=False):
+        """IDs aller Cases eines Status in Speicherreihenfolge (by_fallnummer: nach Fallnummer) - ohne Dekodierung"""
+        self._ensure_state()
+        positions = self._positions
+        if by_fallnummer:
+            fallnummern = self._fallnummern
+            return sorted(self._status_index.get(status, ()), key=lambda i: (fallnummern.get(i, ''), positions[i]))
+        return sorted(self._status_index.get(status, ()), key=positions.__getitem__)
+    
+    def get_cases_by_status(self, status):
+        """Cases eines Status - dekodiert nur die betroffenen AFM-Strings"""
+        cases = (self.get_case(case_id) for case_id in self.case_ids_by_status(status))
+        return [case for case in cases if case is not None]
+    
+    def _erfassung_entries(self):
+        """Sekundärindex über erfassung_timestamps: sortierte (erfassung, Position)"""
+        self._ensure_state()
+        if self._erfassung_index is None:
+            self._erfassung_index = sorted(
+                (slot[1], position) for position, slot in enumerate(self._slots) if slot is not None
+            )
+        return self._erfassung_index
+    
+    def _erfassung_range(self, start, end):
+        """Indexeinträge im Zeitraum per Binärsuche"""
+        index = self._erfassung_entries()
+        low, high = erfassung_bounds(start, end)
+        return index[bisect.bisect_left(index, (low,)):bisect.bisect_left(index, (high,))]
+    
+    def _decode_positions(self, positions):
+        """Cases an Speicherpositionen dekodieren (ungültige AFM-Strings entfallen)"""
+        cases = []
+        for position in positions:
+            afm_string = self._slots[position][0]
+            case = self.parse_afm_string_to_case(afm_string)
+            if isinstance(case, dict):
+                cases.append(self._case_from_slot(self._ids[position], case, afm_string))
+        return cases
+    
+    def case_ids_by_erfassung(self, start=None, end=None):
+        """
+        IDs der im Zeitraum erfassten Cases - Binärsuche, ohne Dekodierung
+        
+        Args:
+            start: ab (inklusive), end: bis (exklusive) - siehe erfassung_bounds
+        
+        Returns:
+            list: Case-IDs aufsteigend nach erfassung (gleiche Stunde: Speicherreihenfolge)
+        """
+        return [self._ids[position] for _, position in self._erfassung_range(start, end)]
+    
+    def get_cases_by_erfassung(self, start=None, end=None):
+        """Im Zeitraum erfasste Cases - dekodiert nur die Treffer (z.B. heute: date.today())"""
+        return self._decode_positions(position for _, position in self._erfassung_range(start, end))
+    
+    def get_cases_since(self, timestamp):
+        """Seit einem Zeitpunkt erfasste Cases (angebrochene Stunde inklusive)"""
+        return self.get_cases_by_erfassung(start=timestamp)
+    
+    def get_newest_cases(self, count=1):
+        """
+        Die zuletzt erfassten Cases - dekodiert nur diese
+        
+        Args:
+            count (int): Anzahl (-1 = alle)
+        
+        Returns:
+            list: aufsteigend nach erfassung (neuester zuletzt), Cases ohne erfassung gelten als älteste
+        """
+        index = self._erfassung_entries()
+        found = index if count == -1 else index[len(index) - min(count, len(index)):]
+        return self._decode_positions(position for _, position in found)
+    
+    def append_case(self, case):
+        """Case anhängen und seine ID zurückgeben"""
+        return self.write_batch([('add', None, case)])[0]
+    
+    def update_case(self, case_id, case):
+        """Case per ID ersetzen"""
+        return bool(self.write_batch([('set', case_id, case)]))
+    
+    def delete_case(self, case_id):
+        """Case per ID löschen"""
+        return bool(self.write_batch([('del', case_id, None)]))
+    
+    def compact(self):
+        """Snapshot-Modus: bereits kompakt"""
+        return 0
@@ -0,0 +1,319 @@
+"""
+AFM Pure v2 - Binärer Container mit Offset-Tabelle und mmap-Zugriff
+Layout (Little Endian):
+    Header      : Magic "AFMPURE2", Version, Flags, Case-Anzahl, created (ISO, 32 Bytes)
+    Offset-Tabelle: je Case ein uint64 Offset auf den Record
+    Records     : uint32 AFM-Länge, uint32 erfassung-Länge, AFM-String, erfassung (UTF-8)
+Einzelne Cases und Bereiche werden direkt aus der gemappten
+Datei gelesen, ohne das gesamte Dokument zu parsen.
+"""
+import mmap
+import struct
+from datetime import datetime
+from pathlib import Path
+
+from .afm_pure import AFMPureStorage
+from .case_index import AFMCaseIndex
+from .case_metadata import AFMCaseMetadata
+from .atomic_write import atomic_write
+from . import json_codec
+
+V2_FORMAT = "afm_pure_v2"
+V2_MAGIC = b"AFMPURE2"
+V2_VERSION = 2
+V2_SUFFIX = ".afm2"
+
+HEADER = struct.Struct("<8sHHI32s")
+OFFSET = struct.Struct("<Q")
+RECORD = struct.Struct("<II")
+
+class AFMPureV2Error(ValueError):
+    """Ungültige oder beschädigte afm_pure_v2 Datei"""
+
+def write_pure_v2(path, afm_strings, erfassung_timestamps, created=None, durability=None):
+    """
+    Schreibt AFM-Strings als afm_pure_v2 Container
+
+    Die Datei wird über eine temporäre Datei ersetzt, damit bestehende
+    mmap-Leser weiterhin die alte Version sehen statt einer halb geschriebenen.
+
+    Args:
+        path: Zieldatei
+        afm_strings (list): verschlüsselte AFM-Strings
+        erfassung_timestamps (list): vereinfachte erfassung-Zeitstempel je Case
+        created (str): ISO-Zeitstempel (Standard: jetzt)
+        durability (str): "always", "batched" oder "never" (Standard: AFM_DURABILITY)
+
+    Returns:
+        int: Anzahl geschriebener Cases
+    """
+    path = Path(path)
+    created = (created or datetime.now().isoformat()).encode('ascii')[:32]
+    erfassung_timestamps = list(erfassung_timestamps)
+    erfassung_timestamps += [''] * (len(afm_strings) - len(erfassung_timestamps))
+
+    records = [
+        (afm.encode('utf-8'), (ts or '').encode('utf-8'))
+        for afm, ts in zip(afm_strings, erfassung_timestamps)
+    ]
+    offset = HEADER.size + OFFSET.size * len(records)
+    offsets = []
+    for afm, ts in records:
+        offsets.append(offset)
+        offset += RECORD.size + len(afm) + len(ts)
+
+    with atomic_write(path, 'wb', durability=durability) as f:
+        f.write(HEADER.pack(V2_MAGIC, V2_VERSION, 0, len(records), created))
+        for record_offset in offsets:
+            f.write(OFFSET.pack(record_offset))
+        for afm, ts in records:
+            f.write(RECORD.pack(len(afm), len(ts)))
+            f.write(afm)
+            f.write(ts)
+    return len(records)
+
+class AFMPureV2File:
+    """Lesezugriff auf einen afm_pure_v2 Container per mmap (Zero-Copy Slices)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        if len(self._mm) < HEADER.size:
+            self.close()
+            raise AFMPureV2Error(f"{self.path}: Header unvollständig")
+        magic, version, self.flags, self.case_count, created = HEADER.unpack_from(self._mm, 0)
+        if magic != V2_MAGIC or version != V2_VERSION:
+            self.close()
+            raise AFMPureV2Error(f"{self.path}: kein {V2_FORMAT} Container")
+        if HEADER.size + OFFSET.size * self.case_count > len(self._mm):
+            self.close()
+            raise AFMPureV2Error(f"{self.path}: Offset-Tabelle unvollständig")
+        self.created = created.rstrip(b"\0").decode('ascii')
+
+    def __len__(self):
+        return self.case_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Mapping freigeben"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def record_views(self, position):
+        """
+        Zero-Copy Zugriff auf einen Record
+
+        Returns:
+            tuple: (memoryview AFM-String, memoryview erfassung-Zeitstempel)
+        """
+        if not 0 <= position < self.case_count:
+            raise IndexError(position)
+        offset, = OFFSET.unpack_from(self._mm, HEADER.size + OFFSET.size * position)
+        afm_len, ts_len = RECORD.unpack_from(self._mm, offset)
+        start = offset + RECORD.size
+        return self._view[start:start + afm_len], self._view[start + afm_len:start + afm_len + ts_len]
+
+    def read_slot(self, position):
+        """Record als [AFM-String, erfassung-Zeitstempel]"""
+        afm, ts = self.record_views(position)
+        try:
+            return [str(afm, 'utf-8'), str(ts, 'utf-8')]
+        finally:
+            afm.release()
+            ts.release()
+
+    def iter_slots(self, start=0, stop=None):
+        """Records eines Bereichs (Python-Slice Semantik) nacheinander lesen"""
+        for position in range(*slice(start, stop).indices(self.case_count)):
+            yield self.read_slot(position)
+
+class AFMPureV2Slots:
+    """
+    Slot-Folge des Storage über einem gemappten Container
+
+    Records werden erst beim Zugriff gelesen; nur geänderte, gelöschte (None)
+    und angehängte Slots liegen im Speicher. Der Primärindex adressiert so
+    Offsets im Container, statt alle AFM-Strings zu materialisieren.
+    """
+
+    def __init__(self, container):
+        self._container = container
+        self._base = len(container)
+        self._changed = {}
+        self._appended = []
+
+    def __len__(self):
+        return self._base + len(self._appended)
+
+    def _index(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return position
+
+    def __getitem__(self, position):
+        position = self._index(position)
+        if position >= self._base:
+            return self._appended[position - self._base]
+        if position in self._changed:
+            return self._changed[position]
+        return self._container.read_slot(position)
+
+    def __setitem__(self, position, slot):
+        position = self._index(position)
+        if position >= self._base:
+            self._appended[position - self._base] = slot
+        else:
+            self._changed[position] = slot
+
+    def append(self, slot):
+        self._appended.append(slot)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __reversed__(self):
+        for position in reversed(range(len(self))):
+            yield self[position]
+
+def convert_v1_to_v2(v1_file, v2_file):
+    """
+    Konvertiert eine afm_pure_v1.0 JSON-Datei in einen afm_pure_v2 Container
+
+    Returns:
+        int: Anzahl konvertierter Cases
+    """
+    with open(v1_file, 'r', encoding='utf-8') as f:
+        pure_data = json_codec.load(f)
+    count = write_pure_v2(
+        v2_file,
+        pure_data.get('afm_strings', []),
+        pure_data.get('erfassung_timestamps', []),
+        created=pure_data.get('created')
+    )
+    print(f"🔁 [PURE AFM v2] {count} Cases nach {v2_file} konvertiert")
+    return count
+
+def convert_v2_to_v1(v2_file, v1_file):
+    """
+    Konvertiert einen afm_pure_v2 Container zurück nach afm_pure_v1.0 JSON
+
+    Returns:
+        int: Anzahl konvertierter Cases
+    """
+    with AFMPureV2File(v2_file) as container:
+        slots = list(container.iter_slots())
+    AFMPureStorage(v1_file)._write_pure_afm_strings(
+        [slot[0] for slot in slots], [slot[1] for slot in slots]
+    )
+    print(f"🔁 [PURE AFM v2] {len(slots)} Cases nach {v1_file} konvertiert")
+    return len(slots)
+
+class AFMPureV2Storage(AFMPureStorage):
+    """Pure AFM Storage im binären afm_pure_v2 Format"""
+
+    def __init__(self, storage_file):
+        super().__init__(storage_file)
+        # Eigener Index neben cases.afm2, damit er nicht mit dem v1-Index kollidiert
+        self.case_index = AFMCaseIndex(self.storage_file.with_name(self.storage_file.name + '.index.json'))
+        self.case_metadata = AFMCaseMetadata(self.storage_file.with_name(self.storage_file.name + '.meta.json'))
+        self._container = None
+        self._container_fingerprint = None
+
+    def _open_container(self):
+        """Gemappten Container öffnen - wird nach Dateiänderungen neu gemappt"""
+        fingerprint = self._file_fingerprint(self.storage_file)
+        if self._container is not None and fingerprint == self._container_fingerprint:
+            return self._container
+        self.close()
+        if fingerprint is None:
+            return None
+
+        self._container = AFMPureV2File(self.storage_file)
+        self._container_fingerprint = fingerprint
+        return self._container
+
+    def close(self):
+        """Mapping freigeben - darauf verweisende Slots werden beim nächsten Zugriff neu geladen"""
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+            self._slots = None
+
+    def _write_pure_afm_strings(self, afm_strings, erfassung_timestamps):
+        """Schreibt kodierte AFM-Strings als afm_pure_v2 Container (Mapping vorher freigegeben)"""
+        # Eine noch gemappte Datei lässt sich nicht überall ersetzen (z.B. Windows)
+        self.close()
+        write_pure_v2(self.storage_file, afm_strings, erfassung_timestamps, durability=self.durability)
+
+    def _write_snapshot(self):
+        """Snapshot schreiben und die Slots wieder über den neuen Container adressieren"""
+        super()._write_snapshot()
+        self._slots = self._load_snapshot_slots()
+
+    def _load_snapshot_slots(self):
+        """Snapshot-Slots direkt aus dem Container (kein JSON-Parsing)"""
+        try:
+            container = self._open_container()
+        except (OSError, AFMPureV2Error) as e:
+            print(f"⚠️ [PURE AFM v2] Container nicht lesbar: {e}")
+            return []
+        if container is None:
+            return []
+        return AFMPureV2Slots(container)
+
+    def _stream_snapshot_afm_strings(self):
+        """AFM-Strings direkt aus dem gemappten Container"""
+        container = self._open_container()
+        if container is None:
+            return
+        for afm_string, _ in container.iter_slots():
+            yield afm_string
+
+    def _current_ids(self):
+        """Index-IDs der Speicherpositionen, falls der Zustand bereits geladen und aktuell ist"""
+        if self._slots is not None and self.fingerprint() == self._state_fingerprint:
+            return self._ids
+        return None
+
+    @staticmethod
+    def _id_at(ids, position):
+        """Index-ID einer Speicherposition (None, wenn der Zustand nicht geladen ist)"""
+        return ids[position] if ids and position < len(ids) else None
+
+    def get_case_at(self, position):
+        """Case an Speicherposition direkt aus dem Container dekodieren"""
+        container = self._open_container()
+        if container is None or not 0 <= position < len(container):
+            return None
+        afm_string = container.read_slot(position)[0]
+        case = self.parse_afm_string_to_case(afm_string)
+        if not isinstance(case, dict):
+            return None
+        return self._case_from_slot(self._id_at(self._current_ids(), position), case, afm_string)
+
+    def iter_case_range(self, start=0, stop=None):
+        """Cases eines Bereichs seitenweise dekodieren (z.B. für Paging)"""
+        container = self._open_container()
+        if container is None:
+            return
+        ids = self._current_ids()
+        first = slice(start, stop).indices(len(container))[0]
+        for position, (afm_string, _) in enumerate(container.iter_slots(start, stop), first):
+            case = self.parse_afm_string_to_case(afm_string)
+            if isinstance(case, dict):
+                yield self._case_from_slot(self._id_at(ids, position), case, afm_string)
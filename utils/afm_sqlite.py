@@ -0,0 +1,440 @@
+"""
+AFM SQLite Storage - AFM-Strings als Tabellenzeilen (stdlib sqlite3, WAL)
+Jeder Case ist eine Zeile mit seinem verschlüsselten AFM-String und
+indizierten Spalten (uuid, fallnummer, status, erfassung, letzter Zeitstempel).
+Einzelzugriffe, Status-Filter und Änderungen einzelner Cases laufen über
+Indizes statt über ein Neuschreiben der gesamten JSON-Datei.
+
+Jeder Thread (z.B. GUI und Flush-Timer des DataService) nutzt eine eigene
+Verbindung - Transaktionen verschiedener Threads vermischen sich so nicht,
+WAL lässt Leser parallel zum Schreiber laufen.
+"""
+import hashlib
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from .afm_pure import AFMPureStorage, erfassung_bounds
+from .afm_case import AFMCase, LazyAFMCase
+from .afm_timestamps import case_timestamps
+from .afm_utils import get_case_status
+from .afm_parallel import decode_afm_strings
+from .atomic_write import DURABILITY
+from .case_index import ensure_case_id
+from .case_metadata import count_fields
+from . import json_codec
+
+SQLITE_FORMAT = "afm_sqlite_v1"
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+MIGRATION_BATCH_SIZE = 1000
+# Durability-Stufe → PRAGMA synchronous (WAL: NORMAL synchronisiert beim Checkpoint)
+SQLITE_SYNCHRONOUS = {"always": "FULL", "batched": "NORMAL", "never": "OFF"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cases (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid TEXT NOT NULL UNIQUE,
+    afm_string TEXT NOT NULL,
+    erfassung TEXT NOT NULL DEFAULT '',
+    fallnummer TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'neu',
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_cases_fallnummer ON cases (fallnummer);
+CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status);
+CREATE INDEX IF NOT EXISTS idx_cases_erfassung ON cases (erfassung);
+CREATE INDEX IF NOT EXISTS idx_cases_updated_at ON cases (updated_at);
+"""
+
+_INSERT_CASE = (
+    "INSERT INTO cases (uuid, afm_string, erfassung, fallnummer, status, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+def is_sqlite_path(path):
+    """True wenn der Pfad auf eine SQLite-Datenbank zeigt"""
+    return Path(path).suffix.lower() in SQLITE_SUFFIXES
+
+class _TakenIds:
+    """`in`-Prüfung vergebener Case-IDs per Index-Abfrage (für ensure_case_id)"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __contains__(self, case_id):
+        row = self.connection.execute("SELECT 1 FROM cases WHERE uuid = ?", (case_id,)).fetchone()
+        return row is not None
+
+class AFMSQLiteStorage(AFMPureStorage):
+    """Pure AFM Storage in einer SQLite-Datenbank (Drop-in für AFMPureStorage)"""
+
+    def __init__(self, storage_file):
+        super().__init__(storage_file)
+        # Thread → eigene Verbindung (siehe connection)
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+        self.durability = self._durability
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('format', ?)", (SQLITE_FORMAT,)
+            )
+        # Ohne gespeicherten Feldkatalog gezählt: (Store-Version, Feldkatalog)
+        self._computed_fields = None
+
+    @property
+    def durability(self):
+        """fsync-Verhalten als Durability-Stufe"""
+        return self._durability
+
+    @durability.setter
+    def durability(self, durability):
+        """Durability-Stufe auf PRAGMA synchronous aller Verbindungen abbilden"""
+        self._durability = durability
+        if getattr(self, '_connections', None) is None:
+            return
+        with self._connections_lock:
+            for connection in self._connections.values():
+                self._apply_durability(connection)
+
+    def _apply_durability(self, connection):
+        """PRAGMA synchronous einer Verbindung setzen"""
+        synchronous = SQLITE_SYNCHRONOUS[self._durability or DURABILITY]
+        connection.execute(f"PRAGMA synchronous={synchronous}")
+
+    @property
+    def connection(self):
+        """
+        Verbindung des aufrufenden Threads - beim ersten Zugriff geöffnet
+
+        Verbindungen beendeter Threads (z.B. abgelaufener Flush-Timer) werden
+        dabei geschlossen. check_same_thread=False erlaubt nur das Schließen
+        aus einem anderen Thread, benutzt wird jede Verbindung von ihrem Thread.
+        """
+        thread = threading.current_thread()
+        connection = self._connections.get(thread)
+        if connection is not None:
+            return connection
+
+        with self._connections_lock:
+            for finished in [other for other in self._connections if not other.is_alive()]:
+                self._connections.pop(finished).close()
+            connection = sqlite3.connect(str(self.storage_file), check_same_thread=False)
+            self._apply_durability(connection)
+            self._connections[thread] = connection
+        return connection
+
+    def close(self):
+        """Alle Verbindungen schließen"""
+        with self._connections_lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+
+    def _row_for_case(self, case_id, case):
+        """Spaltenwerte eines Cases (AFM-String + indizierte Metadaten)"""
+        afm_string, erfassung = self.encode_case(case)
+        timestamps = [entry.wert for entry in case_timestamps(case).entries if ":" in entry.raw]
+        return (
+            case_id,
+            afm_string,
+            erfassung,
+            case.get("fallnummer") or "",
+            get_case_status(case),
+            max(timestamps) if timestamps else "",
+        )
+
+    def _decode_row(self, afm_string):
+        """AFM-String einer Zeile zu einem bearbeitbaren Case"""
+        case = self.parse_afm_string_to_case(afm_string)
+        return AFMCase.from_storage(case, pure_afm=afm_string) if isinstance(case, dict) else None
+
+    def fingerprint(self):
+        """Store-Version aus der meta-Tabelle - von jedem Schreibvorgang erhöht, in allen Verbindungen gleich
+        (PRAGMA data_version zählt je Verbindung und taugt mit Verbindungen je Thread nicht mehr)"""
+        return (self._meta_value('version'),)
+
+    def content_hash(self):
+        """Inhalts-Hash über alle Zeilen in Speicherreihenfolge"""
+        digest = hashlib.blake2b(digest_size=16)
+        for case_id, afm_string in self.connection.execute(
+                "SELECT uuid, afm_string FROM cases ORDER BY seq"):
+            digest.update(case_id.encode('utf-8'))
+            digest.update(afm_string.encode('utf-8'))
+        return digest.hexdigest()
+
+    def save_pure_afm_data(self, cases):
+        """Ersetzt alle Cases in einer Transaktion"""
+        seen = set()
+        rows = []
+        for case in cases:
+            case_id = ensure_case_id(case, taken=seen)
+            seen.add(case_id)
+            rows.append(self._row_for_case(case_id, case))
+
+        with self.connection:
+            self.connection.execute("DELETE FROM cases")
+            self.connection.executemany(_INSERT_CASE, rows)
+            self._write_metadata(count_fields(cases))
+
+    def load_afm_strings(self):
+        """Alle verschlüsselten AFM-Strings in Speicherreihenfolge"""
+        return [row[0] for row in self.connection.execute("SELECT afm_string FROM cases ORDER BY seq")]
+
+    def _load_lazy_cases(self):
+        """Cases als LazyAFMCase direkt aus den Zeilen"""
+        rows = self.connection.execute("SELECT uuid, afm_string FROM cases ORDER BY seq")
+        return [LazyAFMCase(afm_string, case_id) for case_id, afm_string in rows]
+
+    def _stream_afm_strings(self):
+        """AFM-Strings zeilenweise per Cursor"""
+        for row in self.connection.execute("SELECT afm_string FROM cases ORDER BY seq"):
+            yield row[0]
+
+    def iter_afm_strings(self):
+        """AFM-Strings nacheinander - direkt aus der Datenbank"""
+        return self._stream_afm_strings()
+
+    def iter_case_afm_strings(self):
+        """(Case-ID, AFM-String) zeilenweise per Cursor"""
+        return self.connection.execute("SELECT uuid, afm_string FROM cases ORDER BY seq")
+
+    def case_ids(self):
+        """Alle Case-IDs in Speicherreihenfolge (ohne Dekodierung)"""
+        return [row[0] for row in self.connection.execute("SELECT uuid FROM cases ORDER BY seq")]
+
+    def get_case(self, case_id):
+        """Einzelnen Case per ID - indizierter Zugriff"""
+        row = self.connection.execute("SELECT afm_string FROM cases WHERE uuid = ?", (case_id,)).fetchone()
+        return self._decode_row(row[0]) if row else None
+
+    def _execute_change(self, op, case_id, case):
+        """
+        Einzelne Änderung ausführen (innerhalb einer Transaktion)
+
+        Returns:
+            tuple: (Case-ID, alter AFM-String, neuer AFM-String) - None wenn der Case fehlt
+        """
+        if op == 'add':
+            case_id = ensure_case_id(case, taken=_TakenIds(self.connection))
+            row = self._row_for_case(case_id, case)
+            self.connection.execute(_INSERT_CASE, row)
+            return case_id, None, row[1]
+
+        previous = self.connection.execute("SELECT afm_string FROM cases WHERE uuid = ?", (case_id,)).fetchone()
+        if previous is None:
+            return None
+        if op == 'del':
+            self.connection.execute("DELETE FROM cases WHERE uuid = ?", (case_id,))
+            return case_id, previous[0], None
+
+        case['uuid'] = case_id
+        row = self._row_for_case(case_id, case)
+        self.connection.execute(
+            "UPDATE cases SET afm_string = ?, erfassung = ?, fallnummer = ?, status = ?, updated_at = ? "
+            "WHERE uuid = ?", row[1:] + (case_id,)
+        )
+        return case_id, previous[0], row[1]
+
+    def write_batch(self, operations):
+        """Mehrere Änderungen in einer Transaktion (inkl. Metadaten)"""
+        with self.connection:
+            changes = [self._execute_change(op, case_id, case) for op, case_id, case in operations]
+            changes = [change for change in changes if change is not None]
+            if changes:
+                fields = self._field_counts()
+                if fields is None:
+                    # Katalog fehlt: vollständig zählen (enthält die Änderungen bereits)
+                    fields = self._count_all_fields()
+                else:
+                    fields = self._apply_field_changes(fields, [(old, new) for _, old, new in changes])
+                self._write_metadata(fields)
+        return [change[0] for change in changes]
+
+    def _meta_value(self, key):
+        """Wert aus der meta-Tabelle (None wenn nicht gesetzt)"""
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _field_counts(self):
+        """Feldkatalog aus der meta-Tabelle - None wenn (z.B. nach einer Migration) nicht vorhanden"""
+        value = self._meta_value('fields')
+        return json_codec.loads(value) if value else None
+
+    def _count_all_fields(self):
+        """Feldkatalog durch Dekodieren aller Zeilen"""
+        return count_fields(decode_afm_strings(self.load_afm_strings(), workers=self.decode_workers))
+
+    def _write_metadata(self, fields):
+        """Feldkatalog, Store-Version und Änderungszeit setzen (innerhalb der Schreibtransaktion)"""
+        version = int(self._meta_value('version') or 0) + 1
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [('fields', json_codec.dumps(fields)), ('version', str(version)),
+             ('modified', datetime.now().isoformat())]
+        )
+
+    def metadata(self):
+        """
+        Metadaten aus indizierten Abfragen und der meta-Tabelle
+        
+        Fehlt der Feldkatalog (z.B. nach einer Migration), wird er im Speicher gezählt;
+        gespeichert wird er erst mit dem nächsten Schreibvorgang (siehe write_batch).
+        """
+        fields = self._field_counts()
+        if fields is None:
+            version = self._meta_value('version')
+            if self._computed_fields is None or self._computed_fields[0] != version:
+                self._computed_fields = (version, self._count_all_fields())
+            fields = self._computed_fields[1]
+        status_counts = self.count_by_status()
+        latest = self.connection.execute("SELECT afm_string FROM cases ORDER BY seq DESC LIMIT 1").fetchone()
+        modified = self._meta_value('modified')
+        if modified is None:
+            modified = datetime.fromtimestamp(self.storage_file.stat().st_mtime).isoformat()
+        return {
+            "case_count": sum(status_counts.values()),
+            "status_counts": status_counts,
+            "fields": fields,
+            "version": int(self._meta_value('version') or 0),
+            "modified": modified,
+            "latest_afm": latest[0] if latest else None,
+        }
+
+    def append_case(self, case):
+        """Case als neue Zeile anhängen und seine ID zurückgeben"""
+        return self.write_batch([('add', None, case)])[0]
+
+    def update_case(self, case_id, case):
+        """Zeile eines Cases ersetzen (Position bleibt erhalten)"""
+        return bool(self.write_batch([('set', case_id, case)]))
+
+    def delete_case(self, case_id):
+        """Zeile eines Cases löschen"""
+        return bool(self.write_batch([('del', case_id, None)]))
+
+    def compact(self):
+        """WAL in die Datenbankdatei übernehmen"""
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return 0
+
+    def get_cases_count(self):
+        """Anzahl der Cases"""
+        return self.connection.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def get_cases_by_status(self, status):
+        """Cases mit einem Workflow-Status (Index auf status)"""
+        rows = self.connection.execute("SELECT afm_string FROM cases WHERE status = ? ORDER BY seq", (status,))
+        return [case for case in (self._decode_row(row[0]) for row in rows) if case is not None]
+
+    def find_by_fallnummer(self, fallnummer):
+        """Cases mit einer Fallnummer (Index auf fallnummer)"""
+        rows = self.connection.execute(
+            "SELECT afm_string FROM cases WHERE fallnummer = ? ORDER BY seq", (fallnummer,)
+        )
+        return [case for case in (self._decode_row(row[0]) for row in rows) if case is not None]
+
+    def case_ids_by_status(self, status, by_fallnummer=False):
+        """IDs aller Cases eines Status in Speicherreihenfolge (by_fallnummer: nach Fallnummer, Index auf status)"""
+        order = "fallnummer, seq" if by_fallnummer else "seq"
+        rows = self.connection.execute(f"SELECT uuid FROM cases WHERE status = ? ORDER BY {order}", (status,))
+        return [row[0] for row in rows]
+
+    def count_by_status(self):
+        """Case-Anzahl je Status"""
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM cases GROUP BY status"))
+
+    def get_last_cases(self, count=1):
+        """Die zuletzt angelegten Cases in Speicherreihenfolge (-1 = alle)"""
+        rows = self.connection.execute(
+            "SELECT afm_string FROM (SELECT seq, afm_string FROM cases ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+            (count,)
+        )
+        return [case for case in (self._decode_row(row[0]) for row in rows) if case is not None]
+
+    def case_ids_by_erfassung(self, start=None, end=None):
+        """IDs der im Zeitraum erfassten Cases (Index auf erfassung)"""
+        rows = self.connection.execute(
+            "SELECT uuid FROM cases WHERE erfassung >= ? AND erfassung < ? ORDER BY erfassung, seq",
+            erfassung_bounds(start, end)
+        )
+        return [row[0] for row in rows]
+
+    def get_cases_by_erfassung(self, start=None, end=None):
+        """Im Zeitraum erfasste Cases (Index auf erfassung)"""
+        rows = self.connection.execute(
+            "SELECT afm_string FROM cases WHERE erfassung >= ? AND erfassung < ? ORDER BY erfassung, seq",
+            erfassung_bounds(start, end)
+        )
+        return [case for case in (self._decode_row(row[0]) for row in rows) if case is not None]
+
+    def get_newest_cases(self, count=1):
+        """Die zuletzt erfassten Cases aufsteigend nach erfassung (-1 = alle)"""
+        rows = self.connection.execute(
+            "SELECT afm_string FROM (SELECT seq, erfassung, afm_string FROM cases "
+            "ORDER BY erfassung DESC, seq DESC LIMIT ?) ORDER BY erfassung, seq",
+            (count,)
+        )
+        return [case for case in (self._decode_row(row[0]) for row in rows) if case is not None]
+
+def migrate_to_sqlite(source_file, sqlite_file):
+    """
+    Migriert cases.json (Legacy {"cases": [...]} oder afm_pure_v1.0 inkl. Journal) nach SQLite
+
+    Die Quelle wird gestreamt und in Batches eingefügt, eine bestehende
+    Zieldatenbank wird vollständig ersetzt.
+
+    Args:
+        source_file: cases.json
+        sqlite_file: Ziel-Datenbank
+
+    Returns:
+        int: Anzahl migrierter Cases
+    """
+    from .afm_stream import iter_database_cases
+
+    storage = AFMSQLiteStorage(sqlite_file)
+    seen = set()
+    count = 0
+    try:
+        with storage.connection:
+            storage.connection.execute("DELETE FROM cases")
+            batch = []
+            for case in iter_database_cases(source_file):
+                case_id = ensure_case_id(case, taken=seen)
+                seen.add(case_id)
+                batch.append(storage._row_for_case(case_id, case))
+                if len(batch) >= MIGRATION_BATCH_SIZE:
+                    storage.connection.executemany(_INSERT_CASE, batch)
+                    count += len(batch)
+                    batch = []
+            storage.connection.executemany(_INSERT_CASE, batch)
+            count += len(batch)
+            # Feldkatalog wird beim nächsten metadata()-Aufruf neu gezählt
+            storage.connection.execute("DELETE FROM meta WHERE key = 'fields'")
+            # Neue Store-Version: geöffnete Instanzen erkennen den ersetzten Inhalt (fingerprint)
+            version = int(storage._meta_value('version') or 0) + 1
+            storage.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(version),))
+    finally:
+        storage.close()
+
+    print(f"🗄️ [SQLITE] {count} Cases von {source_file} nach {sqlite_file} migriert")
+    return count
+
+def main():
+    """Migration per Kommandozeile: python -m utils.afm_sqlite <cases.json> <cases.sqlite>"""
+    if len(sys.argv) != 3:
+        print("Verwendung: python -m utils.afm_sqlite <cases.json> <cases.sqlite>")
+        return 1
+    migrate_to_sqlite(sys.argv[1], sys.argv[2])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+AFMTool1 - Streaming-Zugriff auf große JSON-Datenbanken
+Liest Arrays (z.B. `afm_strings` oder `cases`) elementweise aus der Datei,
+sodass der Speicherbedarf von der Elementgröße statt der Dateigröße abhängt.
+"""
+import json
+import re
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+_FORMAT_PATTERN = re.compile(r'"format"\s*:\s*"([^"]*)"')
+
+def _read_until(f, buffer, pos, token, chunk_size):
+    """Liest nach, bis `token` ab `pos` im Puffer steht - liefert (Puffer, Index)"""
+    while True:
+        index = buffer.find(token, pos)
+        if index != -1:
+            return buffer, index
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return buffer, -1
+        # Überlappung behalten, falls der Token über die Chunk-Grenze reicht
+        keep = max(pos, len(buffer) - len(token))
+        buffer = buffer[keep:] + chunk
+        pos = 0
+
+def iter_json_array(path, key, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Liefert die Elemente des Arrays `key` im Top-Level Objekt einer JSON-Datei
+
+    Args:
+        path: JSON-Datei
+        key (str): Name des Arrays (z.B. "afm_strings")
+        chunk_size (int): Lesegröße in Zeichen
+
+    Yields:
+        Element für Element (bereits mit json dekodiert)
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, index = _read_until(f, '', 0, f'"{key}"', chunk_size)
+        if index == -1:
+            return
+        buffer, index = _read_until(f, buffer, index + len(key) + 2, '[', chunk_size)
+        if index == -1:
+            return
+        pos = index + 1
+
+        while True:
+            # Trennzeichen überspringen
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer):
+                    break
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                buffer, pos = chunk, 0
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+
+            # Zahl am Pufferende könnte abgeschnitten sein
+            if end == len(buffer) and isinstance(element, (int, float)) and not isinstance(element, bool):
+                chunk = f.read(chunk_size)
+                if chunk:
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+
+            # Verbrauchten Pufferanfang nur gelegentlich abschneiden
+            if end > chunk_size:
+                buffer, end = buffer[end:], 0
+            pos = end
+            yield element
+
+def read_json_format(path, peek_size=4096):
+    """
+    Liest das `format`-Feld aus dem Dateianfang ohne die Datei zu parsen
+
+    Returns:
+        str or None: z.B. "afm_pure_v1.0", None bei Legacy-Datenbanken
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            match = _FORMAT_PATTERN.search(f.read(peek_size))
+    except (OSError, UnicodeDecodeError):
+        return None
+    return match.group(1) if match else None
+
+def iter_database_cases(database_path):
+    """
+    Cases einer Datenbank nacheinander liefern - Pure AFM (inkl. Journal) oder Legacy
+
+    Args:
+        database_path: Pfad zur cases.json
+
+    Yields:
+        AFMCase: dekodierte, kompakte Cases
+    """
+    if read_json_format(database_path) == "afm_pure_v1.0":
+        from .afm_journal import AFMJournalStorage
+        yield from AFMJournalStorage(database_path).iter_cases()
+        return
+
+    from .afm_case import AFMCase
+
+    for case in iter_json_array(database_path, "cases"):
+        if isinstance(case, dict):
+            yield AFMCase(case)
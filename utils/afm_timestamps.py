@@ -0,0 +1,130 @@
+"""
+AFMTool1 - Strukturierte Zeitstempel
+Zeitstempel werden als "typ:ISO[:UUID]" gespeichert. Statt sie bei jedem
+Zugriff erneut zu zerlegen, werden sie einmal in typisierte Tupel (Art,
+datetime, UUID) geparst. Pro Case entsteht daraus eine ParsedTimestamps-
+Struktur mit bereits ermitteltem Status und erfassung-Eintrag.
+"""
+import sys
+import uuid
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+class TimestampType(Enum):
+    """Arten von Workflow-Zeitstempeln"""
+    ERFASSUNG = "erfassung"
+    VERARBEITUNG = "verarbeitung"
+    VALIDIERUNG = "validierung"
+    ARCHIVIERUNG = "archivierung"
+
+# Höchster erreichter Workflow-Schritt bestimmt den Status
+STATUS_PRECEDENCE = (TimestampType.ARCHIVIERUNG, TimestampType.VALIDIERUNG, TimestampType.VERARBEITUNG)
+
+_TYPES = {member.value: member for member in TimestampType}
+_STATUS_RANK = {art: len(STATUS_PRECEDENCE) - i for i, art in enumerate(STATUS_PRECEDENCE)}
+_STATUS_BY_RANK = {0: TimestampType.ERFASSUNG.value, **{rank: art.value for art, rank in _STATUS_RANK.items()}}
+
+class Timestamp(NamedTuple):
+    """Ein geparster Zeitstempel"""
+    raw: str
+    typ: str
+    art: Optional[TimestampType]
+    zeit: str
+    datum: Optional[datetime]
+    uuid: Optional[uuid.UUID]
+
+    @property
+    def wert(self):
+        """Alles nach dem Typ-Präfix (Zeit und ggf. UUID)"""
+        return self.raw.partition(":")[2]
+
+class ParsedTimestamps(NamedTuple):
+    """Alle Zeitstempel eines Cases mit vorab ermittelten Kennzahlen"""
+    entries: tuple
+    status: str
+    erfassung: Optional[Timestamp]
+
+    @property
+    def sort_key(self):
+        """Sortierschlüssel nach erfassung-Zeitpunkt (Cases ohne Datum zuerst)"""
+        erfassung = self.erfassung
+        return erfassung.datum if erfassung is not None and erfassung.datum else datetime.min
+
+def _parse_datetime(value):
+    """ISO-Zeit zu datetime - None bei ungültigen Werten"""
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return None
+
+def _parse_uuid(value):
+    """UUID-Objekt oder None"""
+    try:
+        return uuid.UUID(value) if value else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+@lru_cache(maxsize=1 << 16)
+def parse_timestamp(timestamp):
+    """
+    Zerlegt "typ:ZEIT[:UUID]" einmalig in einen Timestamp
+
+    Gleiche Strings (z.B. vereinfachte Zeitstempel) teilen sich das Ergebnis.
+
+    Args:
+        timestamp (str): z.B. "erfassung:2025-07-24T16:27:16.960695:UUID"
+
+    Returns:
+        Timestamp: typ "" wenn der String kein Präfix hat
+    """
+    typ, separator, rest = timestamp.partition(":")
+    if not separator:
+        return Timestamp(timestamp, "", None, timestamp, _parse_datetime(timestamp), None)
+
+    zeit, uuid_part = rest, ""
+    if rest.count(":") >= 3:
+        zeit, _, uuid_part = rest.rpartition(":")
+    return Timestamp(
+        timestamp, sys.intern(typ), _TYPES.get(typ), zeit, _parse_datetime(zeit), _parse_uuid(uuid_part)
+    )
+
+def parse_case_timestamps(zeitstempel):
+    """
+    Zeitstempel-Liste eines Cases parsen und Status/erfassung ermitteln
+
+    Args:
+        zeitstempel (list): Zeitstempel-Strings
+
+    Returns:
+        ParsedTimestamps: Einträge, Status ("neu" ohne Zeitstempel) und erster erfassung-Eintrag
+    """
+    entries = tuple([parse_timestamp(ts) for ts in zeitstempel if isinstance(ts, str)] if zeitstempel else ())
+    if not entries:
+        return ParsedTimestamps(entries, "neu", None)
+
+    rank = 0
+    erfassung = None
+    for entry in entries:
+        entry_rank = _STATUS_RANK.get(entry.art, 0)
+        if entry_rank > rank:
+            rank = entry_rank
+        elif entry.art is TimestampType.ERFASSUNG and erfassung is None:
+            erfassung = entry
+    return ParsedTimestamps(entries, _STATUS_BY_RANK[rank], erfassung)
+
+def case_timestamps(case):
+    """
+    Geparste Zeitstempel eines Cases - bei AFMCase je Revision zwischengespeichert
+
+    Args:
+        case (dict): Case-Daten
+
+    Returns:
+        ParsedTimestamps
+    """
+    cached = getattr(case, "timestamps", None)
+    if cached is not None:
+        return cached()
+    return parse_case_timestamps(case.get("zeitstempel"))
@@ -7,6 +7,11 @@ import json
 import datetime
 from pathlib import Path
 
+from .afm_case import AFMCase
+from .afm_timestamps import case_timestamps
+from .atomic_write import atomic_write_json
+from . import json_codec
+
 def generate_afm_string_for_case(case_data, exclude_fields=None):
     """
     Generiert AFM String für einen Case mit ALLEN befüllten Spalten
@@ -29,7 +34,7 @@ def generate_afm_string_for_case(case_data, exclude_fields=None):
             afm_data[key] = value
     
     # Als JSON-String kodieren
-    return json.dumps(afm_data, ensure_ascii=False, sort_keys=True)
+    return json_codec.canonical_dumps(afm_data)
 
 def add_timestamp_to_case(case_data, timestamp_type="erfassung"):
     """
@@ -63,26 +68,34 @@ def get_timestamps_from_case(case_data):
     Returns:
         list: Liste von Zeitstempel-Dictionaries mit Typ und Zeit
     """
-    if "zeitstempel" not in case_data:
-        return []
-    
     timestamps = []
-    for timestamp_entry in case_data["zeitstempel"]:
-        if ":" in timestamp_entry:
-            timestamp_type, timestamp_value = timestamp_entry.split(":", 1)
+    for entry in case_timestamps(case_data).entries:
+        if ":" in entry.raw:
             timestamps.append({
-                "type": timestamp_type,
-                "timestamp": timestamp_value
+                "type": entry.typ,
+                "timestamp": entry.wert
             })
         else:
             # Fallback für einfache Zeitstempel
             timestamps.append({
                 "type": "unknown",
-                "timestamp": timestamp_entry
+                "timestamp": entry.raw
             })
     
     return timestamps
 
+def get_case_status(case_data):
+    """
+    Ermittelt den Workflow-Status eines Cases anhand der Zeitstempel
+    
+    Args:
+        case_data (dict): Case-Daten
+        
+    Returns:
+        str: neu, erfassung, verarbeitung, validierung oder archivierung
+    """
+    return case_timestamps(case_data).status
+
 def update_case_afm_string(case_data):
     """
     Aktualisiert den AFM String für einen Case mit ALLEN befüllten Spalten
@@ -98,16 +111,51 @@ def update_case_afm_string(case_data):
     
     # AFM String hinzufügen/aktualisieren
     case_data['afm_string'] = afm_string
+    if isinstance(case_data, AFMCase):
+        case_data.set_derived('afm_string', afm_string)
     
     return case_data
 
-def update_all_afm_strings_in_database(database_path="data/cases.json"):
+def needs_afm_string(case_data):
+    """
+    Prüft ob der AFM String eines Cases (neu) erzeugt werden muss
+    
+    Args:
+        case_data (dict): Case-Daten
+        
+    Returns:
+        bool: True wenn der AFM String fehlt oder der Case seit der Erzeugung geändert wurde
+    """
+    if not case_data.get('afm_string'):
+        return True
+    return isinstance(case_data, AFMCase) and case_data.is_dirty('afm_string')
+
+def track_case(case_data):
+    """
+    Wandelt einen gespeicherten Case in einen AFMCase mit Änderungsverfolgung um
+    Ein vorhandener AFM String gilt als aktuell, bis der Case geändert wird.
+    
+    Args:
+        case_data (dict): Case-Daten
+        
+    Returns:
+        AFMCase: verfolgter Case (bestehende AFMCase-Instanzen unverändert)
+    """
+    if isinstance(case_data, AFMCase):
+        return case_data
+    derived = {'afm_string': case_data['afm_string']} if case_data.get('afm_string') else {}
+    return AFMCase.from_storage(case_data, **derived)
+
+def update_all_afm_strings_in_database(database_path="data/cases.json", force=False):
     """
     Aktualisiert AFM Strings für ALLE Cases in der Datenbank
     Vollständig modular - erkennt automatisch alle Spalten
+    Inkrementell: nur Cases ohne AFM String werden neu serialisiert, da alle
+    Schreibpfade den AFM String bei Änderungen sofort regenerieren.
     
     Args:
         database_path (str): Pfad zur Datenbank
+        force (bool): alle AFM Strings neu erzeugen (z.B. nach manueller Bearbeitung der Datei)
         
     Returns:
         tuple: (success: bool, updated_count: int, message: str)
@@ -115,7 +163,7 @@ def update_all_afm_strings_in_database(database_path="data/cases.json"):
     try:
         # Datenbank laden
         with open(database_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            data = json_codec.load(f)
         
         cases = data.get('cases', [])
         if not cases:
@@ -123,10 +171,9 @@ def update_all_afm_strings_in_database(database_path="data/cases.json"):
         
         updated_count = 0
         
-        # Jeden Case aktualisieren
+        # Nur geänderte bzw. unvollständige Cases aktualisieren
         for i, case in enumerate(cases):
-            if isinstance(case, dict):
-                # Alle befüllten Spalten für AFM String sammeln
+            if isinstance(case, dict) and (force or needs_afm_string(case)):
                 original_afm = case.get('afm_string', '')
                 updated_case = update_case_afm_string(case)
                 
@@ -136,15 +183,93 @@ def update_all_afm_strings_in_database(database_path="data/cases.json"):
                 
                 cases[i] = updated_case
         
-        # Datenbank speichern
-        with open(database_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Datenbank nur bei Änderungen speichern
+        if updated_count:
+            atomic_write_json(database_path, data, indent=2)
         
         return True, updated_count, f"AFM Strings für {updated_count} Cases aktualisiert"
         
     except Exception as e:
         return False, 0, f"Fehler: {str(e)}"
 
+def _validate_case_afm(i, case):
+    """Validierungsergebnis für einen einzelnen Case"""
+    result = {
+        "case_index": i,
+        "quelle": case.get('quelle', 'Unbekannt'),
+        "has_afm_string": 'afm_string' in case,
+        "afm_valid": False,
+        "missing_fields": [],
+        "afm_fields": [],
+        "all_fields": list(case.keys())
+    }
+    
+    # AFM String analysieren
+    afm_string = case.get('afm_string', '')
+    if afm_string:
+        try:
+            afm_data = json_codec.loads(afm_string)
+            result["afm_fields"] = list(afm_data.keys())
+            
+            # Nur befüllte Felder prüfen (außer afm_string selbst)
+            filled_case_fields = {k for k, v in case.items()
+                                if k != 'afm_string' and v is not None and v != ""}
+            
+            missing = filled_case_fields - set(afm_data.keys())
+            result["missing_fields"] = list(missing)
+            result["afm_valid"] = len(missing) == 0
+            
+        except json.JSONDecodeError:
+            result["afm_valid"] = False
+            result["missing_fields"] = ["INVALID_JSON"]
+    
+    return result
+
+def _validate_pure_afm(i, storage, afm_string):
+    """Validierungsergebnis für einen Pure AFM-String (der String ist der Case)"""
+    case = storage.parse_afm_string_to_case(afm_string)
+    if not isinstance(case, dict):
+        return {
+            "case_index": i,
+            "quelle": 'Unbekannt',
+            "has_afm_string": True,
+            "afm_valid": False,
+            "missing_fields": ["INVALID_JSON"],
+            "afm_fields": [],
+            "all_fields": []
+        }
+    
+    fields = list(case.keys())
+    return {
+        "case_index": i,
+        "quelle": case.get('quelle', 'Unbekannt'),
+        "has_afm_string": True,
+        "afm_valid": True,
+        "missing_fields": [],
+        "afm_fields": fields,
+        "all_fields": fields
+    }
+
+def iter_validate_afm_strings(database_path="data/cases.json"):
+    """
+    Validiert die AFM Strings der Datenbank Case für Case (gestreamt)
+    
+    Yields:
+        dict: Validierungsergebnis je Case
+    """
+    from .afm_stream import iter_json_array, read_json_format
+    
+    if read_json_format(database_path) == "afm_pure_v1.0":
+        from .afm_journal import AFMJournalStorage
+        storage = AFMJournalStorage(database_path)
+        for i, afm_string in enumerate(storage.iter_afm_strings()):
+            yield _validate_pure_afm(i, storage, afm_string)
+        return
+    
+    for i, case in enumerate(iter_json_array(database_path, 'cases')):
+        if isinstance(case, dict):
+            yield _validate_case_afm(i, case)
+
 def validate_afm_strings(database_path="data/cases.json"):
     """
     Validiert alle AFM Strings in der Datenbank
@@ -154,51 +279,7 @@ def validate_afm_strings(database_path="data/cases.json"):
         list: Liste mit Validierungsergebnissen
     """
     try:
-        with open(database_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        cases = data.get('cases', [])
-        validation_results = []
-        
-        for i, case in enumerate(cases):
-            if isinstance(case, dict):
-                result = {
-                    "case_index": i,
-                    "quelle": case.get('quelle', 'Unbekannt'),
-                    "has_afm_string": 'afm_string' in case,
-                    "afm_valid": False,
-                    "missing_fields": [],
-                    "afm_fields": [],
-                    "all_fields": list(case.keys())
-                }
-                
-                # AFM String analysieren
-                afm_string = case.get('afm_string', '')
-                if afm_string:
-                    try:
-                        afm_data = json.loads(afm_string)
-                        result["afm_fields"] = list(afm_data.keys())
-                        
-                        # Prüfen welche Felder fehlen (außer afm_string selbst)
-                        case_fields = set(case.keys()) - {'afm_string'}
-                        afm_fields = set(afm_data.keys())
-                        
-                        # Nur befüllte Felder prüfen
-                        filled_case_fields = {k for k, v in case.items() 
-                                            if k != 'afm_string' and v is not None and v != ""}
-                        
-                        missing = filled_case_fields - afm_fields
-                        result["missing_fields"] = list(missing)
-                        result["afm_valid"] = len(missing) == 0
-                        
-                    except json.JSONDecodeError:
-                        result["afm_valid"] = False
-                        result["missing_fields"] = ["INVALID_JSON"]
-                
-                validation_results.append(result)
-        
-        return validation_results
-        
+        return list(iter_validate_afm_strings(database_path))
     except Exception as e:
         return [{"error": str(e)}]
 
@@ -217,7 +298,7 @@ def add_new_case_with_afm(case_data, database_path="data/cases.json"):
     try:
         # Datenbank laden
         with open(database_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            data = json_codec.load(f)
         
         # AFM String generieren
         case_with_afm = update_case_afm_string(case_data.copy())
@@ -226,8 +307,7 @@ def add_new_case_with_afm(case_data, database_path="data/cases.json"):
         data["cases"].append(case_with_afm)
         
         # Speichern
-        with open(database_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        atomic_write_json(database_path, data, indent=2)
         
         return True, case_with_afm, "Case erfolgreich hinzugefügt"
         
@@ -0,0 +1,204 @@
+"""
+AFMTool1 - Absturzsichere Dateischreibvorgänge
+Dateien werden in eine temporäre Datei im selben Verzeichnis geschrieben,
+synchronisiert und per os.replace atomar über die alte Datei gelegt. Ein
+Absturz hinterlässt so entweder den alten oder den neuen Stand, nie eine
+abgeschnittene Datei.
+
+Durability (AFM_DURABILITY):
+    always  : fsync von Datei und Verzeichnis bei jedem Schreibvorgang
+    batched : fsync gesammelt alle DURABILITY_BATCH_SIZE Schreibvorgänge
+              bzw. nach DURABILITY_BATCH_SECONDS oder per sync_pending()
+    never   : kein fsync (nur atomares Ersetzen, Betriebssystem entscheidet)
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import json_codec
+
+DURABILITY_LEVELS = ("always", "batched", "never")
+DURABILITY = os.environ.get("AFM_DURABILITY", "always")
+DURABILITY_BATCH_SIZE = 32
+DURABILITY_BATCH_SECONDS = 1.0
+
+# Geschriebene, noch nicht synchronisierte Pfade (Modus "batched")
+_unsynced = set()
+_last_sync = time.monotonic()
+
+def _resolve(durability):
+    """Durability-Stufe prüfen (Standard: DURABILITY)"""
+    durability = durability or DURABILITY
+    if durability not in DURABILITY_LEVELS:
+        raise ValueError(f"Unbekannte Durability '{durability}' - erlaubt: {', '.join(DURABILITY_LEVELS)}")
+    return durability
+
+def _fsync_path(path):
+    """fsync einer Datei oder eines Verzeichnisses per Pfad (fehlende Pfade werden übersprungen)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # Verzeichnis-fsync wird nicht von jedem Dateisystem unterstützt
+        pass
+    finally:
+        os.close(fd)
+
+def sync_pending():
+    """
+    Alle im Modus "batched" geschriebenen Dateien und ihre Verzeichnisse synchronisieren
+
+    Returns:
+        int: Anzahl synchronisierter Dateien
+    """
+    global _last_sync
+    paths = list(_unsynced)
+    _unsynced.clear()
+    for path in paths:
+        _fsync_path(path)
+    for directory in {os.path.dirname(path) or "." for path in paths}:
+        _fsync_path(directory)
+    _last_sync = time.monotonic()
+    return len(paths)
+
+def _after_write(path, durability):
+    """Nach dem Ersetzen: Verzeichnis synchronisieren oder Pfad für den Batch vormerken"""
+    if durability == "always":
+        _fsync_path(os.path.dirname(path) or ".")
+    elif durability == "batched":
+        _unsynced.add(path)
+        if len(_unsynced) >= DURABILITY_BATCH_SIZE or time.monotonic() - _last_sync >= DURABILITY_BATCH_SECONDS:
+            sync_pending()
+
+def sync_file(f, durability=None):
+    """
+    Geöffnete Datei gemäß Durability synchronisieren (z.B. nach einem Journal-Append)
+
+    Args:
+        f: offenes Dateiobjekt
+        durability (str): "always", "batched" oder "never" (Standard: DURABILITY)
+    """
+    durability = _resolve(durability)
+    f.flush()
+    if durability == "always":
+        os.fsync(f.fileno())
+    elif durability == "batched":
+        _after_write(os.fspath(f.name), durability)
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8', durability=None):
+    """
+    Datei atomar ersetzen: Temp-Datei schreiben, synchronisieren, umbenennen
+
+    Bei einer Exception bleibt die bisherige Datei unverändert.
+
+    Args:
+        path: Zieldatei
+        mode (str): 'w' (Text) oder 'wb' (Binär)
+        encoding (str): Text-Kodierung (nur Textmodus)
+        durability (str): "always", "batched" oder "never" (Standard: DURABILITY)
+
+    Yields:
+        Dateiobjekt der temporären Datei
+    """
+    durability = _resolve(durability)
+    path = os.fspath(path)
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            f.flush()
+            if durability == "always":
+                os.fsync(f.fileno())
+        # Rechte der bisherigen Datei übernehmen (mkstemp legt 0600 an)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except OSError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _after_write(path, durability)
+
+def atomic_write_json(path, data, durability=None, indent=None, sort_keys=False):
+    """
+    JSON-Daten atomar schreiben (UTF-8, Unicode unverändert - über json_codec)
+
+    Args:
+        path: Zieldatei
+        data: JSON-serialisierbare Daten
+        durability (str): "always", "batched" oder "never" (Standard: DURABILITY)
+        indent (int): Einrückung (None = einzeilig)
+        sort_keys (bool): Schlüssel sortieren
+    """
+    payload = json_codec.dumps_bytes(data, sort_keys=sort_keys, indent=indent)
+    with atomic_write(path, 'wb', durability=durability) as f:
+        f.write(payload)
+
+def _benchmark_case(nr):
+    """Repräsentativer Case für den Schreib-Benchmark"""
+    return {
+        "fallnummer": f"HR-2025-{nr:05d}",
+        "quelle": f"Handelsregister Wien {nr}",
+        "fundstellen": f"HRB {nr}, Seite 1",
+        "afm_string": "",
+        "zeitstempel": [f"erfassung:2025-07-24T{nr % 24:02d}", f"verarbeitung:2025-07-25T{nr % 24:02d}"]
+    }
+
+def benchmark(case_count=1000, rounds=20, directory=None):
+    """
+    Vergleicht direktes Überschreiben mit atomaren Schreibvorgängen je Durability
+
+    Args:
+        case_count (int): Cases pro Datenbank
+        rounds (int): Schreibvorgänge pro Variante
+        directory: Zielverzeichnis (Standard: temporäres Verzeichnis)
+
+    Returns:
+        dict: Variante → mittlere Dauer pro Schreibvorgang in Millisekunden
+    """
+    data = {"cases": [_benchmark_case(i) for i in range(case_count)]}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        target = Path(tmp_dir) / "cases.json"
+
+        def direct():
+            with open(target, 'wb') as f:
+                f.write(json_codec.dumps_bytes(data, indent=2))
+
+        variants = {"direct": direct}
+        for level in DURABILITY_LEVELS:
+            variants[f"atomic/{level}"] = (
+                lambda level=level: atomic_write_json(target, data, durability=level, indent=2)
+            )
+
+        results = {}
+        for name, write in variants.items():
+            start = time.perf_counter()
+            for _ in range(rounds):
+                write()
+            sync_pending()
+            results[name] = (time.perf_counter() - start) * 1000 / rounds
+    return results
+
+def main():
+    """Benchmark per Kommandozeile: python -m utils.atomic_write [cases] [runden]"""
+    case_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"⏱️ [WRITE] {case_count} Cases, {rounds} Schreibvorgänge je Variante")
+    for name, millis in benchmark(case_count, rounds).items():
+        print(f"   {name:<16} {millis:8.2f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
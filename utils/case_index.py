@@ -0,0 +1,126 @@
+"""
+AFMTool1 - Stabiler Case-Primärindex
+Cases werden über eine UUID adressiert (explizites `uuid`-Feld oder die UUID
+im erfassung-Zeitstempel) statt über ihre Position in der Case-Liste.
+Der Index wird neben der Pure AFM Datei gespeichert (cases.index.json).
+"""
+import uuid
+from typing import NamedTuple, Optional
+
+from .atomic_write import atomic_write_json
+from . import json_codec
+
+INDEX_FORMAT = "afm_index_v1"
+
+class IndexData(NamedTuple):
+    """Gespeicherter Primärindex - Listen je Snapshot-Slot"""
+    ids: Optional[list]
+    statuses: Optional[list]
+    fallnummern: Optional[list]
+    unmigrated: list
+
+MISSING_INDEX = IndexData(None, None, None, [])
+
+def _parse_uuid(value):
+    """Gültige UUID als String oder None"""
+    try:
+        return str(uuid.UUID(value))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def get_case_id(case):
+    """
+    Ermittelt die stabile Case-ID
+
+    Args:
+        case (dict): Case-Daten
+
+    Returns:
+        str or None: explizite `uuid` oder UUID aus "erfassung:TIMESTAMP:UUID"
+    """
+    explicit = case.get("uuid")
+    if explicit:
+        return str(explicit)
+
+    for ts in case.get("zeitstempel", []):
+        if ts.startswith("erfassung:") and ts.count(":") >= 2:
+            return _parse_uuid(ts.rsplit(":", 1)[1])
+    return None
+
+def ensure_case_id(case, taken=()):
+    """
+    Stellt sicher, dass der Case ein explizites `uuid`-Feld hat
+    Die erfassung-UUID wird übernommen, da Pure AFM Zeitstempel vereinfacht speichert.
+
+    Args:
+        case (dict): Case-Daten (wird modifiziert)
+        taken: bereits vergebene IDs - Duplikate erhalten eine neue UUID
+
+    Returns:
+        str: Case-ID
+    """
+    case_id = get_case_id(case)
+    if not case_id or case_id in taken:
+        case_id = str(uuid.uuid4())
+    case["uuid"] = case_id
+    return case_id
+
+class AFMCaseIndex:
+    """Persistenter Primärindex: Case-ID → Slot im Pure AFM Snapshot"""
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+
+    def read(self, snapshot_fingerprint):
+        """
+        Lädt Case-IDs sowie materialisierten Status und Fallnummer je Snapshot-Slot
+
+        Returns:
+            IndexData: ids None wenn Index fehlt/veraltet, statuses/fallnummern None wenn
+                       nicht gespeichert, unmigrated: IDs, deren Slot die UUID noch nicht enthält
+        """
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json_codec.load(f)
+        except (OSError, ValueError):
+            return MISSING_INDEX
+
+        if data.get("format") != INDEX_FORMAT:
+            return MISSING_INDEX
+        if data.get("snapshot") != list(snapshot_fingerprint or []):
+            return MISSING_INDEX
+        ids = data.get("ids")
+        if ids is None:
+            return MISSING_INDEX
+        statuses, fallnummern = data.get("status"), data.get("fallnummer")
+        if statuses is not None and len(statuses) != len(ids):
+            statuses = None
+        if fallnummern is not None and len(fallnummern) != len(ids):
+            fallnummern = None
+        return IndexData(ids, statuses, fallnummern, data.get("unmigrated", []))
+
+    def load(self, snapshot_fingerprint):
+        """
+        Lädt die Slot-Reihenfolge der Case-IDs
+
+        Returns:
+            list or None: IDs je Snapshot-Slot, None wenn Index fehlt oder veraltet ist
+        """
+        return self.read(snapshot_fingerprint).ids
+
+    def save(self, ids, snapshot_fingerprint, statuses=None, fallnummern=None, unmigrated=None):
+        """Speichert die Slot-Reihenfolge (und optional Status und Fallnummer je Slot) passend zum Snapshot
+        Ohne fsync: der Index ist über den Snapshot-Fingerprint validiert und jederzeit neu aufbaubar.
+        unmigrated: IDs, deren Slot im Snapshot die UUID noch nicht enthält (Migration beim Schreiben)."""
+        data = {
+            "format": INDEX_FORMAT,
+            "snapshot": list(snapshot_fingerprint or []),
+            "ids": ids
+        }
+        if statuses is not None:
+            data["status"] = statuses
+        if fallnummern is not None:
+            data["fallnummer"] = fallnummern
+        if unmigrated:
+            data["unmigrated"] = unmigrated
+        atomic_write_json(self.index_file, data, durability="never")
@@ -0,0 +1,66 @@
+"""
+AFMTool1 - Metadaten-Sidecar des AFM Storage
+Case-Anzahl, Status-Zähler, Feldkatalog, Store-Version, Änderungszeit und
+der zuletzt gespeicherte AFM-String liegen in einer kleinen Datei neben dem
+Storage (cases.meta.json). Jeder Schreibvorgang führt sie unter der
+exklusiven Sperre nach; gültig ist sie nur zum gespeicherten Fingerprint.
+Übersichten und Start brauchen so weder JSON-Parsing noch Dekodierung.
+"""
+from .atomic_write import atomic_write_json
+from . import json_codec
+
+META_FORMAT = "afm_meta_v1"
+
+def _fingerprint_key(fingerprint):
+    """Fingerprint in JSON-Form (Tupel → Listen) für den Vergleich mit der Datei"""
+    return [list(part) if isinstance(part, tuple) else part for part in fingerprint]
+
+def count_fields(cases):
+    """
+    Feldkatalog: Feldname → Anzahl Cases mit diesem Feld
+
+    Args:
+        cases: dekodierte Cases (ungültige Einträge werden übersprungen)
+
+    Returns:
+        dict
+    """
+    fields = {}
+    for case in cases:
+        if isinstance(case, dict):
+            for field in case:
+                fields[field] = fields.get(field, 0) + 1
+    return fields
+
+class AFMCaseMetadata:
+    """Metadaten-Sidecar - gültig nur zum gespeicherten Storage-Fingerprint"""
+
+    def __init__(self, meta_file):
+        self.meta_file = meta_file
+
+    def read(self, fingerprint):
+        """
+        Metadaten lesen
+
+        Args:
+            fingerprint: aktueller Storage-Fingerprint
+
+        Returns:
+            dict or None: None wenn der Sidecar fehlt oder nicht zum Fingerprint passt
+        """
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                data = json_codec.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("format") != META_FORMAT or data.get("fingerprint") != _fingerprint_key(fingerprint):
+            return None
+        return data
+
+    def save(self, fingerprint, metadata):
+        """Metadaten zum Fingerprint speichern
+        Ohne fsync: der Sidecar ist über den Fingerprint validiert und jederzeit neu aufbaubar."""
+        data = dict(metadata, format=META_FORMAT, fingerprint=_fingerprint_key(fingerprint))
+        atomic_write_json(self.meta_file, data, durability="never")
+        return data
@@ -1,23 +1,101 @@
 """
 Database-Funktionen für AFMTool1
 """
-import json
 import os
+from contextlib import contextmanager
 from .afm_utils import update_case_afm_string
+from .afm_stream import iter_database_cases, read_json_format
+from .afm_journal import AFMJournalStorage
+from .afm_pure import ERFASSUNG_KEY_LENGTH, ERFASSUNG_PREFIX, erfassung_bounds
+from .afm_timestamps import case_timestamps
+from .afm_sqlite import AFMSQLiteStorage, is_sqlite_path
+from .atomic_write import atomic_write_json
+from . import json_codec
 
 DATABASE_PATH = "data/cases.json"
 
+@contextmanager
+def _sqlite_database(database_path=None):
+    """SQLite-Storage, falls die Datenbank eine SQLite-Datei ist (sonst None)"""
+    database_path = database_path or DATABASE_PATH
+    if not is_sqlite_path(database_path):
+        yield None
+        return
+    
+    storage = AFMSQLiteStorage(database_path)
+    try:
+        yield storage
+    finally:
+        storage.close()
+
+@contextmanager
+def _metadata_storage(database_path=None):
+    """Storage mit Metadaten-API (SQLite oder Pure AFM) - None bei Legacy-Datenbanken"""
+    database_path = database_path or DATABASE_PATH
+    with _sqlite_database(database_path) as storage:
+        if storage is not None:
+            yield storage
+            return
+    
+    if read_json_format(database_path) == "afm_pure_v1.0":
+        yield AFMJournalStorage(database_path)
+    else:
+        yield None
+
+def get_database_metadata(database_path=None):
+    """
+    Metadaten der Datenbank ohne sie zu parsen
+    
+    Args:
+        database_path (str): Pfad zur Datenbank (Standard: DATABASE_PATH)
+    
+    Returns:
+        dict or None: case_count, status_counts, fields, version, modified, latest_afm -
+                      None bei Legacy-Datenbanken
+    """
+    with _metadata_storage(database_path) as storage:
+        return storage.metadata() if storage is not None else None
+
 def load_database():
     """JSON-Datenbank laden"""
+    with _sqlite_database() as storage:
+        if storage is not None:
+            return {"cases": storage.load_pure_afm_data()}
+    
     if os.path.exists(DATABASE_PATH):
         with open(DATABASE_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            return json_codec.load(f)
     return {"cases": []}
 
+def _iter_sqlite_cases(database_path):
+    """Cases aus der SQLite-Datenbank - Verbindung wird nach dem Durchlauf (oder Abbruch) geschlossen"""
+    with _sqlite_database(database_path) as storage:
+        yield from storage.iter_cases()
+
+def iter_cases(database_path=DATABASE_PATH):
+    """
+    Cases nacheinander liefern, ohne die Datenbank vollständig zu laden
+    
+    Args:
+        database_path (str): Pfad zur Datenbank (Pure AFM oder Legacy)
+    
+    Returns:
+        iterator: dekodierte Cases
+    """
+    if not os.path.exists(database_path):
+        return iter(())
+    if is_sqlite_path(database_path):
+        return _iter_sqlite_cases(database_path)
+    return iter_database_cases(database_path)
+
 def save_database(data):
     """JSON-Datenbank speichern"""
-    with open(DATABASE_PATH, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with _sqlite_database() as storage:
+        if storage is not None:
+            storage.save_pure_afm_data(data.get("cases", []))
+            return
+    
+    atomic_write_json(DATABASE_PATH, data, indent=2)
 
 def add_case_with_fields(case_data):
     """
@@ -29,11 +107,16 @@ def add_case_with_fields(case_data):
     Returns:
         dict: Hinzugefügter Case mit AFM String
     """
-    data = load_database()
-    
     # AFM String automatisch generieren für alle befüllten Spalten
     case_with_afm = update_case_afm_string(case_data.copy())
     
+    # SQLite: einzelne Zeile einfügen statt die Datenbank neu zu schreiben
+    with _sqlite_database() as storage:
+        if storage is not None:
+            storage.append_case(case_with_afm)
+            return case_with_afm
+    
+    data = load_database()
     data["cases"].append(case_with_afm)
     save_database(data)
     return case_with_afm
@@ -48,6 +131,11 @@ def get_last_filled_cases(count=1):
     Returns:
         list: Liste der letzten Cases oder leere Liste
     """
+    # Pure AFM/SQLite: zuletzt erfasste Cases über den erfassung-Index, nur diese werden dekodiert
+    with _metadata_storage() as storage:
+        if storage is not None:
+            return storage.get_newest_cases(count)
+    
     data = load_database()
     cases = data.get('cases', [])
     
@@ -61,13 +149,51 @@ def get_last_filled_cases(count=1):
     else:  # Letzte N Cases
         return cases[-count:] if count <= len(cases) else cases
 
+def _erfassung_key(case):
+    """Vereinfachter erfassung-Zeitstempel eines Cases (wie in erfassung_timestamps)"""
+    erfassung = case_timestamps(case).erfassung
+    return ERFASSUNG_PREFIX + erfassung.zeit[:ERFASSUNG_KEY_LENGTH] if erfassung is not None else ''
+
+def get_cases_by_erfassung(start=None, end=None):
+    """
+    Im Zeitraum erfasste Cases (z.B. heute: start=date.today())
+    
+    Args:
+        start: ab (inklusive) - ISO-String, date oder datetime
+        end: bis (exklusive) - ISO-String, date oder datetime
+    
+    Returns:
+        list: Cases aufsteigend nach erfassung
+    """
+    with _metadata_storage() as storage:
+        if storage is not None:
+            return storage.get_cases_by_erfassung(start, end)
+    
+    low, high = erfassung_bounds(start, end)
+    cases = [case for case in iter_cases() if low <= _erfassung_key(case) < high]
+    return sorted(cases, key=_erfassung_key)
+
 def get_cases_count():
-    """Anzahl der Cases in der Datenbank"""
+    """Anzahl der Cases in der Datenbank (Pure AFM/SQLite: aus den Metadaten)"""
+    with _metadata_storage() as storage:
+        if storage is not None:
+            return storage.get_cases_count()
+    
     data = load_database()
     return len(data.get('cases', []))
 
 def get_latest_case_info():
     """Detaillierte Informationen über den neuesten Case"""
+    with _metadata_storage() as storage:
+        if storage is not None:
+            total_count = storage.get_cases_count()
+            return {
+                "exists": total_count > 0,
+                "total_count": total_count,
+                "latest": storage.get_latest_case(),
+                "latest_index": total_count - 1
+            }
+    
     data = load_database()
     cases = data.get('cases', [])
     
@@ -0,0 +1,131 @@
+"""
+AFMTool1 - Export-Katalog und Manifest der Export-Kette
+export_manifest.json verzeichnet jeden Export beim Schreiben mit Name,
+Zeitstempel, Case-Anzahl, Größe, Prüfsumme, Typ (full/diff) und
+Basis-Export. Neuester Export, Aufbewahrung und Export-Status kommen so
+ohne Verzeichnis-Scan und stat() pro Datei aus.
+export_state.json hält den Inhalts-Hash je Case-ID zum neuesten Export,
+gegen den der nächste Differenz-Export gebildet wird.
+"""
+from datetime import datetime
+
+from .atomic_write import atomic_write_json
+from . import json_codec
+
+MANIFEST_FORMAT = "afm_export_manifest_v1"
+MANIFEST_FILE = "export_manifest.json"
+STATE_FILE = "export_state.json"
+
+class AFMExportManifest:
+    """Export-Katalog: Einträge in Export-Reihenfolge mit Basis-Verweis (Voll-Exports beginnen eine Kette)"""
+
+    def __init__(self, exports_dir):
+        self.manifest_file = exports_dir / MANIFEST_FILE
+        self.state_file = exports_dir / STATE_FILE
+
+    def entries(self):
+        """Alle Einträge in Export-Reihenfolge (fehlendes oder ungültiges Manifest = leer)"""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                data = json_codec.load(f)
+        except (OSError, ValueError):
+            return []
+        return data.get("exports", []) if data.get("format") == MANIFEST_FORMAT else []
+
+    def exists(self):
+        """True wenn der Katalog bereits angelegt ist"""
+        return self.manifest_file.exists()
+
+    def save(self, entries):
+        """Katalog atomar schreiben"""
+        atomic_write_json(self.manifest_file, {"format": MANIFEST_FORMAT, "exports": entries}, indent=2)
+
+    def latest(self):
+        """Neuester Eintrag oder None"""
+        entries = self.entries()
+        return entries[-1] if entries else None
+
+    def add(self, entry):
+        """Eintrag anhängen"""
+        entries = self.entries()
+        entries.append(entry)
+        self.save(entries)
+        return entry
+
+    def retained(self, keep_count, max_age=None, now=None):
+        """
+        Namen der aufzubewahrenden Exports - Basis-Exports behaltener Differenzen bleiben erhalten
+
+        Args:
+            keep_count (int): neueste Exports, die behalten werden (None = alle)
+            max_age (float): Höchstalter in Sekunden (None = unbegrenzt)
+            now (datetime): Bezugszeitpunkt für max_age (Standard: jetzt)
+
+        Returns:
+            set: Dateinamen (der neueste Export bleibt immer erhalten)
+        """
+        entries = self.entries()
+        if not entries:
+            return set()
+        by_name = {entry["name"]: entry for entry in entries}
+        kept = entries if keep_count is None else entries[max(len(entries) - keep_count, 0):]
+        if max_age is not None:
+            now = now or datetime.now()
+            kept = [entry for entry in kept
+                    if (now - datetime.fromisoformat(entry["timestamp"])).total_seconds() <= max_age]
+
+        names = set()
+        for entry in [entries[-1]] + kept:
+            # Kette bis zum Voll-Export mitnehmen
+            while entry is not None and entry["name"] not in names:
+                names.add(entry["name"])
+                entry = by_name.get(entry.get("base"))
+        return names
+
+    def diffs_since_full(self):
+        """Anzahl der Differenz-Exports seit dem letzten Voll-Export"""
+        count = 0
+        for entry in reversed(self.entries()):
+            if entry.get("type") != "diff":
+                break
+            count += 1
+        return count
+
+    def chain(self, name):
+        """
+        Kette vom Voll-Export bis zum gegebenen Export
+
+        Args:
+            name (str): Dateiname des Exports
+
+        Returns:
+            list: Einträge, beginnend mit dem Voll-Export (ValueError bei unterbrochener Kette)
+        """
+        by_name = {entry["name"]: entry for entry in self.entries()}
+        chain = []
+        while name is not None:
+            entry = by_name.get(name)
+            if entry is None:
+                raise ValueError(f"Export '{name}' fehlt im Manifest - Kette unterbrochen")
+            chain.append(entry)
+            name = entry.get("base")
+        chain.reverse()
+        return chain
+
+    def read_state(self, name):
+        """
+        Inhalts-Hashes zum Export lesen
+
+        Returns:
+            dict or None: Case-ID → Inhalts-Hash, None wenn der Stand nicht zu diesem Export gehört
+        """
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json_codec.load(f)
+        except (OSError, ValueError):
+            return None
+        return data.get("hashes") if data.get("export") == name else None
+
+    def save_state(self, name, hashes):
+        """Inhalts-Hashes des neuesten Exports speichern"""
+        atomic_write_json(self.state_file, {"export": name, "hashes": hashes})
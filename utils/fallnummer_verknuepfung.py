@@ -3,16 +3,20 @@ AFMTool1 - Fallnummer-Gruppierung für GUI/Web-Interface
 Mit 5-stelligen Hash-UUIDs als Fallback für leere Fallnummern
 """
 import hashlib
+import sys
+from pathlib import Path
+
+# Auch direkt als Skript ausführbar (python utils/fallnummer_verknuepfung.py)
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.afm_timestamps import case_timestamps
 
 def generate_hash_uuid(case):
     """5-stelligen Hash aus erfassung-Zeitstempel generieren"""
-    for ts in case.get("zeitstempel", []):
-        if ts.startswith("erfassung:"):
-            timestamp_part = ts.replace("erfassung:", "")
-            hash_obj = hashlib.md5(timestamp_part.encode('utf-8'))
-            short_hash = hash_obj.hexdigest()[:5].upper()
-            return short_hash
-    return "ERROR"
+    erfassung = case_timestamps(case).erfassung
+    if erfassung is None:
+        return "ERROR"
+    hash_obj = hashlib.md5(erfassung.wert.encode('utf-8'))
+    return hash_obj.hexdigest()[:5].upper()
 
 def ensure_fallnummer(case):
     """
@@ -83,14 +87,13 @@ def get_case_summary(cases):
 
 if __name__ == "__main__":
     # Test mit leeren Fallnummern
-    import json
-    from pathlib import Path
+    from utils import json_codec
     
     # Cases aus JSON laden
     json_path = Path(__file__).parent.parent / "data" / "cases.json"
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            data = json_codec.load(f)
             cases = data.get('cases', [])
         print(f"✅ {len(cases)} Cases aus cases.json geladen")
     except Exception as e:
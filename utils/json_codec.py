@@ -0,0 +1,224 @@
+"""
+AFMTool1 - JSON-Codec
+Gemeinsame JSON-Schicht für utils/, Services und Reports. Ist orjson
+installiert, wird es verwendet, sonst die Standardbibliothek. Die Ausgabe
+ist bytegleich zu json.dumps(..., ensure_ascii=False) - kanonische
+AFM-Strings (sort_keys=True) bleiben dadurch unabhängig vom Backend stabil.
+
+orjson schreibt kompakte Trennzeichen; sie werden außerhalb von Strings
+ergänzt. Ausgaben, die sich sonst unterscheiden könnten (Escape-Sequenzen,
+Fließkommazahlen, null/NaN) sowie von orjson abgelehnte Daten (z.B.
+Ganzzahlen über 64 Bit, Nicht-String-Schlüssel) erzeugt die
+Standardbibliothek.
+
+Backend (AFM_JSON_BACKEND): auto | orjson | json
+"""
+import json
+import os
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ("json", "orjson") if orjson is not None else ("json",)
+
+def _select_backend(name):
+    """Backend prüfen ("auto" = orjson falls installiert)"""
+    if name == "auto":
+        return JSON_BACKENDS[-1]
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"JSON-Backend '{name}' nicht verfügbar - erlaubt: auto, {', '.join(JSON_BACKENDS)}")
+    return name
+
+JSON_BACKEND = _select_backend(os.environ.get("AFM_JSON_BACKEND", "auto"))
+
+def _plain(value):
+    """orjson default: Dict-/List-Unterklassen (z.B. AFMCase, LazyAFMCase) als reine Container"""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    raise TypeError(f"Typ {type(value).__name__} nicht serialisierbar")
+
+def _orjson_encode(obj, sort_keys, indent, compact):
+    """orjson-Ausgabe im Format der Standardbibliothek - None wenn Bytegleichheit nicht sicher ist"""
+    # Unterklassen über _plain: orjson läse sonst den Dict-Speicher direkt (LazyAFMCase)
+    option = orjson.OPT_PASSTHROUGH_SUBCLASS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent == 2:
+        option |= orjson.OPT_INDENT_2
+    elif indent is not None:
+        return None
+    try:
+        data = orjson.dumps(obj, default=_plain, option=option)
+    except (TypeError, orjson.JSONEncodeError):
+        return None
+    if b"\\" in data:
+        return None
+
+    # Ohne Escapes trennt jedes '"' String-Inhalt (ungerade Teile) von Struktur (gerade Teile).
+    # Die Struktur wird für Prüfung und Trennzeichen einmal zusammengefügt (\0 kommt darin nicht vor).
+    parts = data.split(b'"')
+    structure = b"\0".join(parts[0::2])
+    if b"." in structure or b"n" in structure or (
+            b"e" in structure and b"e" in structure.replace(b"true", b"").replace(b"false", b"")):
+        return None
+    if indent is None and not compact:
+        parts[0::2] = structure.replace(b",", b", ").replace(b":", b": ").split(b"\0")
+        data = b'"'.join(parts)
+    return data
+
+def dumps_bytes(obj, sort_keys=False, indent=None, compact=False, backend=None):
+    """
+    JSON als UTF-8 Bytes - bytegleich zu json.dumps(obj, ensure_ascii=False, ...).encode('utf-8')
+
+    Args:
+        obj: JSON-serialisierbare Daten
+        sort_keys (bool): Schlüssel sortieren (kanonische Form)
+        indent (int): Einrückung (None = einzeilig)
+        compact (bool): Trennzeichen ohne Leerzeichen (',' und ':')
+        backend (str): "json" oder "orjson" (Standard: JSON_BACKEND)
+
+    Returns:
+        bytes
+    """
+    backend = _select_backend(backend) if backend else JSON_BACKEND
+    if backend == "orjson":
+        data = _orjson_encode(obj, sort_keys, indent, compact)
+        if data is not None:
+            return data
+    return dumps(obj, sort_keys=sort_keys, indent=indent, compact=compact, backend="json").encode('utf-8')
+
+def dumps(obj, sort_keys=False, indent=None, compact=False, backend=None):
+    """
+    JSON als String - bytegleich zu json.dumps(obj, ensure_ascii=False, ...)
+
+    Args:
+        obj: JSON-serialisierbare Daten
+        sort_keys (bool): Schlüssel sortieren (kanonische Form)
+        indent (int): Einrückung (None = einzeilig)
+        compact (bool): Trennzeichen ohne Leerzeichen (',' und ':')
+        backend (str): "json" oder "orjson" (Standard: JSON_BACKEND)
+
+    Returns:
+        str
+    """
+    backend = _select_backend(backend) if backend else JSON_BACKEND
+    if backend == "orjson":
+        data = _orjson_encode(obj, sort_keys, indent, compact)
+        if data is not None:
+            return data.decode('utf-8')
+    separators = (',', ':') if compact else None
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, indent=indent, separators=separators)
+
+def canonical_dumps(obj, backend=None):
+    """Kanonisches JSON für AFM-Strings (sortierte Schlüssel, Unicode unverändert)"""
+    return dumps(obj, sort_keys=True, backend=backend)
+
+def loads(data, backend=None):
+    """
+    JSON aus String oder Bytes parsen
+
+    Args:
+        data (str | bytes): JSON-Dokument
+        backend (str): "json" oder "orjson" (Standard: JSON_BACKEND)
+
+    Returns:
+        Geparste Daten (ValueError bei ungültigem JSON)
+    """
+    backend = _select_backend(backend) if backend else JSON_BACKEND
+    if backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # Z.B. NaN, sehr große Ganzzahlen, UTF-16 - die Standardbibliothek entscheidet
+            pass
+    return json.loads(data)
+
+def load(f, backend=None):
+    """JSON aus einer geöffneten Datei (Text- oder Binärmodus) parsen"""
+    return loads(f.read(), backend=backend)
+
+def dump(obj, f, sort_keys=False, indent=None, compact=False, backend=None):
+    """JSON in eine geöffnete Textdatei schreiben (Optionen wie dumps)"""
+    f.write(dumps(obj, sort_keys=sort_keys, indent=indent, compact=compact, backend=backend))
+
+def _benchmark_case(nr):
+    """Case in der Form der Pure AFM Daten (inkl. Umlaute und UUID-Zeitstempel)"""
+    return {
+        "uuid": f"3f2b8c1e-7d4a-4e9b-9a{nr:010d}",
+        "fallnummer": f"HR-2025-{nr:05d}",
+        "quelle": "Grundbuch Wien" if nr % 3 else "Handelsregister Österreich",
+        "fundstellen": f"HRB {nr}, Seite {nr % 40 + 1}",
+        "kategorie": "Firmenbuch",
+        "bemerkung": "Prüfung ausständig" if nr % 5 == 0 else "",
+        "zeitstempel": [
+            f"erfassung:2025-07-24T{nr % 24:02d}",
+            f"verarbeitung:2025-07-25T{nr % 24:02d}",
+        ],
+    }
+
+def benchmark(case_count=2000, rounds=5):
+    """
+    Vergleicht die Backends auf typischen Case-Formen
+
+    Args:
+        case_count (int): Cases pro Durchlauf
+        rounds (int): Wiederholungen (bester Durchlauf zählt)
+
+    Returns:
+        dict: Backend → {Operation: Millisekunden, "identisch": bool}
+    """
+    from .afm_codec import encrypt_afm_string
+
+    cases = [_benchmark_case(i) for i in range(case_count)]
+    canonical = [canonical_dumps(case, backend="json") for case in cases]
+    encoded = [encrypt_afm_string(afm) for afm in canonical]
+    snapshot = {"format": "afm_pure_v1.0", "case_count": case_count, "afm_strings": encoded}
+    records = [{"op": "set", "id": case["uuid"], "afm": afm} for case, afm in zip(cases, encoded)]
+    reference = {
+        "canonical": canonical,
+        "snapshot": dumps(snapshot, indent=2, backend="json"),
+        "journal": [dumps(record, compact=True, backend="json") for record in records],
+    }
+    operations = {
+        "canonical": lambda backend: [canonical_dumps(case, backend=backend) for case in cases],
+        "loads": lambda backend: [loads(afm, backend=backend) for afm in canonical],
+        "snapshot": lambda backend: dumps(snapshot, indent=2, backend=backend),
+        "journal": lambda backend: [dumps(record, compact=True, backend=backend) for record in records],
+    }
+
+    results = {}
+    for backend in JSON_BACKENDS:
+        timings = {}
+        identical = True
+        for name, operation in operations.items():
+            best = None
+            for _ in range(rounds):
+                start = time.perf_counter()
+                output = operation(backend)
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+            identical = identical and (output == reference[name] if name in reference else output == cases)
+        timings["identisch"] = identical
+        results[backend] = timings
+    return results
+
+def main():
+    """Benchmark per Kommandozeile: python -m utils.json_codec [cases] [runden]"""
+    case_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"⏱️ [JSON] {case_count} Cases, bester von {rounds} Durchläufen (aktiv: {JSON_BACKEND})")
+    for backend, timings in benchmark(case_count, rounds).items():
+        identical = "bytegleich" if timings.pop("identisch") else "ABWEICHEND"
+        columns = "  ".join(f"{name} {millis:7.2f} ms" for name, millis in timings.items())
+        print(f"   {backend:<7} {columns}  {identical}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
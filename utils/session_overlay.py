@@ -0,0 +1,112 @@
+"""
+AFMTool1 - Copy-on-write Session-Overlay
+Eine Session kopiert nicht mehr alle Cases, sondern merkt sich nur die
+berührten Cases als Delta über dem Storage (add/set/del je Case-ID).
+Lesen legt das Overlay über die Storage-Cases, Übernehmen schreibt nur die
+Deltas per write_batch. Speicher und I/O wachsen mit der Anzahl der
+Änderungen, nicht mit der Datenbankgröße.
+"""
+from datetime import datetime
+
+from .atomic_write import atomic_write_json
+from .case_index import ensure_case_id
+from . import json_codec
+
+OVERLAY_FORMAT = "afm_session_overlay_v1"
+
+class AFMSessionOverlay:
+    """Delta-Datei einer Session: Case-ID → letzte Operation ("add", "set" oder "del")"""
+
+    def __init__(self, overlay_file):
+        self.overlay_file = overlay_file
+        # Einfügereihenfolge = Reihenfolge neu angelegter Cases
+        self.changes = {}
+        self.load()
+
+    def load(self):
+        """Delta-Datei lesen (fehlend oder ungültig = leeres Overlay)"""
+        self.changes = {}
+        try:
+            with open(self.overlay_file, 'r', encoding='utf-8') as f:
+                data = json_codec.load(f)
+        except (OSError, ValueError):
+            return self.changes
+
+        if data.get("format") == OVERLAY_FORMAT:
+            for entry in data.get("changes", []):
+                self.changes[entry["id"]] = (entry["op"], entry.get("case"))
+        return self.changes
+
+    def save(self):
+        """Nur die Deltas atomar schreiben - ohne fsync, die Session ist temporär"""
+        data = {
+            "format": OVERLAY_FORMAT,
+            "last_update": datetime.now().isoformat(),
+            "changes": [{"op": op, "id": case_id, "case": case} for case_id, (op, case) in self.changes.items()],
+        }
+        atomic_write_json(self.overlay_file, data, durability="never")
+
+    def record(self, op, case):
+        """
+        Änderung eines Cases vormerken - mehrere Änderungen desselben Cases fallen zusammen
+
+        Args:
+            op (str): "add", "set" oder "del"
+            case (dict): Case-Daten (bei "add" erhält der Case eine ID)
+
+        Returns:
+            str: Case-ID
+        """
+        if op == 'add':
+            case_id = ensure_case_id(case, taken=self.changes)
+        else:
+            case_id = case.get('uuid')
+        previous = self.changes.get(case_id, (None, None))[0]
+
+        if previous == 'add' and op == 'del':
+            # Erst in dieser Session angelegt - der Storage muss davon nie erfahren
+            del self.changes[case_id]
+        elif op == 'del':
+            self.changes[case_id] = ('del', None)
+        else:
+            self.changes[case_id] = ('add' if previous == 'add' else op, case)
+        return case_id
+
+    def apply(self, base_cases):
+        """
+        Overlay über die Storage-Cases legen
+
+        Args:
+            base_cases (list): Cases aus dem Storage (z.B. LazyAFMCase)
+
+        Returns:
+            list: geänderte Cases ersetzt, gelöschte entfernt, neue angehängt
+        """
+        if not self.changes:
+            return base_cases
+
+        cases = []
+        for case in base_cases:
+            op, changed = self.changes.get(case.get('uuid'), (None, None))
+            if op is None:
+                cases.append(case)
+            elif op == 'set':
+                cases.append(changed)
+        cases.extend(case for op, case in self.changes.values() if op == 'add')
+        return cases
+
+    def count_delta(self):
+        """Veränderung der Case-Anzahl gegenüber dem Storage"""
+        return sum(1 if op == 'add' else -1 if op == 'del' else 0 for op, _ in self.changes.values())
+
+    def operations(self):
+        """Deltas als write_batch-Operationen (op, case_id, case)"""
+        return [(op, case_id, case) for case_id, (op, case) in self.changes.items()]
+
+    def clear(self):
+        """Overlay verwerfen (nach dem Übernehmen in den Storage)"""
+        self.changes = {}
+        try:
+            self.overlay_file.unlink()
+        except FileNotFoundError:
+            pass
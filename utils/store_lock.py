@@ -0,0 +1,97 @@
+"""
+AFMTool1 - Prozessübergreifende Sperren für den AFM Storage
+Mehrere GUI-Instanzen können dieselbe cases.json nutzen: Leser halten eine
+geteilte, Schreiber eine exklusive Sperre (fcntl.flock, advisory). Die
+Lock-Datei enthält zugleich die monoton steigende Store-Version, über die
+ein Schreiber günstig erkennt, ob sein gelesener Stand veraltet ist.
+
+Eine gehaltene geteilte Sperre lässt sich nicht in eine exklusive umwandeln:
+flock gibt dabei die geteilte Sperre kurz frei (nicht atomar), und zwei
+Leser, die gleichzeitig umwandeln, blockieren sich gegenseitig. Schreiber
+nehmen die exklusive Sperre daher immer von außen (exklusiv umfasst geteilt).
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Ohne fcntl (Windows) schützt die Sperre nur innerhalb des Prozesses
+    fcntl = None
+
+VERSION_WIDTH = 20
+
+class StoreLock:
+    """Geteilte/exklusive Dateisperre + Store-Version (wiedereintrittsfähig)"""
+
+    def __init__(self, lock_file):
+        self.lock_file = Path(lock_file)
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._mode = None
+
+    def _flock(self, mode):
+        """Sperre setzen bzw. zurück auf geteilt umwandeln ("shared" oder "exclusive")"""
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if mode == "exclusive" else fcntl.LOCK_SH)
+
+    @contextmanager
+    def _hold(self, mode):
+        """Sperre für die Dauer des Blocks - verschachtelt, exklusiv umfasst geteilt"""
+        with self._thread_lock:
+            previous = self._mode
+            if previous == "shared" and mode == "exclusive":
+                raise RuntimeError("Geteilte Sperre nicht in exklusive umwandelbar - exklusiv von außen sperren")
+            if previous is None:
+                self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            if previous != "exclusive" and previous != mode:
+                self._flock(mode)
+                self._mode = mode
+            try:
+                yield self
+            finally:
+                if previous is None:
+                    # Schließen gibt die flock-Sperre frei
+                    os.close(self._fd)
+                    self._fd = None
+                    self._mode = None
+                elif previous != self._mode:
+                    self._flock(previous)
+                    self._mode = previous
+
+    def shared(self):
+        """Geteilte Lesesperre"""
+        return self._hold("shared")
+
+    def exclusive(self):
+        """Exklusive Schreibsperre"""
+        return self._hold("exclusive")
+
+    def version(self):
+        """
+        Aktuelle Store-Version
+
+        Returns:
+            int: 0 wenn noch kein Schreibvorgang erfolgt ist
+        """
+        try:
+            with open(self.lock_file, 'rb') as f:
+                return int(f.read(VERSION_WIDTH) or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump_version(self):
+        """
+        Store-Version nach einem Schreibvorgang erhöhen (nur unter exklusiver Sperre)
+
+        Returns:
+            int: neue Version
+        """
+        if self._mode != "exclusive":
+            raise RuntimeError("Store-Version nur unter exklusiver Sperre änderbar")
+        version = self.version() + 1
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, f"{version:0{VERSION_WIDTH}d}".encode('ascii'))
+        return version
@@ -7,6 +7,8 @@ import datetime
 import json
 import re
 
+from .afm_timestamps import parse_case_timestamps
+
 def generate_unique_timestamp(timestamp_type="erfassung"):
     """
     Generiert eindeutigen Zeitstempel mit UUID
@@ -57,10 +59,8 @@ def _extract_erfassung_timestamp(timestamps):
     Returns:
         str or None: Erfassung-Zeitstempel oder None
     """
-    for ts in timestamps:
-        if ts.startswith("erfassung:"):
-            return ts
-    return None
+    erfassung = parse_case_timestamps(timestamps).erfassung
+    return erfassung.raw if erfassung is not None else None
 
 def _validate_immutable_timestamps(existing_case, updated_case):
     """